@@ -0,0 +1,91 @@
+"""基准测试 - 并发上传时的事件循环延迟（inline vs 线程池 vs 进程池）"""
+
+import asyncio
+import io
+import os
+import statistics
+import sys
+import time
+
+from PIL import Image
+
+from services.image_workers import ImageWorkerPool
+from utils.file_utils import (
+    validate_image,
+    preprocess_image,
+    compute_menu_fingerprint,
+    encode_image_to_base64,
+    sha256_hexdigest,
+)
+
+CONCURRENT_UPLOADS = int(os.getenv("BENCH_UPLOADS", 8))
+IMAGE_SIZE = (3000, 2000)  # 约 6 MP，接近手机拍摄的菜单照片
+TICK_SECONDS = 0.01
+
+
+def make_test_image() -> bytes:
+    """生成一张带噪声的 JPEG（噪声让编码器无法取巧）"""
+    img = Image.frombytes("RGB", IMAGE_SIZE, os.urandom(IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def monitor_lag(stop: asyncio.Event, samples: list):
+    """每 TICK_SECONDS 醒来一次，记录实际醒来时间与预期的偏差"""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def process_upload(pool: ImageWorkerPool, contents: bytes):
+    """模拟 analyze_menu 的 CPU 阶段：校验 → 哈希（线程） → 预处理 → 近似重复指纹 → Base64 编码"""
+    await pool.run(validate_image, contents)
+    await asyncio.to_thread(sha256_hexdigest, contents)
+    prepared = await pool.run(preprocess_image, contents)
+    await pool.run(compute_menu_fingerprint, contents)
+    await pool.run(encode_image_to_base64, prepared.data)
+
+
+async def run_case(mode: str, contents: bytes) -> dict:
+    pool = ImageWorkerPool(mode=mode)
+    pool.start()
+    # 预热（进程池启动开销不计入）
+    await pool.run(validate_image, b"warmup")
+
+    samples: list = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(stop, samples))
+    start = time.perf_counter()
+    await asyncio.gather(*[process_upload(pool, contents) for _ in range(CONCURRENT_UPLOADS)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    pool.shutdown()
+
+    samples = samples or [0.0]
+    return {
+        "mode": mode,
+        "wall_s": elapsed,
+        "lag_max_ms": max(samples) * 1000,
+        "lag_mean_ms": statistics.mean(samples) * 1000,
+    }
+
+
+async def main():
+    contents = make_test_image()
+    print(f"🧪 {CONCURRENT_UPLOADS} concurrent uploads of {len(contents) / 1024 / 1024:.1f} MB ({IMAGE_SIZE[0]}x{IMAGE_SIZE[1]})\n")
+
+    modes = sys.argv[1:] or ["inline", "thread", "process"]
+    print(f"{'mode':<10}{'wall (s)':>10}{'max lag (ms)':>15}{'mean lag (ms)':>16}")
+    print("-" * 51)
+    for mode in modes:
+        result = await run_case(mode, contents)
+        print(f"{result['mode']:<10}{result['wall_s']:>10.2f}{result['lag_max_ms']:>15.1f}{result['lag_mean_ms']:>16.1f}")
+
+    print("\n💡 max lag 即其他请求（代理、聊天）在此期间可能被阻塞的最长时间")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,8 @@ class Settings:
     SEARCH_API_KEY: str = os.getenv("SEARCH_API_KEY", "")  # SerpAPI key (新)
     SEARCH_ENGINE_ID: str = os.getenv("SEARCH_ENGINE_ID", "")  # 保留向后兼容，但不再使用
     SEARCH_PROVIDER: str = os.getenv("SEARCH_PROVIDER", "serpapi")  # "serpapi" 或 "google"
+    SEARCH_RACE_MODE: str = os.getenv("SEARCH_RACE_MODE", "off")  # off / race（同时查询）/ hedge（超时后查询另一个）
+    SEARCH_HEDGE_DELAY: float = float(os.getenv("SEARCH_HEDGE_DELAY", 1.5))  # hedge 模式下启动备用搜索源的延迟 (秒)
     
     # SerpAPI 配置
     SERPAPI_KEY: str = os.getenv("SERPAPI_KEY", "")
@@ -29,26 +31,132 @@ class Settings:
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gemini-2.0-flash-lite-preview-02-05")  # Updated default model
     LLM_TIMEOUT: int = int(os.getenv("LLM_TIMEOUT", 30))
     LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", 0.2))
+    LLM_CLIENT_CACHE_SIZE: int = int(os.getenv("LLM_CLIENT_CACHE_SIZE", 32))  # 按 Key 缓存的客户端数量
+    LLM_CLIENT_IDLE_TTL: int = int(os.getenv("LLM_CLIENT_IDLE_TTL", 600))  # 客户端空闲淘汰时间 (秒)
     
     # Search
     SEARCH_TIMEOUT: int = int(os.getenv("SEARCH_TIMEOUT", 5))
     SEARCH_NUM_RESULTS: int = int(os.getenv("SEARCH_NUM_RESULTS", 1))
     MAX_CONCURRENT_SEARCHES: int = int(os.getenv("MAX_CONCURRENT_SEARCHES", 10))
+    SEARCH_RATE_LIMIT_ENABLED: bool = os.getenv("SEARCH_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    SEARCH_RATE_LIMIT_PER_SECOND: float = float(os.getenv("SEARCH_RATE_LIMIT_PER_SECOND", 5))  # 每个 API Key 的稳定速率
+    SEARCH_RATE_LIMIT_BURST: int = int(os.getenv("SEARCH_RATE_LIMIT_BURST", 10))  # 令牌桶容量
+    SEARCH_RATE_LIMIT_MAX_WAIT: float = float(os.getenv("SEARCH_RATE_LIMIT_MAX_WAIT", 15))  # 排队最长等待 (秒)
+    SEARCH_RATE_LIMIT_RETRIES: int = int(os.getenv("SEARCH_RATE_LIMIT_RETRIES", 2))  # 429 后的重试次数
+    SERPAPI_MONTHLY_QUOTA: int = int(os.getenv("SERPAPI_MONTHLY_QUOTA", 0))  # 0 表示不限制
+    GOOGLE_SEARCH_MONTHLY_QUOTA: int = int(os.getenv("GOOGLE_SEARCH_MONTHLY_QUOTA", 0))
     
+    # HTTP 连接池
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", 100))
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 10))
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+
     # RAG Pipeline
     ENABLE_RAG_PIPELINE: bool = os.getenv("ENABLE_RAG_PIPELINE", "true").lower() == "true"
     SEARCH_CANDIDATE_RESULTS: int = int(os.getenv("SEARCH_CANDIDATE_RESULTS", 10))  # 搜索 Top 3
     IMAGE_VERIFY_SCORE_THRESHOLD: float = float(os.getenv("IMAGE_VERIFY_SCORE_THRESHOLD", 0.7))
     ENABLE_IMAGE_GENERATION: bool = os.getenv("ENABLE_IMAGE_GENERATION", "true").lower() == "true"
+    SPECULATIVE_GENERATION_ENABLED: bool = os.getenv("SPECULATIVE_GENERATION_ENABLED", "false").lower() == "true"
+    SPECULATIVE_GENERATION_MIN_CANDIDATES: int = int(os.getenv("SPECULATIVE_GENERATION_MIN_CANDIDATES", 0))  # 存活候选少于此数时立即开始生成，0 表示只按验证分数触发
+    SPECULATIVE_GENERATION_SCORE_SAMPLES: int = int(os.getenv("SPECULATIVE_GENERATION_SCORE_SAMPLES", 2))  # 最先完成的 N 个验证分数全部低于阈值时开始生成
     GENERATION_API_URL: str = os.getenv("GENERATION_API_URL", "https://api.openai.com/v1/images/generations")
     GENERATION_API_KEY: str = os.getenv("GENERATION_API_KEY", "")  # DALL-E 或 Imagen API Key
     GENERATION_MODEL: str = os.getenv("GENERATION_MODEL", "dall-e-3")  # 生成模型
+    GENERATION_RESPONSE_FORMAT: str = os.getenv("GENERATION_RESPONSE_FORMAT", "")  # url / b64_json，留空使用提供方默认
+    GENERATED_IMAGE_STORE_ENABLED: bool = os.getenv("GENERATED_IMAGE_STORE_ENABLED", "true").lower() == "true"
+    GENERATED_IMAGE_DIR: str = os.getenv("GENERATED_IMAGE_DIR", "data/generated_images")
+    GENERATED_IMAGE_BASE_URL: str = os.getenv("GENERATED_IMAGE_BASE_URL", "")  # 生成图片 URL 前缀，留空返回以 / 开头的路径（前端按 API_BASE_URL 补全）
+    GENERATED_IMAGE_INDEX_MAX_ENTRIES: int = int(os.getenv("GENERATED_IMAGE_INDEX_MAX_ENTRIES", 5000))
+    GENERATED_IMAGE_TTL: int = int(os.getenv("GENERATED_IMAGE_TTL", 365 * 24 * 3600))
+    GENERATED_IMAGE_DOWNLOAD_TIMEOUT: int = int(os.getenv("GENERATED_IMAGE_DOWNLOAD_TIMEOUT", 30))
     IMAGE_URL_CHECK_TIMEOUT: int = int(os.getenv("IMAGE_URL_CHECK_TIMEOUT", 5))
     IMAGE_VERIFY_TIMEOUT: int = int(os.getenv("IMAGE_VERIFY_TIMEOUT", 15))
+    IMAGE_DOWNLOAD_TIMEOUT: int = int(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", 5))
+    IMAGE_DOWNLOAD_MAX_BYTES: int = int(os.getenv("IMAGE_DOWNLOAD_MAX_BYTES", 5 * 1024 * 1024))
+    IMAGE_BYTES_CACHE_MAX_MB: int = int(os.getenv("IMAGE_BYTES_CACHE_MAX_MB", 64))  # 预筛选、验证、代理共享的图片字节缓存上限
+    IMAGE_VERIFY_INLINE: bool = os.getenv("IMAGE_VERIFY_INLINE", "false").lower() == "true"  # 本地下载缩略后以 data URL 内联发送给视觉模型
+    IMAGE_VERIFY_INLINE_MAX_EDGE: int = int(os.getenv("IMAGE_VERIFY_INLINE_MAX_EDGE", 384))
+    IMAGE_VERIFY_INLINE_QUALITY: int = int(os.getenv("IMAGE_VERIFY_INLINE_QUALITY", 70))
+    LOCAL_PREFILTER_ENABLED: bool = os.getenv("LOCAL_PREFILTER_ENABLED", "false").lower() == "true"
+    LOCAL_PREFILTER_MIN_STDDEV: float = float(os.getenv("LOCAL_PREFILTER_MIN_STDDEV", 8.0))  # 灰度标准差低于此值视为空白图
+    LOCAL_PREFILTER_MIN_COLORS: int = int(os.getenv("LOCAL_PREFILTER_MIN_COLORS", 24))  # 颜色数低于此值视为占位图
+    LOCAL_PREFILTER_DUP_DISTANCE: int = int(os.getenv("LOCAL_PREFILTER_DUP_DISTANCE", 6))  # dHash 汉明距离不超过此值视为重复
+    IMAGE_VERIFY_BATCH_SIZE: int = int(os.getenv("IMAGE_VERIFY_BATCH_SIZE", 1))  # 每次视觉调用验证的图片数，1 表示逐张验证
+    IMAGE_VERIFY_EARLY_EXIT_COUNT: int = int(os.getenv("IMAGE_VERIFY_EARLY_EXIT_COUNT", 0))  # 通过验证的图片达到该数量即停止，0 表示验证全部候选
+    IMAGE_VERIFY_PARALLELISM: int = int(os.getenv("IMAGE_VERIFY_PARALLELISM", 3))  # 提前结束模式下同时进行的验证数
+    VERIFY_CACHE_ENABLED: bool = os.getenv("VERIFY_CACHE_ENABLED", "true").lower() == "true"
+    VERIFY_CACHE_MAX_ENTRIES: int = int(os.getenv("VERIFY_CACHE_MAX_ENTRIES", 20000))
+    VERIFY_CACHE_TTL: int = int(os.getenv("VERIFY_CACHE_TTL", 30 * 24 * 3600))
+    VERIFY_CACHE_CONTENT_HASH: bool = os.getenv("VERIFY_CACHE_CONTENT_HASH", "false").lower() == "true"  # 按图片内容哈希共享镜像副本的分数
+    VERIFY_CACHE_MAX_DOWNLOAD_BYTES: int = int(os.getenv("VERIFY_CACHE_MAX_DOWNLOAD_BYTES", 5 * 1024 * 1024))
+    IMAGE_VERIFIER_BACKEND: str = os.getenv("IMAGE_VERIFIER_BACKEND", "llm")  # llm / local / cascade
+    VERIFIER_CASCADE_LOW: float = float(os.getenv("VERIFIER_CASCADE_LOW", 0.4))  # 级联模式：本地分数不高于此值直接淘汰
+    VERIFIER_CASCADE_HIGH: float = float(os.getenv("VERIFIER_CASCADE_HIGH", 0.85))  # 级联模式：本地分数不低于此值直接采用
+    LOCAL_VERIFIER_MAX_SCORE: float = float(os.getenv("LOCAL_VERIFIER_MAX_SCORE", 0.5))  # 单独使用本地打分时的分数上限（应低于验证阈值）
+    IMAGE_VERIFY_USE_THUMBNAIL: bool = os.getenv("IMAGE_VERIFY_USE_THUMBNAIL", "false").lower() == "true"  # 用搜索缩略图做视觉验证
+    CANDIDATE_MIN_EDGE: int = int(os.getenv("CANDIDATE_MIN_EDGE", 200))  # 短边低于此像素的候选直接丢弃
+    CANDIDATE_MAX_ASPECT_RATIO: float = float(os.getenv("CANDIDATE_MAX_ASPECT_RATIO", 3.0))  # 长宽比超过此值的候选直接丢弃
+    CANDIDATE_BLOCKED_DOMAINS: str = os.getenv("CANDIDATE_BLOCKED_DOMAINS", "")  # 逗号分隔的屏蔽域名
+    CANDIDATE_PROBE_FACTOR: float = float(os.getenv("CANDIDATE_PROBE_FACTOR", 2.0))  # 向搜索源请求并做存活检查的候选数 = 候选数量 × 此倍数
+    CANDIDATE_SKIP_PROBE_WITH_METADATA: bool = os.getenv("CANDIDATE_SKIP_PROBE_WITH_METADATA", "false").lower() == "true"
+    URL_HEALTH_CACHE_ENABLED: bool = os.getenv("URL_HEALTH_CACHE_ENABLED", "true").lower() == "true"
+    DEAD_URL_TTL: int = int(os.getenv("DEAD_URL_TTL", 6 * 3600))  # 确定性失败（404/410、非图片、无法解码）的负缓存时间 (秒)
+    DEAD_URL_TRANSIENT_TTL: int = int(os.getenv("DEAD_URL_TRANSIENT_TTL", 120))  # 暂时性失败（超时、连接错误、5xx）的跳过时间 (秒)，0 表示不缓存
+    DEAD_URL_CACHE_MAX_ENTRIES: int = int(os.getenv("DEAD_URL_CACHE_MAX_ENTRIES", 10000))
+    BAD_HOST_FAILURE_THRESHOLD: int = int(os.getenv("BAD_HOST_FAILURE_THRESHOLD", 5))  # 窗口内确定性失败次数达到后屏蔽主机
+    BAD_HOST_TTL: int = int(os.getenv("BAD_HOST_TTL", 1800))  # 失败计数窗口与主机屏蔽时长 (秒)
+    URL_PROBE_PER_HOST_CONCURRENCY: int = int(os.getenv("URL_PROBE_PER_HOST_CONCURRENCY", 4))
+    HOST_REPUTATION_ENABLED: bool = os.getenv("HOST_REPUTATION_ENABLED", "true").lower() == "true"
+    HOST_REPUTATION_TTL: int = int(os.getenv("HOST_REPUTATION_TTL", 30 * 24 * 3600))  # 主机统计保留时长 (秒)
+    HOST_REPUTATION_HALF_LIFE: float = float(os.getenv("HOST_REPUTATION_HALF_LIFE", 7 * 24 * 3600))  # 样本权重减半所需时间 (秒)，0 表示不衰减
+    HOST_REPUTATION_MIN_SAMPLES: float = float(os.getenv("HOST_REPUTATION_MIN_SAMPLES", 0.5))  # 衰减后样本数低于此值的主机在写盘时清理
+    HOST_REPUTATION_MAX_HOSTS: int = int(os.getenv("HOST_REPUTATION_MAX_HOSTS", 5000))  # 最多跟踪的主机数，超出时淘汰样本最少的
+    HOST_REPUTATION_FLUSH_INTERVAL: float = float(os.getenv("HOST_REPUTATION_FLUSH_INTERVAL", 5))  # 写盘间隔 (秒)
+    VERIFY_TOP_K: int = int(os.getenv("VERIFY_TOP_K", 3))  # 请求未指定候选数量时只验证排序后前 K 个候选，0 表示不截断
+    MAX_CONCURRENT_DISH_PIPELINES: int = int(os.getenv("MAX_CONCURRENT_DISH_PIPELINES", 8))  # 所有批量请求合计同时处理的菜品数
+    MAX_CONCURRENT_DISHES_PER_REQUEST: int = int(os.getenv("MAX_CONCURRENT_DISHES_PER_REQUEST", 4))  # 单个批量请求同时处理的菜品数
+    MAX_BATCH_DISHES: int = int(os.getenv("MAX_BATCH_DISHES", 100))  # 批量图片搜索单次最多菜品数
     
     # File
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", 10))
     ALLOWED_EXTENSIONS: list = ["jpg", "jpeg", "png", "webp"]
+    MAX_MENU_PAGES: int = int(os.getenv("MAX_MENU_PAGES", 10))  # 多页菜单单次最多页数
+    MAX_CONCURRENT_MENU_PAGES: int = int(os.getenv("MAX_CONCURRENT_MENU_PAGES", 4))  # 多页菜单并发识别上限
+
+    # Upload preprocessing（发送给视觉模型前）
+    UPLOAD_PREPROCESS_ENABLED: bool = os.getenv("UPLOAD_PREPROCESS_ENABLED", "true").lower() == "true"
+    UPLOAD_MAX_EDGE: int = int(os.getenv("UPLOAD_MAX_EDGE", 2048))  # 长边最大像素，0 表示不缩放
+    UPLOAD_GRAYSCALE: bool = os.getenv("UPLOAD_GRAYSCALE", "false").lower() == "true"
+    UPLOAD_FORMAT: str = os.getenv("UPLOAD_FORMAT", "jpeg")  # jpeg 或 webp
+    UPLOAD_QUALITY: int = int(os.getenv("UPLOAD_QUALITY", 85))
+    IMAGE_WORKER_MODE: str = os.getenv("IMAGE_WORKER_MODE", "thread")  # thread / process / inline
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", 0))  # 0 表示 min(4, CPU 核数)
+
+    # Menu tiling（长菜单/多栏菜单切片并行识别）
+    ENABLE_MENU_TILING: bool = os.getenv("ENABLE_MENU_TILING", "false").lower() == "true"
+    MENU_TILE_ASPECT_THRESHOLD: float = float(os.getenv("MENU_TILE_ASPECT_THRESHOLD", 1.6))  # 长宽比超过此值才切片
+    MENU_TILE_OVERLAP: float = float(os.getenv("MENU_TILE_OVERLAP", 0.15))  # 相邻切片重叠比例
+    MENU_TILE_MAX: int = int(os.getenv("MENU_TILE_MAX", 4))
+    MENU_TILE_MIN_EDGE: int = int(os.getenv("MENU_TILE_MIN_EDGE", 1200))  # 长边低于此像素不切片
+
+    # Cache
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "")  # SQLite 磁盘缓存路径，留空则仅使用内存
+    CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("CACHE_DISK_MAX_ENTRIES", 100000))  # 其余缓存磁盘层每个 namespace 的条目上限，0 表示不限制
+    CACHE_PURGE_EVERY_WRITES: int = int(os.getenv("CACHE_PURGE_EVERY_WRITES", 500))  # 每写入 N 次清理一次磁盘层（过期条目 + 条目上限）
+    ANALYSIS_CACHE_ENABLED: bool = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+    ANALYSIS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 256))
+    ANALYSIS_CACHE_TTL: int = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+    ANALYSIS_CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("ANALYSIS_CACHE_DISK_MAX_ENTRIES", 100000))  # 磁盘层条目上限，超出时删除最早写入的条目
+    PHASH_DEDUP_ENABLED: bool = os.getenv("PHASH_DEDUP_ENABLED", "false").lower() == "true"
+    PHASH_MAX_DISTANCE: int = int(os.getenv("PHASH_MAX_DISTANCE", 4))  # 64 位 dHash 的汉明距离阈值（候选筛选）
+    PHASH_INDEX_MAX_ENTRIES: int = int(os.getenv("PHASH_INDEX_MAX_ENTRIES", ANALYSIS_CACHE_DISK_MAX_ENTRIES))  # 近似重复索引条目上限，默认与磁盘层识别缓存一致
+    PHASH_VERIFY_MAX_DIFF: float = float(os.getenv("PHASH_VERIFY_MAX_DIFF", 0.02))  # 像素复核：指纹缩略图分块平均差的最大值 (0-1)
+    SEARCH_CACHE_ENABLED: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 2048))
+    SEARCH_CACHE_TTL: int = int(os.getenv("SEARCH_CACHE_TTL", 7 * 24 * 3600))  # 新鲜期，过后后台刷新
+    SEARCH_CACHE_EMPTY_TTL: int = int(os.getenv("SEARCH_CACHE_EMPTY_TTL", 600))  # 空结果的负缓存时长 (秒)，0 表示不缓存空结果
+    SEARCH_CACHE_STALE_TTL: int = int(os.getenv("SEARCH_CACHE_STALE_TTL", 30 * 24 * 3600))  # 新鲜期之后仍可返回旧结果的时长
     
     # Validation
     VALIDATE_SETTINGS: bool = os.getenv("VALIDATE_SETTINGS", "true").lower() == "true"
@@ -1,21 +1,45 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, status, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+import asyncio
+import json
 import logging
+import time
 import base64
-from typing import Optional, Union
+from typing import AsyncIterator, List, Optional, Tuple, Union
 import io
 from PIL import Image
 
 from config import settings
-from schemas import MenuResponse, Dish, MenuRequest, ChatRequest, ChatResponse, SearchDishImageRequest
+from schemas import MenuResponse, Dish, MenuRequest, ChatRequest, ChatResponse, SearchDishImageRequest, SearchDishImagesRequest
 from services.llm_service import gemini_analyzer
 from services import hybrid_pipeline as hp_module
 from services.image_proxy import image_proxy
-from utils.file_utils import encode_image_to_base64, validate_image
+from services.http_client import http_client
+from services.llm_clients import llm_client_registry
+from services.analysis_cache import analysis_cache
+from services.search_cache import search_cache
+from services.rate_limiter import search_rate_limiter
+from services.composite_search import build_composite_searcher
+from services.url_health import url_health
+from services.host_reputation import host_reputation
+from services.verification_cache import verification_cache
+from services.image_prefilter import local_prefilter
+from services.image_bytes_cache import image_bytes_cache
+from services.verifier_backends import verifier_backend_stats
+from services.generated_image_store import generated_image_store
+from services.menu_similarity import menu_similarity_index
+from services.image_workers import image_workers
+from services.menu_analysis import menu_analysis
+from utils.dish_utils import merge_dishes
+from utils.file_utils import validate_image
 
 # 根据配置选择搜索服务
-if settings.SEARCH_PROVIDER == "serpapi":
+composite_searcher = build_composite_searcher()
+if composite_searcher is not None:
+    searcher = composite_searcher
+    logger_msg = f"Composite search ({composite_searcher.mode}: {', '.join(name for name, _ in composite_searcher.providers)})"
+elif settings.SEARCH_PROVIDER == "serpapi":
     from services.serp_search import serp_searcher as searcher
     logger_msg = "SerpAPI"
 else:
@@ -57,9 +81,104 @@ _hybrid_pipeline = None
 async def startup_event():
     """应用启动时初始化 Pipeline"""
     global _hybrid_pipeline
+    await http_client.start()
+    image_workers.start()
+    await menu_similarity_index.load()
+    await host_reputation.load()
     _hybrid_pipeline = hp_module.initialize_hybrid_pipeline(searcher, searcher)
     logger.info(f"✅ MenuGen API v2.0 started - Using {logger_msg} for image search")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放共享 HTTP 连接池、LLM 客户端和图片任务池，并写出主机信誉统计"""
+    await http_client.close()
+    await llm_client_registry.close()
+    await host_reputation.close()
+    image_workers.shutdown()
+
+def _encode_stream_event(event: dict, stream_format: str) -> str:
+    """将事件编码为 NDJSON 行或 SSE 帧"""
+    payload = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def _stream_media_type(stream_format: str) -> str:
+    return "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+
+
+async def _enrich_with_images(
+    dishes: List[Dish],
+    rag_pipeline_enabled: bool,
+    serpapi_key: Optional[str] = None,
+    search_candidate_results: Optional[int] = None,
+    **pipeline_overrides
+) -> List[Dish]:
+    """为菜品获取图片：优先使用混合 Pipeline，未启用时回退到传统搜索"""
+    if rag_pipeline_enabled and _hybrid_pipeline:
+        # 使用新的混合 Pipeline
+        return await _hybrid_pipeline.enrich_dishes_with_images(
+            dishes,
+            serpapi_key=serpapi_key,
+            search_candidate_results=search_candidate_results,
+            **pipeline_overrides
+        )
+
+    # 使用传统搜索（向后兼容）
+    if not _hybrid_pipeline:
+        logger.warning("⚠️  RAG Pipeline not initialized, using fallback search")
+    else:
+        logger.info("RAG Pipeline disabled in config, using legacy search")
+    return await searcher.enrich_dishes_with_images(
+        dishes,
+        serpapi_key=serpapi_key,
+        search_candidate_results=search_candidate_results
+    )
+
+
+async def _iter_enriched_dishes(
+    dishes: List[Dish],
+    rag_pipeline_enabled: bool,
+    serpapi_key: Optional[str] = None,
+    search_candidate_results: Optional[int] = None,
+    **pipeline_overrides
+) -> AsyncIterator[Tuple[int, Dish]]:
+    """按完成顺序产出 (菜品下标, 已填充图片的菜品)；传统搜索不支持逐个完成，整体完成后一次性产出"""
+    if rag_pipeline_enabled and _hybrid_pipeline:
+        async for index, dish in _hybrid_pipeline.iter_enriched_dishes(
+            dishes,
+            serpapi_key=serpapi_key,
+            search_candidate_results=search_candidate_results,
+            **pipeline_overrides
+        ):
+            yield index, dish
+        return
+
+    enriched = await _enrich_with_images(
+        dishes,
+        rag_pipeline_enabled,
+        serpapi_key=serpapi_key,
+        search_candidate_results=search_candidate_results
+    )
+    for index, dish in enumerate(enriched):
+        yield index, dish
+
+
+def _dish_images_event(index: int, dish: Dish) -> dict:
+    """单个菜品图片结果事件：只携带图片字段，客户端按下标合并"""
+    return {
+        "type": "images",
+        "index": index,
+        "id": dish.id,
+        "image_url": dish.image_url,
+        "image_urls": dish.image_urls,
+        "image_scores": dish.image_scores,
+        "match_score": dish.match_score
+    }
+
+
 # 错误处理
 @app.exception_handler(ValueError)
 async def value_error_handler(request, exc):
@@ -78,7 +197,22 @@ async def health_check():
         "status": "ok",
         "service": "MenuGen API",
         "version": "2.0.0",
-        "rag_pipeline_enabled": settings.ENABLE_RAG_PIPELINE
+        "rag_pipeline_enabled": settings.ENABLE_RAG_PIPELINE,
+        "analysis_cache": analysis_cache.stats(),
+        "menu_similarity_index": menu_similarity_index.stats(),
+        "image_workers": image_workers.stats(),
+        "llm_clients": llm_client_registry.stats(),
+        "search_cache": search_cache.stats(),
+        "search_rate_limiter": search_rate_limiter.stats(),
+        "composite_search": composite_searcher.stats() if composite_searcher else None,
+        "url_health": url_health.stats(),
+        "host_reputation": host_reputation.stats(),
+        "verification_cache": verification_cache.stats(),
+        "local_prefilter": local_prefilter.stats(),
+        "image_bytes_cache": image_bytes_cache.stats(),
+        "verifier_backends": verifier_backend_stats(),
+        "speculative_generation": _hybrid_pipeline.speculation_stats() if _hybrid_pipeline else None,
+        "generated_image_store": generated_image_store.stats()
     }
 
 
@@ -98,7 +232,9 @@ async def analyze_menu(
     enable_image_generation: Optional[bool] = Form(None),
     enable_rag_pipeline: Optional[bool] = Form(None),
     image_verify_threshold: Optional[float] = Form(None),
-    generation_model: Optional[str] = Form(None)
+    image_verifier_backend: Optional[str] = Form(None),
+    generation_model: Optional[str] = Form(None),
+    enable_tiling: Optional[bool] = Form(None)
 ) -> MenuResponse:
     """
     分析菜单图片并获取图片
@@ -112,17 +248,14 @@ async def analyze_menu(
         contents = await file.read()
         
         # 3. 验证图片格式和大小
-        is_valid, error_msg = validate_image(contents)
+        is_valid, error_msg = await image_workers.run(validate_image, contents)
         if not is_valid:
             raise ValueError(error_msg)
         
-        # 4. 转换为 Base64
-        base64_image = encode_image_to_base64(contents)
-        
-        # 5. 调用 Gemini 分析菜品 (传入 target_language 和 source_currency)
+        # 4. 调用 Gemini 分析菜品 (传入 target_language 和 source_currency，优先命中缓存)
         logger.info(f"🔍 Analyzing menu from file: {file.filename} in {target_language} (Currency: {source_currency})")
-        dishes = await gemini_analyzer.analyze_menu_image(
-            base64_image=base64_image,
+        dishes, analysis_meta = await menu_analysis.analyze(
+            contents,
             target_language=target_language,
             source_currency=source_currency,
             llm_model=llm_model,
@@ -130,23 +263,147 @@ async def analyze_menu(
             llm_base_url=llm_base_url,
             llm_temperature=llm_temperature,
             llm_timeout=llm_timeout,
+            enable_tiling=_resolve_bool_override(enable_tiling, settings.ENABLE_MENU_TILING),
         )
         
         if not dishes:
             return MenuResponse(
                 success=True,
                 dishes=[],
-                metadata={"message": "No dishes detected in the image"}
+                metadata={"message": "No dishes detected in the image", **analysis_meta}
             )
         
-        # 6. 使用 RAG Pipeline 获取图片
+        # 5. 使用 RAG Pipeline 获取图片
         logger.info(f"🚀 RAG Pipeline: Processing {len(dishes)} dishes")
         rag_pipeline_enabled = _resolve_bool_override(enable_rag_pipeline, settings.ENABLE_RAG_PIPELINE)
+        enriched_dishes = await _enrich_with_images(
+            dishes,
+            rag_pipeline_enabled,
+            serpapi_key=serpapi_key,
+            search_candidate_results=search_candidate_results,
+            llm_api_key=llm_api_key,
+            llm_base_url=llm_base_url,
+            llm_model=llm_model,
+            llm_temperature=llm_temperature,
+            llm_timeout=llm_timeout,
+            generation_api_key=generation_api_key,
+            generation_model=generation_model,
+            enable_image_generation=enable_image_generation,
+            image_verify_threshold=image_verify_threshold,
+            image_verifier_backend=image_verifier_backend
+        )
         
-        if rag_pipeline_enabled and _hybrid_pipeline:
-            # 使用新的混合 Pipeline
-            enriched_dishes = await _hybrid_pipeline.enrich_dishes_with_images(
+        logger.info(f"✅ Successfully processed menu with {len(enriched_dishes)} dishes")
+        
+        return MenuResponse(
+            success=True,
+            dishes=enriched_dishes,
+            metadata={
+                "total_dishes": len(enriched_dishes),
+                "filename": file.filename,
+                "rag_pipeline": rag_pipeline_enabled,
+                "language": target_language,
+                **analysis_meta
+            }
+        )
+        
+    except ValueError as e:
+        logger.error(f"❌ Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.post("/api/analyze-menus", response_model=MenuResponse)
+async def analyze_menus(
+    files: List[UploadFile] = File(...),
+    target_language: str = Form("English"),
+    source_currency: Optional[str] = Form(None),
+    llm_model: Optional[str] = Form(None),
+    llm_api_key: Optional[str] = Form(None),
+    llm_base_url: Optional[str] = Form(None),
+    llm_temperature: Optional[float] = Form(None),
+    llm_timeout: Optional[int] = Form(None),
+    serpapi_key: Optional[str] = Form(None),
+    search_candidate_results: Optional[int] = Form(None),
+    generation_api_key: Optional[str] = Form(None),
+    enable_image_generation: Optional[bool] = Form(None),
+    enable_rag_pipeline: Optional[bool] = Form(None),
+    image_verify_threshold: Optional[float] = Form(None),
+    image_verifier_backend: Optional[str] = Form(None),
+    generation_model: Optional[str] = Form(None),
+    enable_tiling: Optional[bool] = Form(None)
+) -> MenuResponse:
+    """
+    多页菜单批量分析：并行校验与识别所有页面，跨页去重后只跑一次图片 Pipeline
+    """
+    try:
+        if not files:
+            raise ValueError("At least one file is required")
+        if len(files) > settings.MAX_MENU_PAGES:
+            raise ValueError(f"Too many files (max {settings.MAX_MENU_PAGES} pages)")
+        for file in files:
+            if not file.content_type or not file.content_type.startswith("image/"):
+                raise ValueError(f"File must be an image: {file.filename}")
+
+        # 1. 并行读取和验证所有页面
+        page_contents = [await file.read() for file in files]
+        validations = await asyncio.gather(
+            *[image_workers.run(validate_image, contents) for contents in page_contents]
+        )
+        for file, (is_valid, error_msg) in zip(files, validations):
+            if not is_valid:
+                raise ValueError(f"{file.filename}: {error_msg}")
+
+        # 2. 在共享并发上限下并行识别各页
+        logger.info(f"🔍 Analyzing {len(files)} menu pages in {target_language} (Currency: {source_currency})")
+        semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_MENU_PAGES)
+
+        async def analyze_page(contents: bytes) -> Tuple[List[Dish], dict]:
+            async with semaphore:
+                return await menu_analysis.analyze(
+                    contents,
+                    target_language=target_language,
+                    source_currency=source_currency,
+                    llm_model=llm_model,
+                    llm_api_key=llm_api_key,
+                    llm_base_url=llm_base_url,
+                    llm_temperature=llm_temperature,
+                    llm_timeout=llm_timeout,
+                    enable_tiling=_resolve_bool_override(enable_tiling, settings.ENABLE_MENU_TILING),
+                )
+
+        results = await asyncio.gather(
+            *[analyze_page(contents) for contents in page_contents],
+            return_exceptions=True
+        )
+
+        page_dishes = []
+        pages_meta = []
+        for file, result in zip(files, results):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️  Failed to analyze page {file.filename}: {str(result)}")
+                pages_meta.append({"filename": file.filename, "error": str(result)})
+                continue
+            dishes, analysis_meta = result
+            page_dishes.append(dishes)
+            pages_meta.append({"filename": file.filename, "dishes": len(dishes), **analysis_meta})
+
+        if not page_dishes:
+            first_error = next(r for r in results if isinstance(r, Exception))
+            raise first_error
+
+        # 3. 跨页合并去重
+        dishes = merge_dishes(page_dishes)
+        logger.info(f"📄 Merged {sum(len(d) for d in page_dishes)} dishes from {len(page_dishes)} pages into {len(dishes)}")
+
+        rag_pipeline_enabled = _resolve_bool_override(enable_rag_pipeline, settings.ENABLE_RAG_PIPELINE)
+        if dishes:
+            # 4. 单次 Pipeline 为所有页面的菜品获取图片
+            dishes = await _enrich_with_images(
                 dishes,
+                rag_pipeline_enabled,
                 serpapi_key=serpapi_key,
                 search_candidate_results=search_candidate_results,
                 llm_api_key=llm_api_key,
@@ -157,33 +414,24 @@ async def analyze_menu(
                 generation_api_key=generation_api_key,
                 generation_model=generation_model,
                 enable_image_generation=enable_image_generation,
-                image_verify_threshold=image_verify_threshold
-            )
-        else:
-            # 使用传统搜索（向后兼容）
-            if not _hybrid_pipeline:
-                logger.warning("⚠️  RAG Pipeline not initialized, using fallback search")
-            else:
-                logger.info("RAG Pipeline disabled in config, using legacy search")
-            enriched_dishes = await searcher.enrich_dishes_with_images(
-                dishes,
-                serpapi_key=serpapi_key,
-                search_candidate_results=search_candidate_results
+                image_verify_threshold=image_verify_threshold,
+                image_verifier_backend=image_verifier_backend
             )
-        
-        logger.info(f"✅ Successfully processed menu with {len(enriched_dishes)} dishes")
-        
+
+        logger.info(f"✅ Successfully processed {len(files)} menu pages with {len(dishes)} dishes")
+
         return MenuResponse(
             success=True,
-            dishes=enriched_dishes,
+            dishes=dishes,
             metadata={
-                "total_dishes": len(enriched_dishes),
-                "filename": file.filename,
+                "total_dishes": len(dishes),
+                "total_pages": len(files),
+                "pages": pages_meta,
                 "rag_pipeline": rag_pipeline_enabled,
                 "language": target_language
             }
         )
-        
+
     except ValueError as e:
         logger.error(f"❌ Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -208,7 +456,9 @@ async def analyze_text_only(
     enable_image_generation: Optional[bool] = Form(None),
     enable_rag_pipeline: Optional[bool] = Form(None),
     image_verify_threshold: Optional[float] = Form(None),
-    generation_model: Optional[str] = Form(None)
+    image_verifier_backend: Optional[str] = Form(None),
+    generation_model: Optional[str] = Form(None),
+    enable_tiling: Optional[bool] = Form(None)
 ) -> MenuResponse:
     """
     第一阶段：仅分析文本（快速响应）
@@ -218,15 +468,13 @@ async def analyze_text_only(
             raise ValueError("File must be an image")
         
         contents = await file.read()
-        is_valid, error_msg = validate_image(contents)
+        is_valid, error_msg = await image_workers.run(validate_image, contents)
         if not is_valid:
             raise ValueError(error_msg)
         
-        base64_image = encode_image_to_base64(contents)
-        
         logger.info(f"🔍 Analyzing text only from file: {file.filename} in {target_language} (Currency: {source_currency})")
-        dishes = await gemini_analyzer.analyze_menu_image(
-            base64_image=base64_image,
+        dishes, analysis_meta = await menu_analysis.analyze(
+            contents,
             target_language=target_language,
             source_currency=source_currency,
             llm_model=llm_model,
@@ -234,6 +482,7 @@ async def analyze_text_only(
             llm_base_url=llm_base_url,
             llm_temperature=llm_temperature,
             llm_timeout=llm_timeout,
+            enable_tiling=_resolve_bool_override(enable_tiling, settings.ENABLE_MENU_TILING),
         )
         
         return MenuResponse(
@@ -243,7 +492,8 @@ async def analyze_text_only(
                 "total_dishes": len(dishes),
                 "filename": file.filename,
                 "mode": "text_only",
-                "language": target_language
+                "language": target_language,
+                **analysis_meta
             }
         )
     except ValueError as e:
@@ -254,6 +504,208 @@ async def analyze_text_only(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/api/analyze-menu-stream")
+async def analyze_menu_stream(
+    file: UploadFile = File(...),
+    target_language: str = Form("English"),
+    source_currency: Optional[str] = Form(None),
+    llm_model: Optional[str] = Form(None),
+    llm_api_key: Optional[str] = Form(None),
+    llm_base_url: Optional[str] = Form(None),
+    llm_temperature: Optional[float] = Form(None),
+    llm_timeout: Optional[int] = Form(None),
+    stream_format: str = Form("ndjson")
+) -> StreamingResponse:
+    """
+    流式识别菜单文本：每个菜品在模型输出中闭合后立即推送
+
+    事件（NDJSON 每行一个，或 stream_format=sse 时为 SSE 帧）：
+    - {"type": "dish", "dish": {...}}
+    - {"type": "done", "metadata": {...}}
+    - {"type": "error", "error": "..."}
+    """
+    try:
+        if not file.content_type.startswith("image/"):
+            raise ValueError("File must be an image")
+        if stream_format not in ("ndjson", "sse"):
+            raise ValueError("stream_format must be 'ndjson' or 'sse'")
+
+        contents = await file.read()
+        is_valid, error_msg = await image_workers.run(validate_image, contents)
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        prepared = await menu_analysis.prepare(contents, target_language, source_currency, llm_model)
+    except ValueError as e:
+        logger.error(f"❌ Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    logger.info(f"🔍 Streaming menu analysis from file: {file.filename} in {target_language} (Currency: {source_currency})")
+
+    async def event_stream():
+        total = 0
+        start_time = time.time()
+        first_dish_seconds = None
+        try:
+            async for dish in menu_analysis.stream(
+                prepared,
+                target_language=target_language,
+                source_currency=source_currency,
+                llm_model=llm_model,
+                llm_api_key=llm_api_key,
+                llm_base_url=llm_base_url,
+                llm_temperature=llm_temperature,
+                llm_timeout=llm_timeout,
+            ):
+                if first_dish_seconds is None:
+                    first_dish_seconds = round(time.time() - start_time, 3)
+                total += 1
+                yield _encode_stream_event({"type": "dish", "dish": dish.model_dump()}, stream_format)
+
+            yield _encode_stream_event({
+                "type": "done",
+                "metadata": {
+                    "total_dishes": total,
+                    "filename": file.filename,
+                    "mode": "text_stream",
+                    "language": target_language,
+                    "time_to_first_dish": first_dish_seconds,
+                    **prepared.meta
+                }
+            }, stream_format)
+        except Exception as e:
+            logger.error(f"❌ Streaming analysis error: {str(e)}")
+            yield _encode_stream_event({"type": "error", "error": str(e)}, stream_format)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type=_stream_media_type(stream_format),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/analyze-menu-progressive")
+async def analyze_menu_progressive(
+    file: UploadFile = File(...),
+    target_language: str = Form("English"),
+    source_currency: Optional[str] = Form(None),
+    llm_model: Optional[str] = Form(None),
+    llm_api_key: Optional[str] = Form(None),
+    llm_base_url: Optional[str] = Form(None),
+    llm_temperature: Optional[float] = Form(None),
+    llm_timeout: Optional[int] = Form(None),
+    serpapi_key: Optional[str] = Form(None),
+    search_candidate_results: Optional[int] = Form(None),
+    generation_api_key: Optional[str] = Form(None),
+    enable_image_generation: Optional[bool] = Form(None),
+    enable_rag_pipeline: Optional[bool] = Form(None),
+    image_verify_threshold: Optional[float] = Form(None),
+    image_verifier_backend: Optional[str] = Form(None),
+    generation_model: Optional[str] = Form(None),
+    enable_tiling: Optional[bool] = Form(None),
+    stream_format: str = Form("sse")
+) -> StreamingResponse:
+    """
+    渐进式分析菜单：先推送纯文本菜品列表，再按完成顺序推送每个菜品的图片
+
+    替代前端逐个调用 /api/search-dish-image，一个连接内完成全部图片加载。
+
+    事件（默认 SSE 帧，stream_format=ndjson 时每行一个）：
+    - {"type": "dishes", "dishes": [...], "metadata": {...}}
+    - {"type": "images", "index": 0, "id": ..., "image_url": ..., "image_urls": [...], "image_scores": [...], "match_score": ...}
+    - {"type": "done", "metadata": {...}}
+    - {"type": "error", "error": "..."}
+    """
+    try:
+        if not file.content_type.startswith("image/"):
+            raise ValueError("File must be an image")
+        if stream_format not in ("ndjson", "sse"):
+            raise ValueError("stream_format must be 'ndjson' or 'sse'")
+
+        contents = await file.read()
+        is_valid, error_msg = await image_workers.run(validate_image, contents)
+        if not is_valid:
+            raise ValueError(error_msg)
+    except ValueError as e:
+        logger.error(f"❌ Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    logger.info(f"🔍 Progressive menu analysis from file: {file.filename} in {target_language} (Currency: {source_currency})")
+    rag_pipeline_enabled = _resolve_bool_override(enable_rag_pipeline, settings.ENABLE_RAG_PIPELINE)
+
+    async def event_stream():
+        start_time = time.time()
+        try:
+            dishes, analysis_meta = await menu_analysis.analyze(
+                contents,
+                target_language=target_language,
+                source_currency=source_currency,
+                llm_model=llm_model,
+                llm_api_key=llm_api_key,
+                llm_base_url=llm_base_url,
+                llm_temperature=llm_temperature,
+                llm_timeout=llm_timeout,
+                enable_tiling=_resolve_bool_override(enable_tiling, settings.ENABLE_MENU_TILING),
+            )
+            yield _encode_stream_event({
+                "type": "dishes",
+                "dishes": [dish.model_dump() for dish in dishes],
+                "metadata": {
+                    "total_dishes": len(dishes),
+                    "filename": file.filename,
+                    "language": target_language,
+                    "time_to_dishes": round(time.time() - start_time, 3),
+                    **analysis_meta
+                }
+            }, stream_format)
+
+            with_images = 0
+            async for index, dish in _iter_enriched_dishes(
+                dishes,
+                rag_pipeline_enabled,
+                serpapi_key=serpapi_key,
+                search_candidate_results=search_candidate_results,
+                llm_api_key=llm_api_key,
+                llm_base_url=llm_base_url,
+                llm_model=llm_model,
+                llm_temperature=llm_temperature,
+                llm_timeout=llm_timeout,
+                generation_api_key=generation_api_key,
+                generation_model=generation_model,
+                enable_image_generation=enable_image_generation,
+                image_verify_threshold=image_verify_threshold,
+                image_verifier_backend=image_verifier_backend
+            ):
+                if dish.image_urls:
+                    with_images += 1
+                yield _encode_stream_event(_dish_images_event(index, dish), stream_format)
+
+            yield _encode_stream_event({
+                "type": "done",
+                "metadata": {
+                    "total_dishes": len(dishes),
+                    "dishes_with_images": with_images,
+                    "rag_pipeline": rag_pipeline_enabled,
+                    "total_time": round(time.time() - start_time, 3)
+                }
+            }, stream_format)
+        except Exception as e:
+            logger.error(f"❌ Progressive analysis error: {str(e)}")
+            yield _encode_stream_event({"type": "error", "error": str(e)}, stream_format)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type=_stream_media_type(stream_format),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/api/search-dish-image", response_model=MenuResponse)
 async def search_dish_image(request: Union[Dish, SearchDishImageRequest]) -> MenuResponse:
     """
@@ -274,6 +726,7 @@ async def search_dish_image(request: Union[Dish, SearchDishImageRequest]) -> Men
             enable_image_generation = request.enable_image_generation
             enable_rag_pipeline = request.enable_rag_pipeline
             image_verify_threshold = request.image_verify_threshold
+            image_verifier_backend = request.image_verifier_backend
         else:
             dish = request
             serpapi_key = None
@@ -288,6 +741,7 @@ async def search_dish_image(request: Union[Dish, SearchDishImageRequest]) -> Men
             enable_image_generation = None
             enable_rag_pipeline = None
             image_verify_threshold = None
+            image_verifier_backend = None
 
         logger.info(f"🔍 Searching images for dish: {dish.english_name}")
         rag_pipeline_enabled = _resolve_bool_override(enable_rag_pipeline, settings.ENABLE_RAG_PIPELINE)
@@ -305,7 +759,8 @@ async def search_dish_image(request: Union[Dish, SearchDishImageRequest]) -> Men
                 generation_api_key=generation_api_key,
                 generation_model=generation_model,
                 enable_image_generation=enable_image_generation,
-                image_verify_threshold=image_verify_threshold
+                image_verify_threshold=image_verify_threshold,
+                image_verifier_backend=image_verifier_backend
             )
         else:
             enriched_dishes = await searcher.enrich_dishes_with_images(
@@ -328,6 +783,85 @@ async def search_dish_image(request: Union[Dish, SearchDishImageRequest]) -> Men
         )
 
 
+@app.post("/api/search-dish-images")
+async def search_dish_images(request: SearchDishImagesRequest):
+    """
+    批量为菜品搜索图片：一次请求、一组覆盖配置、一次 Pipeline 调度
+    （本请求最多同时处理 MAX_CONCURRENT_DISHES_PER_REQUEST 个菜品，所有批量请求合计受 MAX_CONCURRENT_DISH_PIPELINES 约束）
+
+    stream=true 时按完成顺序推送 images 事件，最后推送 done；否则返回完整的 MenuResponse。
+    """
+    if not request.dishes:
+        raise HTTPException(status_code=400, detail="At least one dish is required")
+    if len(request.dishes) > settings.MAX_BATCH_DISHES:
+        raise HTTPException(status_code=400, detail=f"Too many dishes (max {settings.MAX_BATCH_DISHES})")
+    if request.stream and request.stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream_format must be 'ndjson' or 'sse'")
+
+    dishes = request.dishes
+    logger.info(f"🔍 Batch searching images for {len(dishes)} dishes")
+    rag_pipeline_enabled = _resolve_bool_override(request.enable_rag_pipeline, settings.ENABLE_RAG_PIPELINE)
+    pipeline_overrides = dict(
+        serpapi_key=request.serpapi_key,
+        search_candidate_results=request.search_candidate_results,
+        llm_api_key=request.llm_api_key,
+        llm_base_url=request.llm_base_url,
+        llm_model=request.llm_model,
+        llm_temperature=request.llm_temperature,
+        llm_timeout=request.llm_timeout,
+        generation_api_key=request.generation_api_key,
+        generation_model=request.generation_model,
+        enable_image_generation=request.enable_image_generation,
+        image_verify_threshold=request.image_verify_threshold,
+        image_verifier_backend=request.image_verifier_backend,
+        max_concurrency=settings.MAX_CONCURRENT_DISHES_PER_REQUEST
+    )
+
+    if not request.stream:
+        try:
+            enriched_dishes = await _enrich_with_images(dishes, rag_pipeline_enabled, **pipeline_overrides)
+            return MenuResponse(
+                success=True,
+                dishes=enriched_dishes,
+                metadata={"mode": "batch_dish_search", "total_dishes": len(enriched_dishes)}
+            )
+        except Exception as e:
+            logger.error(f"❌ Batch search error: {str(e)}")
+            return MenuResponse(
+                success=True,
+                dishes=dishes,
+                metadata={"mode": "batch_dish_search", "error": str(e)}
+            )
+
+    async def event_stream():
+        start_time = time.time()
+        with_images = 0
+        try:
+            async for index, dish in _iter_enriched_dishes(dishes, rag_pipeline_enabled, **pipeline_overrides):
+                if dish.image_urls:
+                    with_images += 1
+                yield _encode_stream_event(_dish_images_event(index, dish), request.stream_format)
+
+            yield _encode_stream_event({
+                "type": "done",
+                "metadata": {
+                    "mode": "batch_dish_search",
+                    "total_dishes": len(dishes),
+                    "dishes_with_images": with_images,
+                    "total_time": round(time.time() - start_time, 3)
+                }
+            }, request.stream_format)
+        except Exception as e:
+            logger.error(f"❌ Batch search error: {str(e)}")
+            yield _encode_stream_event({"type": "error", "error": str(e)}, request.stream_format)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type=_stream_media_type(request.stream_format),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/api/menu-chat", response_model=ChatResponse)
 async def menu_chat(request: ChatRequest) -> ChatResponse:
     """
@@ -414,6 +948,23 @@ async def proxy_image_endpoint(url: str, retry: int = 3):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.get("/api/generated-images/{filename}")
+async def generated_image_endpoint(filename: str):
+    """
+    本地存储的生成图片（内容寻址，文件名即内容哈希，可永久缓存）
+    """
+    path = generated_image_store.path_for(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Generated image not found")
+    return FileResponse(
+        path,
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Content-Disposition": "inline",
+        }
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=settings.BACKEND_HOST, port=settings.BACKEND_PORT)
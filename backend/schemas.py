@@ -103,3 +103,27 @@ class SearchDishImageRequest(BaseModel):
     enable_image_generation: Optional[bool] = Field(None, description="是否启用图片生成降级")
     enable_rag_pipeline: Optional[bool] = Field(None, description="是否启用 RAG Pipeline")
     image_verify_threshold: Optional[float] = Field(None, description="图片验证阈值 (0-1)")
+    image_verifier_backend: Optional[str] = Field(None, description="图片验证后端：llm、local 或 cascade")
+
+
+class SearchDishImagesRequest(BaseModel):
+    """批量菜品图片搜索请求（共享一组运行时覆盖配置）"""
+    dishes: List[Dish] = Field(..., description="需要搜索图片的菜品列表")
+    serpapi_key: Optional[str] = Field(None, description="运行时覆盖 SerpAPI Key")
+    search_candidate_results: Optional[int] = Field(
+        None,
+        description="候选图片数量（1-10）"
+    )
+    llm_api_key: Optional[str] = Field(None, description="运行时覆盖 LLM API Key")
+    llm_base_url: Optional[str] = Field(None, description="运行时覆盖 LLM Base URL")
+    llm_model: Optional[str] = Field(None, description="运行时覆盖 LLM Model")
+    llm_temperature: Optional[float] = Field(None, description="运行时覆盖 LLM Temperature")
+    llm_timeout: Optional[int] = Field(None, description="运行时覆盖 LLM Timeout")
+    generation_api_key: Optional[str] = Field(None, description="运行时覆盖图片生成 API Key")
+    generation_model: Optional[str] = Field(None, description="运行时覆盖图片生成模型")
+    enable_image_generation: Optional[bool] = Field(None, description="是否启用图片生成降级")
+    enable_rag_pipeline: Optional[bool] = Field(None, description="是否启用 RAG Pipeline")
+    image_verify_threshold: Optional[float] = Field(None, description="图片验证阈值 (0-1)")
+    image_verifier_backend: Optional[str] = Field(None, description="图片验证后端：llm、local 或 cascade")
+    stream: bool = Field(False, description="是否按完成顺序流式返回每个菜品的图片")
+    stream_format: str = Field("ndjson", description="流式格式：ndjson 或 sse")
@@ -0,0 +1,70 @@
+"""菜单分析结果缓存 - 按上传内容 SHA-256 寻址"""
+
+import logging
+from typing import List, Optional
+
+from schemas import Dish
+from config import settings
+from utils.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+
+class MenuAnalysisCache:
+    """
+    缓存 analyze_menu_image 的识别结果
+
+    键 = SHA-256(上传字节) + target_language + source_currency + model + 识别方式（整图 / 切片），
+    同一张菜单重复上传（刷新、切换语言后切回、分享链接）时直接返回，无需再次调用视觉模型。
+    只缓存文本识别结果（不含图片），命中后图片 Pipeline 照常执行。
+    """
+
+    def __init__(self):
+        self.enabled = settings.ANALYSIS_CACHE_ENABLED
+        self._cache = TieredCache(
+            namespace="menu_analysis",
+            max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+            ttl=settings.ANALYSIS_CACHE_TTL,
+            db_path=settings.CACHE_DB_PATH or None,
+            disk_max_entries=settings.ANALYSIS_CACHE_DISK_MAX_ENTRIES,
+            purge_every=settings.CACHE_PURGE_EVERY_WRITES,
+        )
+
+    @staticmethod
+    def build_key(
+        digest: str,
+        target_language: str,
+        source_currency: Optional[str],
+        model: str,
+        mode: str = "whole",
+    ) -> str:
+        """构造缓存键（digest 为上传内容的 SHA-256 十六进制摘要，mode 为 "whole" / "tiled"）"""
+        language = (target_language or "").strip().lower()
+        currency = (source_currency or "").strip().upper()
+        return f"{digest}:{language}:{currency}:{model}:{mode}"
+
+    async def get(self, key: str) -> Optional[List[Dish]]:
+        """命中时返回新的 Dish 列表（调用方可自由修改），未命中返回 None"""
+        if not self.enabled:
+            return None
+        data = await self._cache.get(key)
+        if data is None:
+            return None
+        try:
+            return [Dish.model_validate(item) for item in data]
+        except Exception as e:
+            logger.warning(f"Discarding corrupt analysis cache entry: {str(e)}")
+            await self._cache.delete(key)
+            return None
+
+    async def set(self, key: str, dishes: List[Dish]) -> None:
+        if not self.enabled:
+            return
+        await self._cache.set(key, [dish.model_dump() for dish in dishes])
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, **self._cache.stats()}
+
+
+# 全局实例
+analysis_cache = MenuAnalysisCache()
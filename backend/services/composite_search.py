@@ -0,0 +1,166 @@
+"""多搜索源组合 - 并发竞速或延迟对冲，首个有效结果胜出"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from .serp_search import serp_searcher
+from .search_service import google_searcher
+from .image_candidates import ImageCandidate
+
+logger = logging.getLogger(__name__)
+
+# 对候选图片做校验（预筛选、存活检查），返回可用的候选
+CandidateValidator = Callable[[List[ImageCandidate]], Awaitable[List[ImageCandidate]]]
+
+SEARCH_PROVIDERS = {
+    "serpapi": serp_searcher,
+    "google": google_searcher,
+}
+
+
+class CompositeSearcher:
+    """
+    组合多个搜索源，降低单个搜索源变慢时的尾延迟
+
+    - race：同时查询所有搜索源
+    - hedge：先查询首选搜索源，hedge_delay 秒内没有可用结果再查询下一个
+
+    返回第一个非空（且通过 validate 校验）的结果集，其余请求被取消。
+    被取消的请求若已发出，结果仍会写入搜索缓存，不会浪费配额。
+    """
+
+    def __init__(self, providers: List[Tuple[str, object]], mode: str = "race", hedge_delay: float = 1.5):
+        self.providers = providers
+        self.mode = mode
+        self.hedge_delay = hedge_delay
+        self.wins: Dict[str, int] = {name: 0 for name, _ in providers}
+        self.hedges = 0
+        self.empty = 0
+
+    @property
+    def primary(self):
+        return self.providers[0][1]
+
+    async def _search_one(
+        self,
+        searcher,
+        query: str,
+        num: int,
+        api_key: Optional[str],
+        validate: Optional[CandidateValidator]
+    ) -> List[ImageCandidate]:
+        candidates = await searcher.search_candidates(query, num=num, api_key=api_key)
+        if candidates and validate is not None:
+            candidates = await validate(candidates)
+        return candidates
+
+    async def search_images(
+        self,
+        query: str,
+        num: int = 3,
+        api_key: Optional[str] = None
+    ) -> List[str]:
+        """按 mode 查询各搜索源，返回首个非空结果的 URL"""
+        candidates = await self.search_candidates(query, num=num, api_key=api_key)
+        return [candidate.url for candidate in candidates]
+
+    async def search_candidates(
+        self,
+        query: str,
+        num: int = 3,
+        api_key: Optional[str] = None,
+        validate: Optional[CandidateValidator] = None
+    ) -> List[ImageCandidate]:
+        """
+        按 mode 查询各搜索源，返回首个可用的候选列表
+
+        Args:
+            validate: 可选的 URL 校验，传入时以校验后的结果判断是否“可用”
+        """
+        tasks: Dict[asyncio.Task, str] = {}
+        pending = set()
+        next_index = 0
+
+        def start_next() -> None:
+            nonlocal next_index
+            name, searcher = self.providers[next_index]
+            next_index += 1
+            task = asyncio.create_task(self._search_one(searcher, query, num, api_key, validate))
+            tasks[task] = name
+            pending.add(task)
+
+        for _ in range(len(self.providers) if self.mode == "race" else 1):
+            start_next()
+
+        try:
+            while pending or next_index < len(self.providers):
+                # 已启动的搜索源都没有可用结果：立即启动下一个
+                if not pending:
+                    start_next()
+                    continue
+
+                timeout = self.hedge_delay if next_index < len(self.providers) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 超过对冲延迟仍无结果：追加下一个搜索源
+                    self.hedges += 1
+                    start_next()
+                    continue
+
+                for task in done:
+                    pending.discard(task)
+                    name = tasks[task]
+                    try:
+                        candidates = task.result()
+                    except Exception as e:
+                        logger.warning(f"Search provider {name} failed for '{query}': {str(e)}")
+                        continue
+                    if candidates:
+                        self.wins[name] += 1
+                        logger.debug(f"Search provider {name} won for '{query}'")
+                        return candidates
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self.empty += 1
+        return []
+
+    async def enrich_dishes_with_images(
+        self,
+        dishes: List,
+        serpapi_key: Optional[str] = None,
+        search_candidate_results: Optional[int] = None
+    ) -> List:
+        """传统模式（向后兼容）：使用首选搜索源"""
+        return await self.primary.enrich_dishes_with_images(
+            dishes,
+            serpapi_key=serpapi_key,
+            search_candidate_results=search_candidate_results
+        )
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "providers": [name for name, _ in self.providers],
+            "hedge_delay": self.hedge_delay,
+            "wins": dict(self.wins),
+            "hedges": self.hedges,
+            "empty": self.empty,
+        }
+
+
+def build_composite_searcher() -> Optional[CompositeSearcher]:
+    """根据 SEARCH_RACE_MODE 构建组合搜索；未启用时返回 None"""
+    mode = settings.SEARCH_RACE_MODE.strip().lower()
+    if mode not in ("race", "hedge"):
+        return None
+    primary = settings.SEARCH_PROVIDER if settings.SEARCH_PROVIDER in SEARCH_PROVIDERS else "google"
+    names = [primary] + [name for name in SEARCH_PROVIDERS if name != primary]
+    return CompositeSearcher(
+        [(name, SEARCH_PROVIDERS[name]) for name in names],
+        mode=mode,
+        hedge_delay=settings.SEARCH_HEDGE_DELAY,
+    )
@@ -0,0 +1,204 @@
+"""生成图片持久化 - 内容寻址的本地文件存储 + 按菜品身份索引，相同菜品直接复用"""
+
+import asyncio
+import base64
+import logging
+import os
+import re
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from schemas import Dish
+from config import settings
+from utils.cache import TieredCache
+from utils.dish_utils import normalize_dish_name
+from utils.file_utils import sha256_hexdigest
+from .http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+# 存储文件名：<sha256>.<扩展名>，服务端点只接受这种格式（防止路径穿越）
+_FILENAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.(png|jpg|webp)$")
+
+
+def _image_extension(data: bytes) -> Optional[str]:
+    """按文件头识别图片格式"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class GeneratedImageStore:
+    """
+    生成图片的本地持久化存储
+
+    提供方返回的临时 URL 很快失效，且每次为同一菜品重新生成 HD 图片又慢又贵。
+    生成结果（b64_json 或临时 URL）落盘为 <sha256>.<ext>，经 /api/generated-images/ 端点提供；
+    索引 = (生成模型, 归一化 original_name, 归一化 english_name) -> 文件名，存于 TieredCache（配置 CACHE_DB_PATH 时持久化），
+    之后任何菜单中出现同一菜品都直接返回已存储的图片。
+    同一菜品、同一模型的并发生成合并为一次；所有等待方都放弃时取消生成。
+    """
+
+    def __init__(self):
+        self.enabled = settings.GENERATED_IMAGE_STORE_ENABLED
+        self.directory = settings.GENERATED_IMAGE_DIR
+        self._index = TieredCache(
+            namespace="generated_images",
+            max_entries=settings.GENERATED_IMAGE_INDEX_MAX_ENTRIES,
+            ttl=settings.GENERATED_IMAGE_TTL,
+            db_path=settings.CACHE_DB_PATH or None,
+            disk_max_entries=settings.CACHE_DISK_MAX_ENTRIES,
+            purge_every=settings.CACHE_PURGE_EVERY_WRITES,
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.hits = 0
+        self.stored = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def dish_key(dish: Dish, model: str) -> str:
+        return f"{model}:{normalize_dish_name(dish.original_name)}:{normalize_dish_name(dish.english_name)}"
+
+    @staticmethod
+    def public_url(filename: str) -> str:
+        return f"{settings.GENERATED_IMAGE_BASE_URL.rstrip('/')}/api/generated-images/{filename}"
+
+    def path_for(self, filename: str) -> Optional[str]:
+        """服务端点使用：合法且存在的文件返回路径，否则返回 None"""
+        if not _FILENAME_PATTERN.match(filename):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+    async def lookup(self, dish: Dish, model: str) -> Optional[str]:
+        """已存储过该模型为该菜品生成的图片时返回其本地 URL"""
+        key = self.dish_key(dish, model)
+        filename = await self._index.get(key)
+        if filename is None:
+            return None
+        if self.path_for(filename) is None:
+            # 文件被清理：作废索引，重新生成
+            await self._index.delete(key)
+            return None
+        self.hits += 1
+        return self.public_url(filename)
+
+    async def get_or_generate(
+        self,
+        dish: Dish,
+        model: str,
+        generate: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        返回菜品的生成图片：优先复用已存储的图片，否则调用 generate 生成并落盘
+
+        generate 返回提供方的图片引用（http(s) URL 或 data URL）。落盘失败时退回该引用。
+        """
+        if not self.enabled:
+            return await generate()
+
+        stored_url = await self.lookup(dish, model)
+        if stored_url is not None:
+            logger.info(f"♻️  Reusing stored generated image for {dish.english_name}")
+            return stored_url
+
+        key = self.dish_key(dish, model)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate_and_store(dish, key, generate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield 只保护仍有其他调用方在等待的生成；最后一个调用方被取消（如推测式生成被丢弃）时
+        # 连同生成请求一起取消，不为没人要的图片付费
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+                self.cancelled += 1
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if self._waiters[key] == 0:
+                del self._waiters[key]
+
+    async def _generate_and_store(
+        self,
+        dish: Dish,
+        key: str,
+        generate: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        image_ref = await generate()
+        if not image_ref:
+            return None
+        data = await self._load_image_ref(image_ref)
+        if data is None:
+            return image_ref
+        extension = _image_extension(data)
+        if extension is None:
+            logger.warning(f"Generated image for {dish.english_name} has unknown format, not storing")
+            return image_ref
+
+        digest = await asyncio.to_thread(sha256_hexdigest, data)
+        filename = f"{digest}.{extension}"
+        try:
+            await asyncio.to_thread(self._write_file, filename, data)
+        except OSError as e:
+            logger.warning(f"Failed to store generated image for {dish.english_name}: {str(e)}")
+            return image_ref
+        await self._index.set(key, filename)
+        self.stored += 1
+        logger.info(f"💾 Stored generated image for {dish.english_name} ({len(data)} bytes)")
+        return self.public_url(filename)
+
+    def _write_file(self, filename: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, filename)
+        if os.path.exists(path):
+            return
+        # 先写临时文件再原子替换，避免端点读到写了一半的文件
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    async def _load_image_ref(self, image_ref: str) -> Optional[bytes]:
+        """读取生成结果：data URL 直接解码，http(s) URL 通过共享 session 下载"""
+        if image_ref.startswith("data:"):
+            try:
+                return base64.b64decode(image_ref.split(",", 1)[1])
+            except (IndexError, ValueError):
+                return None
+        try:
+            timeout = aiohttp.ClientTimeout(total=settings.GENERATED_IMAGE_DOWNLOAD_TIMEOUT)
+            async with http_client.session.get(image_ref, timeout=timeout) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Failed to download generated image: HTTP {resp.status}")
+                    return None
+                return await resp.read()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.warning(f"Failed to download generated image: {str(e)}")
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "hits": self.hits,
+            "stored": self.stored,
+            "cancelled": self.cancelled,
+            "inflight": len(self._inflight),
+            "index": self._index.stats(),
+        }
+
+
+# 全局实例
+generated_image_store = GeneratedImageStore()
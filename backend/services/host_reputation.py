@@ -0,0 +1,233 @@
+"""图片主机信誉 - 按域名统计存活率、验证分数和延迟，用于候选预排序"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Set
+
+from config import settings
+from utils.cache import SQLiteStore, get_sqlite_store
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HostStats:
+    # 计数按指数衰减，均为浮点
+    probes: float = 0.0
+    alive: float = 0.0
+    probe_latency_sum: float = 0.0
+    verifications: float = 0.0
+    passed: float = 0.0
+    score_sum: float = 0.0
+    updated_at: float = 0.0
+
+    def decay(self, now: float, half_life: float) -> None:
+        """把所有计数衰减到 now：每经过一个半衰期，历史样本的权重减半"""
+        if half_life <= 0 or now <= self.updated_at:
+            self.updated_at = max(self.updated_at, now)
+            return
+        factor = 0.5 ** ((now - self.updated_at) / half_life)
+        self.probes *= factor
+        self.alive *= factor
+        self.probe_latency_sum *= factor
+        self.verifications *= factor
+        self.passed *= factor
+        self.score_sum *= factor
+        self.updated_at = now
+
+    @property
+    def samples(self) -> float:
+        return self.probes + self.verifications
+
+    @property
+    def alive_rate(self) -> float:
+        """平滑后的存活率（无数据时为 0.5）"""
+        return (self.alive + 1) / (self.probes + 2)
+
+    @property
+    def mean_score(self) -> float:
+        """平滑后的平均验证分数（无数据时为 0.5）"""
+        return (self.score_sum + 1.0) / (self.verifications + 2)
+
+    @property
+    def mean_latency(self) -> float:
+        return self.probe_latency_sum / self.probes if self.probes else 0.0
+
+
+class HostReputationStore:
+    """
+    按图片主机累计存活检查和视觉验证结果
+
+    同样的域名反复出现：有的几乎总能通过验证，有的（图库、Pinterest 跳转）几乎总是失败或超时。
+    信誉分 = 存活率 × 平均验证分数 - 延迟惩罚，在视觉验证前对候选排序和截断。
+    样本按 HOST_REPUTATION_HALF_LIFE 指数衰减，主机变好或变坏后信誉分随之更新。
+    统计保存在内存，定期写入 SQLite（配置 CACHE_DB_PATH 时），启动时恢复；
+    写盘时清理衰减后样本数低于 HOST_REPUTATION_MIN_SAMPLES 的主机，
+    主机数超过 HOST_REPUTATION_MAX_HOSTS 时按样本数从少到多淘汰。
+    """
+
+    NAMESPACE = "host_reputation"
+
+    def __init__(self):
+        self.enabled = settings.HOST_REPUTATION_ENABLED
+        self._hosts: Dict[str, HostStats] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.pruned = 0
+        self._disk: Optional[SQLiteStore] = None
+        if settings.CACHE_DB_PATH:
+            try:
+                self._disk = get_sqlite_store(settings.CACHE_DB_PATH)
+            except Exception as e:
+                logger.warning(f"Host reputation: disk persistence disabled ({str(e)})")
+
+    async def load(self) -> None:
+        """启动时从磁盘恢复统计"""
+        if not self.enabled or self._disk is None:
+            return
+        now = time.time()
+
+        def read():
+            self._disk.purge_expired(self.NAMESPACE, now)
+            return self._disk.items(self.NAMESPACE, now)
+
+        try:
+            rows = await asyncio.to_thread(read)
+        except Exception as e:
+            logger.warning(f"Failed to load host reputation: {str(e)}")
+            return
+        for host, raw in rows:
+            try:
+                stats = HostStats(**json.loads(raw))
+            except Exception:
+                continue
+            if not stats.updated_at:
+                # 旧格式记录没有更新时间，从现在开始衰减
+                stats.updated_at = now
+            self._hosts[host] = stats
+        logger.info(f"✅ Host reputation loaded ({len(self._hosts)} hosts)")
+
+    def score(self, host: str) -> float:
+        """信誉分，约 0-1；未见过的主机为 0.25"""
+        stats = self._hosts.get(host)
+        if stats is None:
+            return 0.25
+        stats.decay(time.time(), settings.HOST_REPUTATION_HALF_LIFE)
+        timeout = max(settings.IMAGE_URL_CHECK_TIMEOUT, 1)
+        latency_penalty = 0.1 * min(stats.mean_latency / timeout, 1.0)
+        return stats.alive_rate * stats.mean_score - latency_penalty
+
+    def _stats(self, host: str) -> HostStats:
+        """取出主机统计并衰减到当前时间"""
+        now = time.time()
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = HostStats(updated_at=now)
+            self._hosts[host] = stats
+        else:
+            stats.decay(now, settings.HOST_REPUTATION_HALF_LIFE)
+        return stats
+
+    def record_probe(self, host: str, alive: bool, latency: float) -> None:
+        if not self.enabled or not host:
+            return
+        stats = self._stats(host)
+        stats.probes += 1
+        stats.alive += float(alive)
+        stats.probe_latency_sum += latency
+        self._mark_dirty(host)
+
+    def record_verification(self, host: str, score: float, passed: bool) -> None:
+        if not self.enabled or not host:
+            return
+        stats = self._stats(host)
+        stats.verifications += 1
+        stats.passed += float(passed)
+        stats.score_sum += score
+        self._mark_dirty(host)
+
+    def _mark_dirty(self, host: str) -> None:
+        self._dirty.add(host)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(settings.HOST_REPUTATION_FLUSH_INTERVAL)
+        await self.flush()
+
+    def prune(self, now: float) -> Set[str]:
+        """衰减所有主机，移除样本过少的主机及超出数量上限的主机，返回被移除的主机"""
+        removed = set()
+        for host, stats in self._hosts.items():
+            stats.decay(now, settings.HOST_REPUTATION_HALF_LIFE)
+            if stats.samples < settings.HOST_REPUTATION_MIN_SAMPLES:
+                removed.add(host)
+        overflow = len(self._hosts) - len(removed) - settings.HOST_REPUTATION_MAX_HOSTS
+        if overflow > 0:
+            remaining = sorted(
+                (host for host in self._hosts if host not in removed),
+                key=lambda host: self._hosts[host].samples,
+            )
+            removed.update(remaining[:overflow])
+        for host in removed:
+            del self._hosts[host]
+        self.pruned += len(removed)
+        return removed
+
+    async def flush(self) -> None:
+        """清理样本过少的主机，并把变化的主机统计写入磁盘"""
+        if not self._dirty:
+            return
+        hosts, self._dirty = self._dirty, set()
+        now = time.time()
+        removed = self.prune(now)
+        if self._disk is None:
+            return
+        expires_at = now + settings.HOST_REPUTATION_TTL
+
+        def write():
+            for host in removed:
+                self._disk.delete(self.NAMESPACE, host)
+            for host in hosts:
+                stats = self._hosts.get(host)
+                if stats is not None:
+                    self._disk.set(self.NAMESPACE, host, json.dumps(asdict(stats)), expires_at, now)
+
+        try:
+            await asyncio.to_thread(write)
+        except Exception as e:
+            logger.warning(f"Failed to persist host reputation: {str(e)}")
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+    def stats(self, top: int = 10) -> dict:
+        ranked = sorted(self._hosts, key=self.score, reverse=True)
+
+        def describe(host: str) -> dict:
+            stats = self._hosts[host]
+            return {
+                "host": host,
+                "score": round(self.score(host), 3),
+                "alive_rate": round(stats.alive_rate, 3),
+                "mean_score": round(stats.mean_score, 3),
+                "mean_latency": round(stats.mean_latency, 3),
+                "verifications": round(stats.verifications, 2),
+            }
+
+        return {
+            "enabled": self.enabled,
+            "hosts": len(self._hosts),
+            "pruned": self.pruned,
+            "best": [describe(host) for host in ranked[:top]],
+            "worst": [describe(host) for host in ranked[-top:][::-1]],
+        }
+
+
+# 全局实例
+host_reputation = HostReputationStore()
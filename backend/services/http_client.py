@@ -0,0 +1,68 @@
+"""共享 HTTP 客户端 - 进程级 aiohttp 连接池"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientManager:
+    """
+    进程级共享的 aiohttp ClientSession
+
+    所有对外 HTTP 请求（搜索、代理、生成、URL 检查）复用同一个连接池，
+    避免每次请求都重新建立 TCP/TLS 连接。
+    在 FastAPI startup 钩子中创建，shutdown 钩子中关闭。
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _build_connector(self) -> aiohttp.TCPConnector:
+        """构建调优后的 TCPConnector（keep-alive、单 host 限制、DNS 缓存）"""
+        return aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True,
+        )
+
+    async def start(self) -> aiohttp.ClientSession:
+        """创建共享 session（重复调用时复用已有 session）"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=self._build_connector())
+            logger.info(
+                f"✅ Shared HTTP session started "
+                f"(limit={settings.HTTP_POOL_LIMIT}, per_host={settings.HTTP_POOL_LIMIT_PER_HOST})"
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """关闭共享 session 并释放连接"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # 给 SSL 连接留出优雅关闭的时间
+            await asyncio.sleep(0.25)
+            logger.info("Shared HTTP session closed")
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        获取共享 session
+
+        未经 startup 钩子初始化时（如独立脚本中）懒加载创建。
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=self._build_connector())
+        return self._session
+
+
+# 全局实例
+http_client = HTTPClientManager()
@@ -4,12 +4,19 @@ import asyncio
 import logging
 import aiohttp
 import time
-from typing import List, Optional, Tuple, Any
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 
 from schemas import Dish
 from config import settings
-from .image_verifier import image_verifier
 from .image_generator import image_generator
+from .generated_image_store import generated_image_store
+from .http_client import http_client
+from .composite_search import CompositeSearcher
+from .image_candidates import ImageCandidate, prefilter_candidates, rank_candidates
+from .url_health import url_health
+from .host_reputation import host_reputation
+from .image_prefilter import local_prefilter
+from .verifier_backends import ScoreCallback, get_verifier_backend
 
 logger = logging.getLogger(__name__)
 
@@ -22,14 +29,24 @@ class HybridImagePipeline:
     def __init__(self, searcher, search_service):
         self.searcher = searcher
         self.search_service = search_service
-        self.verifier = image_verifier
         self.generator = image_generator
+        # 批量请求共享的全局并发上限；每个批量请求另有自己的上限，多个批量请求公平分配名额
+        self._batch_semaphore = asyncio.Semaphore(max(1, settings.MAX_CONCURRENT_DISH_PIPELINES))
+        # 推测式生成统计：启动 / 被采用 / 因验证成功被丢弃
+        self.speculative_started = 0
+        self.speculative_used = 0
+        self.speculative_discarded = 0
 
     def _resolve_candidate_count(self, search_candidate_results: Optional[int]) -> int:
         if isinstance(search_candidate_results, int):
             return max(1, min(search_candidate_results, 10))
         return settings.SEARCH_CANDIDATE_RESULTS
 
+    @staticmethod
+    def _probe_limit(candidate_count: int) -> int:
+        """向搜索源请求并做存活检查的候选数 = 候选数量 × CANDIDATE_PROBE_FACTOR"""
+        return max(candidate_count, int(candidate_count * settings.CANDIDATE_PROBE_FACTOR))
+
     def _resolve_verify_threshold(self, image_verify_threshold: Optional[float]) -> float:
         if isinstance(image_verify_threshold, (int, float)):
             return max(0.0, min(float(image_verify_threshold), 1.0))
@@ -53,7 +70,8 @@ class HybridImagePipeline:
         generation_api_key: Optional[str] = None,
         generation_model: Optional[str] = None,
         enable_image_generation: Optional[bool] = None,
-        image_verify_threshold: Optional[float] = None
+        image_verify_threshold: Optional[float] = None,
+        image_verifier_backend: Optional[str] = None
     ) -> Tuple[List[str], List[int]]:
         """
         获取菜品的最佳图片列表和分数列表
@@ -66,15 +84,22 @@ class HybridImagePipeline:
         
         # Step 1: 搜索多个候选图片
         search_start = time.time()
-        candidate_urls = await self._search_candidates(
+        candidates = await self._search_candidates(
             dish,
             serpapi_key=serpapi_key,
             search_candidate_results=search_candidate_results
         )
+        # 本地预筛选：剔除空白、占位、重复图片，减少付费视觉调用
+        candidates = await local_prefilter.filter_candidates(candidates)
+        # 只有 1 个可用候选时直接采用；按 VERIFY_TOP_K 截断出的单个候选仍需验证
+        single_result = len(candidates) == 1
+        # 请求未指定候选数量时，只把最可能通过的几个候选送去视觉验证；显式指定的数量不被覆盖
+        if not isinstance(search_candidate_results, int) and settings.VERIFY_TOP_K > 0:
+            candidates = candidates[:settings.VERIFY_TOP_K]
         search_time = time.time() - search_start
         verify_threshold = self._resolve_verify_threshold(image_verify_threshold)
         
-        if not candidate_urls:
+        if not candidates:
             logger.warning(f"⚠️  No search results for {dish.english_name} ({search_time:.1f}s), skipping to generation")
             gen_img = await self._generate_image(
                 dish,
@@ -84,95 +109,137 @@ class HybridImagePipeline:
             )
             return ([gen_img], [99]) if gen_img else ([], [])
         
-        logger.info(f"📋 Found {len(candidate_urls)} candidates ({search_time:.1f}s)")
+        logger.info(f"📋 Found {len(candidates)} candidates ({search_time:.1f}s)")
         
-        # Step 2: 验证并排序候选图片
-        verify_start = time.time()
-        sorted_results = await self._verify_and_sort(
-            dish,
-            candidate_urls,
-            verify_threshold=verify_threshold,
-            llm_api_key=llm_api_key,
-            llm_base_url=llm_base_url,
-            llm_model=llm_model,
-            llm_temperature=llm_temperature,
-            llm_timeout=llm_timeout
+        # 推测式生成：早期信号预示搜索结果很可能全部验证失败时，提前在后台开始生成
+        speculative_task: Optional[asyncio.Task] = None
+        speculate = (
+            settings.SPECULATIVE_GENERATION_ENABLED
+            and self._resolve_enable_image_generation(enable_image_generation)
         )
-        verify_time = time.time() - verify_start
+        early_scores: List[float] = []
+
+        def start_speculative_generation(reason: str) -> None:
+            nonlocal speculative_task
+            if speculative_task is not None:
+                return
+            logger.info(f"🔮 Speculative generation for {dish.english_name} ({reason})")
+            self.speculative_started += 1
+            speculative_task = asyncio.create_task(self._generate_image(
+                dish,
+                enable_image_generation=enable_image_generation,
+                generation_api_key=generation_api_key,
+                generation_model=generation_model
+            ))
+
+        def on_score(candidate: ImageCandidate, score: float) -> None:
+            early_scores.append(score)
+            if len(early_scores) == settings.SPECULATIVE_GENERATION_SCORE_SAMPLES and max(early_scores) < verify_threshold:
+                start_speculative_generation(f"first {len(early_scores)} scores below {verify_threshold}")
+
+        if speculate and len(candidates) < settings.SPECULATIVE_GENERATION_MIN_CANDIDATES:
+            start_speculative_generation(f"only {len(candidates)} live candidates")
         
-        if sorted_results:
-            total_time = time.time() - start_time
-            # 提取 URLs 和 分数列表
-            sorted_urls = [url for url, _ in sorted_results]
-            sorted_scores = [int(score * 100) for _, score in sorted_results]
+        try:
+            # Step 2: 验证并排序候选图片
+            verify_start = time.time()
+            sorted_results = await self._verify_and_sort(
+                dish,
+                candidates,
+                verify_threshold=verify_threshold,
+                llm_api_key=llm_api_key,
+                llm_base_url=llm_base_url,
+                llm_model=llm_model,
+                llm_temperature=llm_temperature,
+                llm_timeout=llm_timeout,
+                image_verifier_backend=image_verifier_backend,
+                on_score=on_score if speculate else None,
+                skip_single=single_result
+            )
+            verify_time = time.time() - verify_start
             
-            logger.info(f"✅ Found {len(sorted_urls)} verified images (Top: {sorted_scores[0]}%) ({verify_time:.1f}s verification, {total_time:.1f}s total)")
-            return sorted_urls, sorted_scores
-        
-        # Step 3: 验证失败，降级为生成
-        logger.warning(f"⚠️  No valid search result (Score < {verify_threshold}), "
-                      f"generating image ({verify_time:.1f}s verification)")
-        gen_img = await self._generate_image(
-            dish,
-            enable_image_generation=enable_image_generation,
-            generation_api_key=generation_api_key,
-            generation_model=generation_model
-        )
-        return ([gen_img], [99]) if gen_img else ([], [])
+            if sorted_results:
+                total_time = time.time() - start_time
+                # 提取 URLs 和 分数列表
+                sorted_urls = [url for url, _ in sorted_results]
+                sorted_scores = [int(score * 100) for _, score in sorted_results]
+                
+                if speculative_task is not None:
+                    self.speculative_discarded += 1
+                    logger.info(f"🗑️  Verification succeeded, discarding speculative generation for {dish.english_name}")
+                logger.info(f"✅ Found {len(sorted_urls)} verified images (Top: {sorted_scores[0]}%) ({verify_time:.1f}s verification, {total_time:.1f}s total)")
+                return sorted_urls, sorted_scores
+            
+            # Step 3: 验证失败，降级为生成（已推测式启动时直接等待其结果）
+            logger.warning(f"⚠️  No valid search result (Score < {verify_threshold}), "
+                          f"generating image ({verify_time:.1f}s verification)")
+            if speculative_task is not None:
+                self.speculative_used += 1
+                gen_img = await speculative_task
+            else:
+                gen_img = await self._generate_image(
+                    dish,
+                    enable_image_generation=enable_image_generation,
+                    generation_api_key=generation_api_key,
+                    generation_model=generation_model
+                )
+            return ([gen_img], [99]) if gen_img else ([], [])
+        finally:
+            if speculative_task is not None and not speculative_task.done():
+                speculative_task.cancel()
 
     async def _verify_and_sort(
         self,
         dish: Dish,
-        candidate_urls: List[str],
+        candidates: List[ImageCandidate],
         verify_threshold: float,
         llm_api_key: Optional[str] = None,
         llm_base_url: Optional[str] = None,
         llm_model: Optional[str] = None,
         llm_temperature: Optional[float] = None,
-        llm_timeout: Optional[int] = None
+        llm_timeout: Optional[int] = None,
+        image_verifier_backend: Optional[str] = None,
+        on_score: Optional[ScoreCallback] = None,
+        skip_single: bool = True
     ) -> List[Tuple[str, float]]:
         """
-        视觉验证并按相关性分数排序图片
+        验证并按相关性分数排序图片
+
+        skip_single: 搜索本身只有 1 个结果时跳过验证；候选是被截断成 1 个时应传 False
         Returns: List[(url, score)]
         """
-        if not candidate_urls:
+        if not candidates:
             return []
         
         # 只有 1 个结果时跳过复杂验证（太慢），直接返回 mock score
-        if len(candidate_urls) < 2:
+        if skip_single and len(candidates) < 2:
             mock_score = 0.85
             if mock_score >= verify_threshold:
-                return [(candidate_urls[0], mock_score)]
+                return [(candidates[0].url, mock_score)]
             return []
 
-        logger.info(f"🔎 Verifying {len(candidate_urls)} images...")
-        
-        # 并发验证所有候选图片
-        verification_tasks = [
-            self.verifier.verify_image_relevance(
-                dish_name=dish.english_name,
-                description=dish.description,
-                image_url=url,
-                original_name=dish.original_name,
-                llm_api_key=llm_api_key,
-                llm_base_url=llm_base_url,
-                llm_model=llm_model,
-                llm_temperature=llm_temperature,
-                llm_timeout=llm_timeout
-            )
-            for url in candidate_urls
-        ]
-        
-        scores = await asyncio.gather(*verification_tasks, return_exceptions=True)
+        backend = get_verifier_backend(image_verifier_backend)
+        logger.info(f"🔎 Verifying {len(candidates)} images ({backend.name})...")
+        scored = await backend.score(
+            dish,
+            candidates,
+            verify_threshold,
+            on_score=on_score,
+            llm_api_key=llm_api_key,
+            llm_base_url=llm_base_url,
+            llm_model=llm_model,
+            llm_temperature=llm_temperature,
+            llm_timeout=llm_timeout
+        )
         
         # 配对 URL 和分数
         valid_scored_urls = []
-        for url, score in zip(candidate_urls, scores):
-            if isinstance(score, (int, float)):
-                # 记录分数日志
-                logger.debug(f"  {dish.english_name}: {score:.2f} - {url[:50]}...")
-                if score >= verify_threshold:
-                    valid_scored_urls.append((url, score))
+        for candidate, score in scored:
+            url = candidate.url
+            # 记录分数日志
+            logger.debug(f"  {dish.english_name}: {score:.2f} - {url[:50]}...")
+            if score >= verify_threshold:
+                valid_scored_urls.append((url, score))
         
         if not valid_scored_urls:
             return []
@@ -187,67 +254,138 @@ class HybridImagePipeline:
         dish: Dish,
         serpapi_key: Optional[str] = None,
         search_candidate_results: Optional[int] = None
-    ) -> List[str]:
+    ) -> List[ImageCandidate]:
         """搜索前 N 个候选图片"""
         try:
             candidate_count = self._resolve_candidate_count(search_candidate_results)
+            # 多要一些结果：排序和存活检查后再截取 candidate_count 个
+            search_count = self._probe_limit(candidate_count)
 
-            # 使用搜索服务获取多个结果
-            urls = await self.search_service.search_images(
+            async def validate(candidates: List[ImageCandidate]) -> List[ImageCandidate]:
+                return await self._select_candidates(candidates, candidate_count)
+
+            if isinstance(self.search_service, CompositeSearcher):
+                # 组合搜索：每个搜索源的结果先经过筛选和存活检查，首个通过的结果集胜出
+                valid = await self.search_service.search_candidates(
+                    dish.search_term,
+                    num=search_count,
+                    api_key=serpapi_key,
+                    validate=validate
+                )
+                logger.info(f"URL validity check: {len(valid)} alive for {dish.english_name}")
+                return valid
+
+            # 使用搜索服务获取多个结果（含缩略图、尺寸、来源域名）
+            candidates = await self.search_service.search_candidates(
                 dish.search_term,
-                num=candidate_count,
+                num=search_count,
                 api_key=serpapi_key
             )
             
-            if not urls:
+            if not candidates:
                 return []
             
-            # 快速检查 URL 有效性（发送 HEAD 请求）
-            valid_urls = await self._check_urls_alive(urls)
-            extracted_num = min(len(valid_urls), candidate_count)
-            valid_urls = valid_urls[:extracted_num]
-            logger.info(f"URL validity check: {len(valid_urls)}/{len(urls)} alive for {dish.english_name}")
+            valid = await validate(candidates)
+            logger.info(f"URL validity check: {len(valid)}/{len(candidates)} alive for {dish.english_name}")
             
-            return valid_urls
+            return valid
             
         except Exception as e:
             logger.error(f"Error searching candidates for {dish.english_name}: {str(e)}")
             return []
+
+    async def _select_candidates(self, candidates: List[ImageCandidate], candidate_count: int) -> List[ImageCandidate]:
+        """
+        按元数据和主机信誉预筛选、排序，只对排名靠前的候选做存活检查，返回前 candidate_count 个可用候选
+        """
+        reputation = host_reputation.score if host_reputation.enabled else None
+        ranked = rank_candidates(prefilter_candidates(candidates), reputation=reputation)
+        ranked = ranked[:self._probe_limit(candidate_count)]
+        
+        # 搜索引擎已给出尺寸的候选视为可信，可跳过 HEAD 请求
+        if settings.CANDIDATE_SKIP_PROBE_WITH_METADATA:
+            to_probe = [candidate for candidate in ranked if not candidate.has_dimensions]
+        else:
+            to_probe = ranked
+        
+        # 快速检查 URL 有效性（发送 HEAD 请求）
+        alive = await self._check_urls_alive(to_probe) if to_probe else []
+        alive_urls = {candidate.url for candidate in alive}
+        probed_urls = {candidate.url for candidate in to_probe}
+        valid = [
+            candidate for candidate in ranked
+            if candidate.url not in probed_urls or candidate.url in alive_urls
+        ]
+        return valid[:candidate_count]
     
-    async def _check_urls_alive(self, urls: List[str], timeout: int = None) -> List[str]:
+    async def _check_urls_alive(self, candidates: List[ImageCandidate], timeout: int = None) -> List[ImageCandidate]:
         """
-        批量检查 URL 是否存活且是真正的图片
+        批量检查候选 URL 是否存活且是真正的图片，保持输入顺序
+
+        已知失效的 URL 和被屏蔽的主机在发出请求前即被丢弃；探测结果回写健康度缓存。
         """
         if timeout is None:
             timeout = settings.IMAGE_URL_CHECK_TIMEOUT
         
+        candidates = await url_health.filter_candidates(candidates)
+        
+        async def check_single_url(candidate: ImageCandidate) -> Optional[ImageCandidate]:
+            async with url_health.host_slot(candidate.host):
+                probe_start = time.time()
+                failure = await self._probe_image_url(candidate.url, timeout)
+                host_reputation.record_probe(candidate.host, not failure, time.time() - probe_start)
+            if failure:
+                await url_health.record_failure(candidate, failure)
+                return None
+            url_health.record_success(candidate)
+            return candidate
+        
+        tasks = [check_single_url(candidate) for candidate in candidates]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return [candidate for candidate in results if isinstance(candidate, ImageCandidate)]
+
+    async def _probe_image_url(self, url: str, timeout: int) -> Optional[str]:
+        """
+        探测 URL 是否为可访问的图片
+
+        先发 HEAD；服务器拒绝 HEAD（403/405/501）时改用只取前 1KB 的 Range GET。
+
+        Returns:
+            失败原因，成功返回 None
+        """
         VALID_IMAGE_TYPES = {
             'image/jpeg', 'image/jpg', 'image/png', 'image/webp', 'image/gif'
         }
+        timeout_obj = aiohttp.ClientTimeout(total=timeout)
         
-        async def check_single_url(url: str) -> Optional[str]:
-            try:
-                timeout_obj = aiohttp.ClientTimeout(total=timeout)
-                async with aiohttp.ClientSession() as session:
-                    async with session.head(url, timeout=timeout_obj, allow_redirects=True) as resp:
-                        if resp.status >= 400:
-                            return None
-                        
-                        content_type = resp.headers.get('content-type', '').lower()
-                        base_type = content_type.split(';')[0].strip()
-                        
-                        if base_type not in VALID_IMAGE_TYPES:
-                            return None
-                        
-                        return url
-                        
-            except Exception:
-                return None
+        try:
+            async with http_client.session.head(url, timeout=timeout_obj, allow_redirects=True) as resp:
+                status = resp.status
+                content_type = resp.headers.get('content-type', '')
+            
+            if status in (403, 405, 501):
+                async with http_client.session.get(
+                    url,
+                    timeout=timeout_obj,
+                    allow_redirects=True,
+                    headers={"Range": "bytes=0-1023"}
+                ) as resp:
+                    status = resp.status
+                    content_type = resp.headers.get('content-type', '')
+        except asyncio.TimeoutError:
+            return "timeout"
+        except Exception as e:
+            return type(e).__name__
         
-        tasks = [check_single_url(url) for url in urls]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if status >= 400:
+            return f"http_{status}"
         
-        return [url for url in results if isinstance(url, str)]
+        base_type = content_type.lower().split(';')[0].strip()
+        if base_type not in VALID_IMAGE_TYPES:
+            return f"content_type:{base_type or 'missing'}"
+        
+        return None
 
     async def _generate_image(
         self,
@@ -256,26 +394,49 @@ class HybridImagePipeline:
         generation_api_key: Optional[str] = None,
         generation_model: Optional[str] = None
     ) -> Optional[str]:
-        """降级：生成图片"""
+        """降级：生成图片（同一菜品优先复用已存储的生成图片）"""
         if not self._resolve_enable_image_generation(enable_image_generation):
             return None
         
-        logger.info(f"🎨 Generating image for {dish.english_name}...")
-        
-        try:
-            image_url = await self.generator.generate_image(
+        async def generate() -> Optional[str]:
+            logger.info(f"🎨 Generating image for {dish.english_name}...")
+            return await self.generator.generate_image(
                 english_name=dish.english_name,
                 original_name=dish.original_name,
                 description=dish.description,
                 generation_api_key=generation_api_key,
                 generation_model=generation_model
             )
-            return image_url
+        
+        model = (generation_model or "").strip() or self.generator.model
+        try:
+            return await generated_image_store.get_or_generate(dish, model, generate)
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
             return None
 
-    async def enrich_dishes_with_images(
+    def speculation_stats(self) -> dict:
+        return {
+            "enabled": settings.SPECULATIVE_GENERATION_ENABLED,
+            "started": self.speculative_started,
+            "used": self.speculative_used,
+            "discarded": self.speculative_discarded,
+        }
+
+    async def _get_best_images_limited(
+        self,
+        request_semaphore: Optional[asyncio.Semaphore],
+        dish: Dish,
+        **kwargs
+    ) -> Tuple[List[str], List[int]]:
+        """批量请求先占用本请求的名额，再占用全局名额；未限流的调用直接执行"""
+        if request_semaphore is None:
+            return await self.get_best_images(dish, **kwargs)
+        async with request_semaphore:
+            async with self._batch_semaphore:
+                return await self.get_best_images(dish, **kwargs)
+
+    async def iter_enriched_dishes(
         self,
         dishes: List[Dish],
         serpapi_key: Optional[str] = None,
@@ -288,47 +449,114 @@ class HybridImagePipeline:
         generation_api_key: Optional[str] = None,
         generation_model: Optional[str] = None,
         enable_image_generation: Optional[bool] = None,
-        image_verify_threshold: Optional[float] = None
-    ) -> List[Dish]:
+        image_verify_threshold: Optional[float] = None,
+        image_verifier_backend: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, Dish]]:
         """
-        为菜品列表并发获取最佳图片（使用混合 Pipeline）
+        并发获取图片，按完成顺序逐个产出 (菜品下标, 已填充图片的菜品)
+
+        慢菜品不会阻塞其他菜品的结果；生成器被提前关闭时取消剩余任务。
+        max_concurrency 用于批量请求：本请求同时最多处理这么多菜品，且所有批量请求合计不超过
+        MAX_CONCURRENT_DISH_PIPELINES；为 None 时不限流（单菜品搜索、菜单识别后的图片加载）。
         """
         logger.info(f"🚀 Hybrid Pipeline processing {len(dishes)} dishes...")
         
+        # 相同搜索词的菜品（如多页菜单中重复出现、不同规格）只跑一次 Pipeline
+        groups: Dict[str, List[int]] = {}
+        for index, dish in enumerate(dishes):
+            groups.setdefault(dish.search_term.strip().casefold(), []).append(index)
+        if len(groups) < len(dishes):
+            logger.info(f"♻️  {len(dishes) - len(groups)} dishes share a search term, searching {len(groups)}")
+        
         # 并发处理所有菜品
-        tasks = [
-            self.get_best_images(
-                dish,
-                serpapi_key=serpapi_key,
-                search_candidate_results=search_candidate_results,
-                llm_api_key=llm_api_key,
-                llm_base_url=llm_base_url,
-                llm_model=llm_model,
-                llm_temperature=llm_temperature,
-                llm_timeout=llm_timeout,
-                generation_api_key=generation_api_key,
-                generation_model=generation_model,
-                enable_image_generation=enable_image_generation,
-                image_verify_threshold=image_verify_threshold
-            )
-            for dish in dishes
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        request_semaphore = asyncio.Semaphore(max(1, max_concurrency)) if max_concurrency else None
+        tasks = {
+            asyncio.create_task(
+                self._get_best_images_limited(
+                    request_semaphore,
+                    dishes[indices[0]],
+                    serpapi_key=serpapi_key,
+                    search_candidate_results=search_candidate_results,
+                    llm_api_key=llm_api_key,
+                    llm_base_url=llm_base_url,
+                    llm_model=llm_model,
+                    llm_temperature=llm_temperature,
+                    llm_timeout=llm_timeout,
+                    generation_api_key=generation_api_key,
+                    generation_model=generation_model,
+                    enable_image_generation=enable_image_generation,
+                    image_verify_threshold=image_verify_threshold,
+                    image_verifier_backend=image_verifier_backend
+                )
+            ): indices
+            for indices in groups.values()
+        }
         
-        # 更新菜品图片
         success_count = 0
-        for dish, result in zip(dishes, results):
-            if isinstance(result, tuple) and result[0]:
-                image_urls, image_scores = result
-                dish.image_urls = image_urls
-                dish.image_scores = image_scores # 存储所有分数
-                dish.image_url = image_urls[0] 
-                dish.match_score = image_scores[0] # 最佳分数 (兼容旧字段)
-                success_count += 1
-            elif isinstance(result, Exception):
-                logger.warning(f"Exception for {dish.english_name}: {result}")
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    indices = tasks[task]
+                    result = task.exception() or task.result()
+                    for index in indices:
+                        dish = dishes[index]
+                        # 更新菜品图片
+                        if isinstance(result, tuple) and result[0]:
+                            image_urls, image_scores = result
+                            dish.image_urls = list(image_urls)
+                            dish.image_scores = list(image_scores) # 存储所有分数
+                            dish.image_url = image_urls[0] 
+                            dish.match_score = image_scores[0] # 最佳分数 (兼容旧字段)
+                            success_count += 1
+                        elif isinstance(result, Exception):
+                            logger.warning(f"Exception for {dish.english_name}: {result}")
+                        yield index, dish
+        finally:
+            for task in pending:
+                task.cancel()
         
         logger.info(f"✅ Pipeline completed: {success_count}/{len(dishes)} dishes got images")
+
+    async def enrich_dishes_with_images(
+        self,
+        dishes: List[Dish],
+        serpapi_key: Optional[str] = None,
+        search_candidate_results: Optional[int] = None,
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None,
+        generation_api_key: Optional[str] = None,
+        generation_model: Optional[str] = None,
+        enable_image_generation: Optional[bool] = None,
+        image_verify_threshold: Optional[float] = None,
+        image_verifier_backend: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ) -> List[Dish]:
+        """
+        为菜品列表并发获取最佳图片（使用混合 Pipeline，max_concurrency 见 iter_enriched_dishes）
+        """
+        async for _ in self.iter_enriched_dishes(
+            dishes,
+            serpapi_key=serpapi_key,
+            search_candidate_results=search_candidate_results,
+            llm_api_key=llm_api_key,
+            llm_base_url=llm_base_url,
+            llm_model=llm_model,
+            llm_temperature=llm_temperature,
+            llm_timeout=llm_timeout,
+            generation_api_key=generation_api_key,
+            generation_model=generation_model,
+            enable_image_generation=enable_image_generation,
+            image_verify_threshold=image_verify_threshold,
+            image_verifier_backend=image_verifier_backend,
+            max_concurrency=max_concurrency
+        ):
+            pass
         return dishes
 
 
@@ -0,0 +1,85 @@
+"""图片字节缓存 - 候选图片只下载一次，预筛选、视觉验证、图片代理共享"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# (图片字节, Content-Type)
+ImageBytes = Tuple[bytes, str]
+
+
+class ImageBytesCache:
+    """
+    按 URL 缓存图片字节的内存 LRU，按总字节数而非条目数限制容量
+
+    同一 URL 的并发加载合并为一次（single-flight）；加载失败不缓存。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, ImageBytes]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[ImageBytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old[0])
+        self._entries[key] = (data, content_type)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Optional[ImageBytes]]]) -> Optional[ImageBytes]:
+        entry = await loader()
+        if entry is not None:
+            self.put(key, *entry)
+        return entry
+
+    async def fetch(self, key: str, loader: Callable[[], Awaitable[Optional[ImageBytes]]]) -> Optional[ImageBytes]:
+        """命中直接返回；否则调用 loader 加载并缓存，同一 key 的并发请求共享一次加载"""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._load_and_store(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield：某个调用方被取消时不影响其他等待同一下载的调用方
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# 全局实例
+image_bytes_cache = ImageBytesCache(max_bytes=settings.IMAGE_BYTES_CACHE_MAX_MB * 1024 * 1024)
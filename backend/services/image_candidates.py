@@ -0,0 +1,142 @@
+"""搜索候选图片 - 携带搜索结果元数据，无需网络请求即可预筛选和排序"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _hostname(url: Optional[str]) -> str:
+    if not url:
+        return ""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+@dataclass
+class ImageCandidate:
+    """一张候选图片：原图 URL + 缩略图、尺寸、来源域名、搜索排名"""
+    url: str
+    thumbnail: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    source: str = ""              # 来源网站域名
+    position: Optional[int] = None
+    title: str = ""
+    provider: str = ""
+
+    @property
+    def host(self) -> str:
+        """图片本身所在的主机（可能是 CDN，与 source 不同）"""
+        return _hostname(self.url)
+
+    @property
+    def has_dimensions(self) -> bool:
+        return bool(self.width and self.height)
+
+    @property
+    def aspect_ratio(self) -> Optional[float]:
+        if not self.has_dimensions:
+            return None
+        return max(self.width, self.height) / min(self.width, self.height)
+
+    @classmethod
+    def from_serpapi(cls, item: dict) -> Optional["ImageCandidate"]:
+        url = item.get("original")
+        if not url:
+            return None
+        return cls(
+            url=url,
+            thumbnail=item.get("thumbnail"),
+            width=_to_int(item.get("original_width")),
+            height=_to_int(item.get("original_height")),
+            source=_hostname(item.get("link")) or (item.get("source") or "").lower(),
+            position=_to_int(item.get("position")),
+            title=item.get("title") or "",
+            provider="serpapi",
+        )
+
+    @classmethod
+    def from_google(cls, item: dict, position: int) -> Optional["ImageCandidate"]:
+        url = item.get("link")
+        if not url:
+            return None
+        image = item.get("image") or {}
+        return cls(
+            url=url,
+            thumbnail=image.get("thumbnailLink"),
+            width=_to_int(image.get("width")),
+            height=_to_int(image.get("height")),
+            source=_hostname(image.get("contextLink")) or (item.get("displayLink") or "").lower(),
+            position=position,
+            title=item.get("title") or "",
+            provider="google",
+        )
+
+
+def _parse_domains(value: str) -> List[str]:
+    return [domain.strip().lower() for domain in value.split(",") if domain.strip()]
+
+
+def _matches_domain(host: str, domains: List[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def prefilter_candidates(candidates: List[ImageCandidate]) -> List[ImageCandidate]:
+    """
+    按元数据过滤：分辨率过小、长宽比过于极端、来自屏蔽域名的候选直接丢弃
+
+    缺少尺寸信息的候选不按尺寸过滤。
+    """
+    blocked = _parse_domains(settings.CANDIDATE_BLOCKED_DOMAINS)
+    kept = []
+    for candidate in candidates:
+        if blocked and (_matches_domain(candidate.host, blocked) or _matches_domain(candidate.source, blocked)):
+            continue
+        if candidate.has_dimensions:
+            if min(candidate.width, candidate.height) < settings.CANDIDATE_MIN_EDGE:
+                continue
+            if candidate.aspect_ratio > settings.CANDIDATE_MAX_ASPECT_RATIO:
+                continue
+        kept.append(candidate)
+    return kept
+
+
+def rank_candidates(
+    candidates: List[ImageCandidate],
+    reputation: Optional[Callable[[str], float]] = None
+) -> List[ImageCandidate]:
+    """
+    按元数据预排序：搜索排名靠前、尺寸适中（接近展示尺寸）、接近横幅比例的优先
+
+    传入 reputation（主机 -> 信誉分）时，信誉高的主机优先。
+    排序稳定，元数据缺失时保持搜索引擎原始顺序。
+    """
+    def sort_key(item):
+        index, candidate = item
+        penalty = 0.0
+        if candidate.has_dimensions:
+            short_edge = min(candidate.width, candidate.height)
+            # 太小的图片展示模糊，太大的图片加载和验证都慢
+            if short_edge < 400:
+                penalty += 1.0
+            elif short_edge > 3000:
+                penalty += 0.5
+            if candidate.aspect_ratio > 2.0:
+                penalty += 0.5
+        if reputation is not None:
+            penalty -= reputation(candidate.host)
+        return (penalty, index)
+
+    return [candidate for _, candidate in sorted(enumerate(candidates), key=sort_key)]
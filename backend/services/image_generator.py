@@ -4,6 +4,7 @@ import logging
 import asyncio
 from typing import Optional
 import aiohttp
+from .http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +46,7 @@ class ImageGenerator:
             description: 菜品描述
             
         Returns:
-            生成图片的 URL，失败返回 None
+            生成图片的 URL（GENERATION_RESPONSE_FORMAT=b64_json 时为 data URL），失败返回 None
         """
         effective_api_key = (generation_api_key or "").strip() or self.api_key
         effective_model = (generation_model or "").strip() or self.model
@@ -65,33 +66,28 @@ class ImageGenerator:
             logger.info(f"Generating image for {english_name}...")
             
             timeout = aiohttp.ClientTimeout(total=60)
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self._resolve_generation_url(effective_base_url),
-                    headers={
-                        "Authorization": f"Bearer {effective_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": effective_model,
-                        "prompt": prompt,
-                        "n": 1,
-                        "size": "1024x1024",
-                        "quality": "hd",
-                        "style": "natural"
-                    },
-                    timeout=timeout
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        image_url = data.get("data", [{}])[0].get("url")
-                        if image_url:
-                            logger.info(f"✨ Generated image for {english_name}")
-                            return image_url
-                    else:
-                        error_data = await resp.text()
-                        logger.error(f"Image generation failed ({resp.status}): {error_data}")
-            
+            async with http_client.session.post(
+                self._resolve_generation_url(effective_base_url),
+                headers={
+                    "Authorization": f"Bearer {effective_api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=self._build_payload(effective_model, prompt),
+                timeout=timeout
+            ) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    item = data.get("data", [{}])[0]
+                    image_url = item.get("url")
+                    if not image_url and item.get("b64_json"):
+                        image_url = f"data:image/png;base64,{item['b64_json']}"
+                    if image_url:
+                        logger.info(f"✨ Generated image for {english_name}")
+                        return image_url
+                else:
+                    error_data = await resp.text()
+                    logger.error(f"Image generation failed ({resp.status}): {error_data}")
+        
             return None
             
         except asyncio.TimeoutError:
@@ -101,6 +97,20 @@ class ImageGenerator:
             logger.error(f"Error generating image for {english_name}: {str(e)}")
             return None
     
+    def _build_payload(self, model: str, prompt: str) -> dict:
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "n": 1,
+            "size": "1024x1024",
+            "quality": "hd",
+            "style": "natural"
+        }
+        # b64_json 直接返回图片内容，无需再下载会过期的临时 URL
+        if settings.GENERATION_RESPONSE_FORMAT:
+            payload["response_format"] = settings.GENERATION_RESPONSE_FORMAT
+        return payload
+    
     def _build_prompt(
         self,
         english_name: str,
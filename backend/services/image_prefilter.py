@@ -0,0 +1,104 @@
+"""本地图片预筛选 - 视觉验证前在 CPU 上剔除明显不合格和重复的候选"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from config import settings
+from utils.bktree import hamming_distance
+from utils.file_utils import CandidateImageStats, analyze_candidate_image
+from .image_candidates import ImageCandidate
+from .image_verifier import image_verifier
+from .image_workers import image_workers
+from .url_health import url_health
+
+logger = logging.getLogger(__name__)
+
+
+class LocalImagePrefilter:
+    """
+    每个候选下载一次，在图片工作池上计算廉价指标，只有通过的候选才进入付费的视觉验证
+
+    剔除：分辨率过小、长宽比极端、近乎纯色/空白、颜色极少的占位图，
+    以及与排名更靠前的候选 dHash 近似的重复图片。
+    下载或解码失败的候选同样剔除（视觉模型也拿不到这张图），并记入 URL 健康度缓存。
+    指标全部用 Pillow 计算（ImageStat / getcolors），不依赖 NumPy。
+    """
+
+    def __init__(self):
+        self.enabled = settings.LOCAL_PREFILTER_ENABLED
+        self.checked = 0
+        self.rejected: Counter = Counter()
+
+    def _reject_reason(self, stats: CandidateImageStats) -> Optional[str]:
+        short_edge, long_edge = min(stats.width, stats.height), max(stats.width, stats.height)
+        if short_edge < settings.CANDIDATE_MIN_EDGE:
+            return "too_small"
+        if long_edge / short_edge > settings.CANDIDATE_MAX_ASPECT_RATIO:
+            return "aspect_ratio"
+        if stats.stddev < settings.LOCAL_PREFILTER_MIN_STDDEV:
+            return "blank"
+        if stats.colors < settings.LOCAL_PREFILTER_MIN_COLORS:
+            return "placeholder"
+        return None
+
+    async def _analyze(self, candidate: ImageCandidate) -> Tuple[Optional[CandidateImageStats], Optional[str]]:
+        """Returns: (指标, 失败原因)，二者恰有一个为 None"""
+        async with url_health.host_slot(candidate.host):
+            image_data = await image_verifier.download_image(candidate.url)
+        if image_data is None:
+            return None, "download_failed"
+        try:
+            return await image_workers.run(analyze_candidate_image, image_data), None
+        except Exception as e:
+            logger.debug(f"Failed to analyze image {candidate.url[:50]}: {str(e)}")
+            return None, "undecodable"
+
+    async def filter_candidates(self, candidates: List[ImageCandidate]) -> List[ImageCandidate]:
+        """按原有排名顺序返回通过本地检查的候选"""
+        if not self.enabled or not candidates:
+            return candidates
+
+        results = await asyncio.gather(*[self._analyze(candidate) for candidate in candidates])
+
+        kept: List[ImageCandidate] = []
+        seen_hashes: List[Tuple[int, str]] = []
+        for candidate, (stats, failure) in zip(candidates, results):
+            self.checked += 1
+            if stats is None:
+                self.rejected[failure] += 1
+                logger.debug(f"  Prefilter rejected ({failure}): {candidate.url[:50]}...")
+                await url_health.record_failure(candidate, failure)
+                continue
+            reason = self._reject_reason(stats)
+            if reason is None:
+                duplicate_of = next(
+                    (url for dhash, url in seen_hashes
+                     if hamming_distance(dhash, stats.dhash) <= settings.LOCAL_PREFILTER_DUP_DISTANCE),
+                    None
+                )
+                if duplicate_of is not None:
+                    reason = "duplicate"
+                else:
+                    seen_hashes.append((stats.dhash, candidate.url))
+            if reason is not None:
+                self.rejected[reason] += 1
+                logger.debug(f"  Prefilter rejected ({reason}): {candidate.url[:50]}...")
+                continue
+            kept.append(candidate)
+
+        if len(kept) < len(candidates):
+            logger.info(f"🧹 Local prefilter kept {len(kept)}/{len(candidates)} candidates")
+        return kept
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "checked": self.checked,
+            "rejected": dict(self.rejected),
+        }
+
+
+# 全局实例
+local_prefilter = LocalImagePrefilter()
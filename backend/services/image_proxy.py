@@ -5,6 +5,8 @@ import asyncio
 import logging
 from typing import Optional, Tuple, List
 import base64
+from .http_client import http_client
+from .image_bytes_cache import image_bytes_cache
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +68,11 @@ class ImageProxy:
             logger.warning("Empty image URL provided")
             return None
         
+        # 预筛选/视觉验证已下载过的图片直接复用
+        cached = image_bytes_cache.get(image_url)
+        if cached is not None:
+            return cached
+        
         last_error = None
         
         # 重试机制
@@ -83,32 +90,32 @@ class ImageProxy:
                 }
                 
                 timeout_obj = aiohttp.ClientTimeout(total=timeout)
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        image_url,
-                        headers=headers,
-                        timeout=timeout_obj,
-                        allow_redirects=True,
-                        ssl=False,  # 某些图片服务器的 SSL 证书可能有问题
-                    ) as resp:
-                        if resp.status == 200:
-                            content_type = resp.headers.get('content-type', 'image/jpeg')
-                            image_data = await resp.read()
-                            
-                            if image_data:
-                                logger.info(f"✅ Proxied image (attempt {attempt+1}): {len(image_data)} bytes, {content_type}")
-                                return (image_data, content_type)
-                        
-                        elif resp.status == 429:
-                            last_error = f"Rate limited (HTTP {resp.status})"
-                            if attempt < retry - 1:
-                                # 被限流，等待后重试
-                                await asyncio.sleep(1 * (attempt + 1))
-                                continue
+                async with http_client.session.get(
+                    image_url,
+                    headers=headers,
+                    timeout=timeout_obj,
+                    allow_redirects=True,
+                    ssl=False,  # 某些图片服务器的 SSL 证书可能有问题
+                ) as resp:
+                    if resp.status == 200:
+                        content_type = resp.headers.get('content-type', 'image/jpeg')
+                        image_data = await resp.read()
                         
-                        last_error = f"HTTP {resp.status}"
-                        logger.debug(f"❌ Failed to proxy image (HTTP {resp.status}): {image_url[:50]}... (attempt {attempt+1}/{retry})")
-            
+                        if image_data:
+                            logger.info(f"✅ Proxied image (attempt {attempt+1}): {len(image_data)} bytes, {content_type}")
+                            image_bytes_cache.put(image_url, image_data, content_type)
+                            return (image_data, content_type)
+                    
+                    elif resp.status == 429:
+                        last_error = f"Rate limited (HTTP {resp.status})"
+                        if attempt < retry - 1:
+                            # 被限流，等待后重试
+                            await asyncio.sleep(1 * (attempt + 1))
+                            continue
+                    
+                    last_error = f"HTTP {resp.status}"
+                    logger.debug(f"❌ Failed to proxy image (HTTP {resp.status}): {image_url[:50]}... (attempt {attempt+1}/{retry})")
+        
             except asyncio.TimeoutError:
                 last_error = "Timeout"
                 logger.debug(f"⏱️ Proxy timeout on attempt {attempt+1}/{retry}: {image_url[:50]}...")
@@ -136,15 +143,15 @@ class ImageProxy:
                 logger.info(f"🔄 Trying CDN fallback: {cdn_url[:60]}...")
                 
                 timeout_obj = aiohttp.ClientTimeout(total=timeout)
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(cdn_url, timeout=timeout_obj) as resp:
-                        if resp.status == 200:
-                            content_type = resp.headers.get('content-type', 'image/jpeg')
-                            image_data = await resp.read()
-                            
-                            if image_data:
-                                logger.info(f"✅ CDN Proxy success: {len(image_data)} bytes via {cdn_base}")
-                                return (image_data, content_type)
+                async with http_client.session.get(cdn_url, timeout=timeout_obj) as resp:
+                    if resp.status == 200:
+                        content_type = resp.headers.get('content-type', 'image/jpeg')
+                        image_data = await resp.read()
+                        
+                        if image_data:
+                            logger.info(f"✅ CDN Proxy success: {len(image_data)} bytes via {cdn_base}")
+                            image_bytes_cache.put(image_url, image_data, content_type)
+                            return (image_data, content_type)
             except Exception as e:
                 logger.debug(f"⚠️ CDN fallback failed ({cdn_base}): {str(e)}")
                 continue
@@ -1,13 +1,21 @@
 """图片相关性验证服务 - 使用 Gemini Flash 作为视觉裁判"""
 
 import asyncio
+import json
 import logging
 import base64
-from typing import Optional
+import re
+from typing import ContextManager, List, Optional
 import aiohttp
-from openai import OpenAI, APIError, APITimeoutError
+from openai import AsyncOpenAI, APIError, APITimeoutError
 
 from config import settings
+from utils.file_utils import encode_image_to_base64, preprocess_image
+from .http_client import http_client
+from .llm_clients import llm_client_registry
+from .image_bytes_cache import ImageBytes, image_bytes_cache
+from .image_workers import image_workers
+from .verification_cache import verification_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +24,6 @@ class ImageVerifier:
     """使用 Gemini Flash 验证搜索到的图片是否与菜品相匹配"""
     
     def __init__(self):
-        self._client = None
         self.model = "gemini-2.5-flash-lite"  # 快速且便宜的模型用于验证
 
     def _normalize_optional_str(self, value: Optional[str]) -> Optional[str]:
@@ -25,32 +32,18 @@ class ImageVerifier:
         normalized = value.strip()
         return normalized if normalized else None
     
-    @property
-    def client(self) -> OpenAI:
-        """懒加载 OpenAI 客户端（指向 Gemini）"""
-        if self._client is None:
-            self._client = OpenAI(
-                api_key=settings.LLM_API_KEY,
-                base_url=settings.LLM_BASE_URL,
-            )
-        return self._client
-
-    def _get_client(self, llm_api_key: Optional[str] = None, llm_base_url: Optional[str] = None) -> OpenAI:
+    def _lease_client(self, llm_api_key: Optional[str] = None, llm_base_url: Optional[str] = None) -> ContextManager[AsyncOpenAI]:
+        """租用验证用客户端，调用结束前不会被注册表关闭"""
         normalized_api_key = self._normalize_optional_str(llm_api_key)
         normalized_base_url = self._normalize_optional_str(llm_base_url)
 
-        if not normalized_api_key and not normalized_base_url:
-            if not settings.LLM_API_KEY:
-                raise ValueError("LLM API key is missing for image verification")
-            return self.client
-
         effective_api_key = normalized_api_key or settings.LLM_API_KEY
         if not effective_api_key:
             raise ValueError("LLM API key is missing for image verification")
 
-        return OpenAI(
-            api_key=effective_api_key,
-            base_url=normalized_base_url or settings.LLM_BASE_URL,
+        return llm_client_registry.lease(
+            effective_api_key,
+            normalized_base_url or settings.LLM_BASE_URL,
         )
     
     async def verify_image_relevance(
@@ -68,7 +61,7 @@ class ImageVerifier:
         """
         验证图片是否与菜品相关
         
-        使用 Gemini Flash 进行快速视觉验证
+        使用 Gemini Flash 进行快速视觉验证，相同 (菜品, 图片) 优先读取验证分数缓存
         
         Args:
             dish_name: 英文菜名
@@ -79,6 +72,42 @@ class ImageVerifier:
         Returns:
             相关性分数 (0.0 - 1.0)
         """
+        model = self._normalize_optional_str(llm_model) or self.model
+        dish_key = verification_cache.build_dish_key(original_name, dish_name, model)
+        cached = await verification_cache.get(dish_key, image_url)
+        if cached is not None:
+            logger.debug(f"Image verification cache hit: {dish_name} = {cached:.2f}")
+            return cached
+        
+        score = await self._score_image(
+            dish_name=dish_name,
+            description=description,
+            image_url=image_url,
+            original_name=original_name,
+            llm_api_key=llm_api_key,
+            llm_base_url=llm_base_url,
+            llm_model=llm_model,
+            llm_temperature=llm_temperature,
+            llm_timeout=llm_timeout,
+        )
+        if score is None:
+            return 0.0
+        await verification_cache.set(dish_key, image_url, score)
+        return score
+    
+    async def _score_image(
+        self,
+        dish_name: str,
+        description: str,
+        image_url: str,
+        original_name: str = "",
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None
+    ) -> Optional[float]:
+        """调用视觉模型打分；超时、接口错误或无法解析时返回 None（不缓存）"""
         try:
             # 构建验证提示词
             prompt = f"""你是一个严格的美食图片质量检查官。
@@ -97,11 +126,14 @@ class ImageVerifier:
 请返回一个单独的数字，范围 0.0-1.0，只返回数字，不要有其他文字。
 示例：0.85"""
             
-            # 使用异步线程调用同步 API
-            response = await asyncio.to_thread(
-                self._call_verify_api,
+            image_part = await self._image_part(image_url)
+            if image_part is None:
+                logger.debug(f"Image unavailable for inline verification: {image_url[:50]}...")
+                return None
+            
+            response = await self._call_verify_api(
                 dish_name=dish_name,
-                image_url=image_url,
+                image_part=image_part,
                 prompt=prompt,
                 llm_api_key=llm_api_key,
                 llm_base_url=llm_base_url,
@@ -119,11 +151,11 @@ class ImageVerifier:
                 return score
             except ValueError:
                 logger.warning(f"Failed to parse verification score: {response}")
-                return 0.0
+                return None
                 
         except APITimeoutError as e:
             logger.warning(f"⏱️  Timeout verifying image for {dish_name} - returning 0.0")
-            return 0.0
+            return None
         except APIError as e:
             # 捕获 OpenAI SDK 抛出的 API 错误
             error_str = str(e).lower()
@@ -131,7 +163,7 @@ class ImageVerifier:
                 logger.debug(f"Invalid image URL (API Error): {dish_name} - {str(e)[:50]}...")
             else:
                 logger.error(f"API error verifying {dish_name}: {str(e)}")
-            return 0.0
+            return None
         except Exception as e:
             # 捕获其他所有异常
             error_str = str(e).lower()
@@ -139,12 +171,192 @@ class ImageVerifier:
                 logger.debug(f"Image verification failed (Network/Format): {str(e)[:50]}...")
             else:
                 logger.error(f"Error verifying image for {dish_name}: {str(e)}")
-            return 0.0
+            return None
     
-    def _call_verify_api(
+    async def verify_images_batch(
         self,
         dish_name: str,
-        image_url: str,
+        description: str,
+        image_urls: List[str],
+        original_name: str = "",
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> List[float]:
+        """
+        批量验证：每批多张图片放在同一条多模态消息中，模型返回分数数组
+        
+        已缓存分数的图片不再调用模型；某一批调用失败或返回无法解析时，该批回退为逐张调用 verify_image_relevance。
+        
+        Returns:
+            与 image_urls 一一对应的相关性分数 (0.0 - 1.0)
+        """
+        batch_size = max(1, batch_size or settings.IMAGE_VERIFY_BATCH_SIZE)
+        llm_kwargs = dict(
+            llm_api_key=llm_api_key,
+            llm_base_url=llm_base_url,
+            llm_model=llm_model,
+            llm_temperature=llm_temperature,
+            llm_timeout=llm_timeout,
+        )
+        model = self._normalize_optional_str(llm_model) or self.model
+        dish_key = verification_cache.build_dish_key(original_name, dish_name, model)
+        
+        async def verify_chunk(chunk: List[str]) -> List[float]:
+            if len(chunk) > 1:
+                try:
+                    response = await self._call_verify_batch_api(
+                        prompt=self._build_batch_prompt(dish_name, description, original_name, len(chunk)),
+                        image_urls=chunk,
+                        **llm_kwargs
+                    )
+                    scores = self._parse_score_array(response, len(chunk))
+                    if scores is not None:
+                        logger.debug(f"Batch verification: {dish_name} = {scores}")
+                        for url, score in zip(chunk, scores):
+                            await verification_cache.set(dish_key, url, score)
+                        return scores
+                    logger.warning(f"Unparsable batch verification response for {dish_name}, falling back: {response[:80]}")
+                except Exception as e:
+                    logger.warning(f"Batch verification failed for {dish_name}, falling back to per-image: {str(e)[:80]}")
+            
+            # 回退：逐张验证（单张失败不影响其他图片）
+            return list(await asyncio.gather(*[
+                self.verify_image_relevance(
+                    dish_name=dish_name,
+                    description=description,
+                    image_url=url,
+                    original_name=original_name,
+                    **llm_kwargs
+                )
+                for url in chunk
+            ]))
+        
+        # 先查验证分数缓存，只把未命中的图片送去批量验证
+        cached = await asyncio.gather(*[verification_cache.get(dish_key, url) for url in image_urls])
+        misses = [url for url, score in zip(image_urls, cached) if score is None]
+        
+        chunks = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+        results = await asyncio.gather(*[verify_chunk(chunk) for chunk in chunks])
+        fresh = dict(zip(misses, [score for chunk_scores in results for score in chunk_scores]))
+        return [score if score is not None else fresh[url] for url, score in zip(image_urls, cached)]
+    
+    def _build_batch_prompt(self, dish_name: str, description: str, original_name: str, count: int) -> str:
+        return f"""你是一个严格的美食图片质量检查官。
+
+下面按顺序给出 {count} 张图片（图片 1 到图片 {count}），请分别评估每张图片是否准确展示了以下菜品：
+
+菜品名称：{original_name} ({dish_name})
+菜品描述：{description}
+
+请根据以下标准评分（0-1）：
+1. 图片内容是否明确为食物？(否则为 0)
+2. 食物类型是否与菜名相符？(例如搜索"红烧肉"不应该返回生肉或其他菜)
+3. 图片质量是否足以用于菜单展示？(清晰度、颜色饱和度)
+4. 是否存在明显的误导或不相关元素？
+
+请按图片顺序返回一个 JSON 数组，包含 {count} 个 0.0-1.0 的数字，只返回数组，不要有其他文字。
+示例：[0.85, 0.1, 0.6]"""
+    
+    @staticmethod
+    def _parse_score_array(response: str, expected: int) -> Optional[List[float]]:
+        """从模型回复中解析分数数组，数量不符或格式错误返回 None"""
+        match = re.search(r"\[[^\[\]]*\]", response or "")
+        if not match:
+            return None
+        try:
+            values = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(values, list) or len(values) != expected:
+            return None
+        scores = []
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            scores.append(max(0.0, min(1.0, float(value))))
+        return scores
+    
+    async def _call_verify_batch_api(
+        self,
+        prompt: str,
+        image_urls: List[str],
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None
+    ) -> str:
+        """一条消息携带多张图片，每张图片前标注序号"""
+        image_parts = await asyncio.gather(*[self._image_part(url) for url in image_urls])
+        if any(part is None for part in image_parts):
+            raise ValueError("image unavailable for inline verification")
+        
+        content = [{"type": "text", "text": prompt}]
+        for index, part in enumerate(image_parts, 1):
+            content.append({"type": "text", "text": f"图片 {index}："})
+            content.append({"type": "image_url", "image_url": part})
+        
+        model = self._normalize_optional_str(llm_model) or self.model
+        timeout = llm_timeout if llm_timeout is not None else settings.IMAGE_VERIFY_TIMEOUT
+        
+        request_kwargs = {
+            "model": model,
+            "max_tokens": 8 * len(image_urls) + 16,
+            "timeout": timeout,
+            "messages": [{"role": "user", "content": content}]
+        }
+        if llm_temperature is not None:
+            request_kwargs["temperature"] = llm_temperature
+        
+        with self._lease_client(llm_api_key, llm_base_url) as client:
+            message = await client.chat.completions.create(**request_kwargs)
+        return message.choices[0].message.content.strip()
+    
+    async def _image_part(self, image_url: str) -> Optional[dict]:
+        """
+        构造多模态消息中的 image_url 字段
+        
+        IMAGE_VERIFY_INLINE 开启时在本地下载图片、缩成小尺寸 JPEG 并以 data URL 内联发送（低细节），
+        避免提供方抓取防盗链图片失败，也减少图片输入的计费；下载失败返回 None。
+        未开启时直接传远程 URL。
+        """
+        if not settings.IMAGE_VERIFY_INLINE:
+            return {"url": image_url}
+        
+        max_edge = settings.IMAGE_VERIFY_INLINE_MAX_EDGE
+        thumbnail_key = f"thumbnail:{max_edge}:{image_url}"
+        entry = image_bytes_cache.get(thumbnail_key)
+        if entry is None:
+            image_data = await self.download_image(image_url)
+            if image_data is None:
+                return None
+            try:
+                prepared = await image_workers.run(
+                    preprocess_image,
+                    image_data,
+                    max_edge,
+                    False,
+                    "JPEG",
+                    settings.IMAGE_VERIFY_INLINE_QUALITY,
+                )
+            except Exception as e:
+                logger.debug(f"Failed to downscale image {image_url[:50]}: {str(e)}")
+                return None
+            entry = (prepared.data, prepared.mime_type)
+            image_bytes_cache.put(thumbnail_key, *entry)
+        
+        data, mime_type = entry
+        encoded = await image_workers.run(encode_image_to_base64, data)
+        return {"url": f"data:{mime_type};base64,{encoded}", "detail": "low"}
+    
+    async def _call_verify_api(
+        self,
+        dish_name: str,
+        image_part: dict,
         prompt: str,
         llm_api_key: Optional[str] = None,
         llm_base_url: Optional[str] = None,
@@ -153,13 +365,12 @@ class ImageVerifier:
         llm_timeout: Optional[int] = None
     ) -> str:
         """
-        同步 API 调用（在线程中执行以保持异步）
+        异步 API 调用（AsyncOpenAI，不占用线程池）
         
         使用 chat.completions.create 而非 messages.create
         """
         try:
             # 使用 chat.completions.create（OpenAI SDK 的正确方法）
-            client = self._get_client(llm_api_key, llm_base_url)
             model = self._normalize_optional_str(llm_model) or self.model
             timeout = llm_timeout if llm_timeout is not None else settings.IMAGE_VERIFY_TIMEOUT
 
@@ -177,9 +388,7 @@ class ImageVerifier:
                             },
                             {
                                 "type": "image_url",
-                                "image_url": {
-                                    "url": image_url
-                                }
+                                "image_url": image_part
                             }
                         ]
                     }
@@ -188,7 +397,8 @@ class ImageVerifier:
             if llm_temperature is not None:
                 request_kwargs["temperature"] = llm_temperature
 
-            message = client.chat.completions.create(**request_kwargs)
+            with self._lease_client(llm_api_key, llm_base_url) as client:
+                message = await client.chat.completions.create(**request_kwargs)
             
             # 提取响应文本
             response_text = message.choices[0].message.content.strip()
@@ -200,6 +410,41 @@ class ImageVerifier:
             # 为了调试清晰，我们 raise 出去
             raise
     
+    async def download_image(self, image_url: str) -> Optional[bytes]:
+        """
+        通过共享 session 下载图片（经图片字节缓存，同一 URL 只下载一次）
+        
+        Args:
+            image_url: 图片 URL
+            
+        Returns:
+            图片字节，失败或超过 IMAGE_DOWNLOAD_MAX_BYTES 返回 None
+        """
+        entry = await image_bytes_cache.fetch(image_url, lambda: self._fetch_image(image_url))
+        return entry[0] if entry is not None else None
+
+    async def _fetch_image(self, image_url: str) -> Optional[ImageBytes]:
+        max_bytes = settings.IMAGE_DOWNLOAD_MAX_BYTES
+        try:
+            timeout = aiohttp.ClientTimeout(total=settings.IMAGE_DOWNLOAD_TIMEOUT)
+            async with http_client.session.get(image_url, timeout=timeout) as resp:
+                if resp.status != 200:
+                    logger.debug(f"Failed to download image: {resp.status} - {image_url[:50]}")
+                    return None
+                if (resp.content_length or 0) > max_bytes:
+                    logger.debug(f"Image too large to download: {resp.content_length} bytes - {image_url[:50]}")
+                    return None
+                chunks, size = [], 0
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        return None
+                    chunks.append(chunk)
+                return b"".join(chunks), resp.headers.get("Content-Type", "image/jpeg")
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.debug(f"Error downloading image: {str(e)[:50]} - {image_url[:50]}")
+            return None
+
     async def download_image_as_base64(self, image_url: str) -> Optional[str]:
         """
         下载图片并转换为 Base64
@@ -210,19 +455,10 @@ class ImageVerifier:
         Returns:
             Base64 编码的图片，失败返回 None
         """
-        try:
-            timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url, timeout=timeout) as resp:
-                    if resp.status == 200:
-                        image_data = await resp.read()
-                        return base64.b64encode(image_data).decode('utf-8')
-                    else:
-                        logger.warning(f"Failed to download image: {resp.status}")
-                        return None
-        except Exception as e:
-            logger.error(f"Error downloading image: {str(e)}")
+        image_data = await self.download_image(image_url)
+        if image_data is None:
             return None
+        return base64.b64encode(image_data).decode('utf-8')
 
 
 # 全局实例
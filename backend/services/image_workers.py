@@ -0,0 +1,105 @@
+"""图片 CPU 任务池 - 将解码、校验、哈希、重新编码移出事件循环"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ImageWorkerPool:
+    """
+    专用于图片 CPU 密集任务的执行器
+
+    - IMAGE_WORKER_MODE=thread（默认）：ThreadPoolExecutor；Pillow 解码/缩放/编码和 hashlib 都释放 GIL，
+      线程即可并行，且图片字节无需跨进程复制
+    - IMAGE_WORKER_MODE=process：ProcessPoolExecutor，绕开 GIL 但每次提交都要 pickle 整张图片，按需开启
+    - IMAGE_WORKER_MODE=inline：直接在事件循环中执行（用于对比基准）
+
+    提交的函数必须是模块级函数（process 模式下需可被 pickle）。
+    """
+
+    def __init__(self, mode: str = None, max_workers: int = None):
+        self.mode = (mode or settings.IMAGE_WORKER_MODE).lower()
+        self.max_workers = max_workers or settings.IMAGE_WORKERS or min(4, os.cpu_count() or 1)
+        self._executor: Optional[Executor] = None
+
+        # 指标
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._total_seconds = 0.0
+
+    def _create_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self.mode == "process":
+            try:
+                return ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable ({str(e)}), falling back to threads")
+                self.mode = "thread"
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-worker")
+
+    def start(self) -> None:
+        """创建执行器（FastAPI startup 时调用）"""
+        if self._executor is None and self.mode != "inline":
+            self._executor = self._create_executor()
+            logger.info(f"✅ Image worker pool started ({self.mode}, {self.max_workers} workers)")
+
+    def shutdown(self) -> None:
+        """关闭执行器（FastAPI shutdown 时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在池中执行 func(*args, **kwargs) 并等待结果"""
+        if self._executor is None and self.mode != "inline":
+            self.start()
+
+        self.submitted += 1
+        start = time.perf_counter()
+        try:
+            if self._executor is None:
+                result = func(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.completed += 1
+            self._total_seconds += time.perf_counter() - start
+        return result
+
+    @property
+    def in_flight(self) -> int:
+        return self.submitted - self.completed
+
+    @property
+    def queue_depth(self) -> int:
+        """等待空闲 worker 的任务数"""
+        return max(0, self.in_flight - self.max_workers)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_task_ms": round(self._total_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+# 全局实例
+image_workers = ImageWorkerPool()
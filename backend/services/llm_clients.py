@@ -0,0 +1,136 @@
+"""LLM 客户端注册表 - 按 (api_key, base_url) 复用 AsyncOpenAI 客户端"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set, Tuple
+
+from openai import AsyncOpenAI
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientRegistry:
+    """
+    AsyncOpenAI 客户端的 LRU 注册表
+
+    - 以 (api_key, base_url) 为键，运行时覆盖的 Key 也能复用已预热的连接池
+    - 超过容量时淘汰最久未使用的客户端
+    - 空闲超过 idle_ttl 的客户端在下次访问时被清理
+    - 调用方通过 lease() 租用客户端；被淘汰的客户端在最后一个租约归还后才关闭，
+      长超时请求和流式响应不会在进行中被关闭
+    """
+
+    def __init__(self, max_size: int = None, idle_ttl: float = None):
+        self.max_size = max_size if max_size is not None else settings.LLM_CLIENT_CACHE_SIZE
+        self.idle_ttl = idle_ttl if idle_ttl is not None else settings.LLM_CLIENT_IDLE_TTL
+        # key -> (client, last_used)
+        self._clients: "OrderedDict[Tuple[str, str], Tuple[AsyncOpenAI, float]]" = OrderedDict()
+        # id(client) -> 进行中的租约数
+        self._leases: Dict[int, int] = {}
+        # 已淘汰但仍有租约的客户端：id(client) -> client
+        self._retired: Dict[int, AsyncOpenAI] = {}
+        # 关闭任务：保留引用防止被垃圾回收，shutdown 时等待完成
+        self._closing: Set[asyncio.Task] = set()
+
+    def get(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        """获取（或创建）指定 Key / Base URL 对应的客户端（不登记租约，调用期间可能被淘汰关闭）"""
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        key = (api_key, base_url)
+        entry = self._clients.get(key)
+        if entry is not None:
+            client = entry[0]
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            return client
+
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self._clients[key] = (client, now)
+        logger.debug(f"Created LLM client for {base_url} ({len(self._clients)} cached)")
+
+        while len(self._clients) > self.max_size:
+            _, (evicted, _) = self._clients.popitem(last=False)
+            self._retire(evicted)
+        return client
+
+    @contextmanager
+    def lease(self, api_key: str, base_url: str) -> Iterator[AsyncOpenAI]:
+        """租用客户端，退出上下文时归还；覆盖整个请求（含流式响应的读取）"""
+        client = self.get(api_key, base_url)
+        client_id = id(client)
+        self._leases[client_id] = self._leases.get(client_id, 0) + 1
+        try:
+            yield client
+        finally:
+            remaining = self._leases[client_id] - 1
+            if remaining:
+                self._leases[client_id] = remaining
+            else:
+                del self._leases[client_id]
+                retired = self._retired.pop(client_id, None)
+                if retired is not None:
+                    self._schedule_close(retired)
+
+    def _evict_idle(self, now: float) -> None:
+        """清理空闲超时的客户端"""
+        expired = [
+            key for key, (_, last_used) in self._clients.items()
+            if now - last_used > self.idle_ttl
+        ]
+        for key in expired:
+            client, _ = self._clients.pop(key)
+            self._retire(client)
+
+    def _retire(self, client: AsyncOpenAI) -> None:
+        """淘汰客户端：没有租约时立即关闭，否则等最后一个租约归还"""
+        if self._leases.get(id(client)):
+            self._retired[id(client)] = client
+        else:
+            self._schedule_close(client)
+
+    def _schedule_close(self, client: AsyncOpenAI) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._close_client(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_client(client: AsyncOpenAI) -> None:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.debug(f"Error closing LLM client: {str(e)}")
+
+    async def close(self) -> None:
+        """关闭所有客户端，包括仍有租约的已淘汰客户端（应用 shutdown 时调用）"""
+        await asyncio.gather(*list(self._closing), return_exceptions=True)
+
+        clients = list(self._retired.values())
+        clients.extend(client for client, _ in self._clients.values())
+        self._retired.clear()
+        self._clients.clear()
+        for client in clients:
+            await self._close_client(client)
+
+    def stats(self) -> dict:
+        return {
+            "cached_clients": len(self._clients),
+            "leased_clients": len(self._leases),
+            "retired_clients": len(self._retired),
+        }
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# 全局实例
+llm_client_registry = LLMClientRegistry()
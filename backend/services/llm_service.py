@@ -2,17 +2,19 @@ import base64
 import json
 import logging
 import asyncio
-from typing import List, Optional
-from openai import OpenAI, APIError, APITimeoutError
+from typing import AsyncIterator, ContextManager, List, Optional, Tuple
+from openai import AsyncOpenAI, APIError, APITimeoutError
 from schemas import Dish, ChatRequest
 from config import settings
+from .llm_clients import llm_client_registry
+from utils.dish_utils import merge_dishes
+from utils.json_stream import JSONArrayStreamParser
 
 logger = logging.getLogger(__name__)
 
 
 class GeminiAnalyzer:
     def __init__(self):
-        self._client = None
         self.model = settings.LLM_MODEL
         
     def _get_model(self, override_model: Optional[str] = None) -> str:
@@ -25,35 +27,68 @@ class GeminiAnalyzer:
         normalized = value.strip()
         return normalized if normalized else None
     
-    @property
-    def client(self):
-        """延迟初始化客户端"""
-        if self._client is None:
-            # 简化初始化，避免 proxies 参数问题
-            self._client = OpenAI(
-                api_key=settings.LLM_API_KEY,
-                base_url=settings.LLM_BASE_URL
-            )
-        return self._client
-
-    def _get_client(self, llm_api_key: Optional[str] = None, llm_base_url: Optional[str] = None) -> OpenAI:
-        """获取客户端，支持按请求覆盖 API Key / Base URL。"""
+    def _lease_client(self, llm_api_key: Optional[str] = None, llm_base_url: Optional[str] = None) -> ContextManager[AsyncOpenAI]:
+        """租用客户端，支持按请求覆盖 API Key / Base URL（从注册表复用，调用结束前不会被关闭）。"""
         normalized_api_key = self._normalize_optional_str(llm_api_key)
         normalized_base_url = self._normalize_optional_str(llm_base_url)
 
-        # 未覆盖时复用全局客户端
-        if not normalized_api_key and not normalized_base_url:
-            if not settings.LLM_API_KEY:
-                raise ValueError("LLM API key is missing. Please set it in Settings or .env")
-            return self.client
-
         effective_api_key = normalized_api_key or settings.LLM_API_KEY
         if not effective_api_key:
             raise ValueError("LLM API key is missing. Please set it in Settings or .env")
 
-        return OpenAI(
-            api_key=effective_api_key,
-            base_url=normalized_base_url or settings.LLM_BASE_URL
+        return llm_client_registry.lease(
+            effective_api_key,
+            normalized_base_url or settings.LLM_BASE_URL
+        )
+    
+    def _build_menu_message(
+        self,
+        base64_image: str,
+        mime_type: str,
+        target_language: str,
+        source_currency: Optional[str]
+    ) -> dict:
+        """构造菜单识别的多模态消息"""
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": self._get_system_prompt(target_language, source_currency)
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime_type};base64,{base64_image}"
+                    }
+                }
+            ]
+        }
+
+    def _build_dish(self, item: dict, source_currency: Optional[str] = None) -> Dish:
+        """将 LLM 返回的单个菜品 JSON 转换为 Dish 对象"""
+        # 截断描述以确保不超过限制
+        description = item.get("description", "")[:500]
+
+        name_to_search = item['original_name'] if item.get('original_name') else item['english_name']
+        
+        # 强制使用用户指定的货币（如果提供了且 LLM 没填或填错）
+        # 但这里我们主要依赖 Prompt 的引导，并在转换时兜底
+        currency = item.get("currency")
+        if source_currency and (not currency or currency == "Unknown"):
+            currency = source_currency
+        
+        return Dish(
+            original_name=item["original_name"],
+            english_name=item["english_name"],
+            description=description,
+            flavor_tags=item.get("flavor_tags", [])[:5],
+            dietary_tags=item.get("dietary_tags", []),
+            ingredients=item.get("ingredients", []),
+            search_term=f"{name_to_search} food dish",
+            price=item.get("price"),
+            currency=currency,
+            language_code=item.get("language_code", "en")
         )
     
     async def analyze_menu_image(
@@ -65,13 +100,15 @@ class GeminiAnalyzer:
         llm_api_key: Optional[str] = None,
         llm_base_url: Optional[str] = None,
         llm_temperature: Optional[float] = None,
-        llm_timeout: Optional[int] = None
+        llm_timeout: Optional[int] = None,
+        mime_type: str = "image/jpeg"
     ) -> List[Dish]:
         """
         分析菜单图片，识别菜品信息
         
         Args:
             base64_image: Base64编码的图片
+            mime_type: 图片的 MIME 类型
             
         Returns:
             菜品列表
@@ -82,67 +119,29 @@ class GeminiAnalyzer:
         """
         try:
             model = self._get_model(self._normalize_optional_str(llm_model))
-            client = self._get_client(llm_api_key, llm_base_url)
             temperature = llm_temperature if llm_temperature is not None else settings.LLM_TEMPERATURE
             timeout = llm_timeout if llm_timeout is not None else settings.LLM_TIMEOUT
 
-            # 构造消息
-            message = {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": self._get_system_prompt(target_language, source_currency)
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
+            message = self._build_menu_message(base64_image, mime_type, target_language, source_currency)
             
             # 调用 Gemini API
-            response = await asyncio.to_thread(
-                client.chat.completions.create,
-                model=model,
-                messages=[message],
-                temperature=temperature,
-                timeout=timeout
-            )
+            with self._lease_client(llm_api_key, llm_base_url) as client:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[message],
+                    temperature=temperature,
+                    timeout=timeout
+                )
             
             # 解析响应
             content = response.choices[0].message.content
             dishes_data = self._parse_json_response(content)
             
             # 转换为 Dish 对象
-            dishes = []
-            for item in dishes_data.get("dishes", []):
-                # 截断描述以确保不超过限制
-                description = item.get("description", "")[:500]
-
-                name_to_search = item['original_name'] if item.get('original_name') else item['english_name']
-                
-                # 强制使用用户指定的货币（如果提供了且 LLM 没填或填错）
-                # 但这里我们主要依赖 Prompt 的引导，并在转换时兜底
-                currency = item.get("currency")
-                if source_currency and (not currency or currency == "Unknown"):
-                    currency = source_currency
-                
-                dish = Dish(
-                    original_name=item["original_name"],
-                    english_name=item["english_name"],
-                    description=description,
-                    flavor_tags=item.get("flavor_tags", [])[:5],
-                    dietary_tags=item.get("dietary_tags", []),
-                    ingredients=item.get("ingredients", []),
-                    search_term=f"{name_to_search} food dish",
-                    price=item.get("price"),
-                    currency=currency,
-                    language_code=item.get("language_code", "en")
-                )
-                dishes.append(dish)
+            dishes = [
+                self._build_dish(item, source_currency)
+                for item in dishes_data.get("dishes", [])
+            ]
             
             logger.info(f"Successfully analyzed {len(dishes)} dishes from menu in {target_language}")
             return dishes
@@ -154,13 +153,143 @@ class GeminiAnalyzer:
             logger.error(f"Gemini API error: {str(e)}")
             raise ValueError(f"API error: {str(e)}")
     
+    async def stream_menu_dishes(
+        self,
+        base64_image: str,
+        target_language: str = "English",
+        source_currency: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None,
+        mime_type: str = "image/jpeg"
+    ) -> AsyncIterator[Dish]:
+        """
+        流式识别菜单：以 stream=True 调用模型，`dishes` 数组中每个对象闭合后立即产出 Dish
+
+        首个菜品的到达时间只取决于第一个对象的生成，而非整个 JSON。
+        若增量解析未得到任何菜品（如模型输出格式异常），在流结束后回退到整体解析。
+
+        Raises:
+            ValueError: API 调用失败或解析失败
+        """
+        try:
+            model = self._get_model(self._normalize_optional_str(llm_model))
+            temperature = llm_temperature if llm_temperature is not None else settings.LLM_TEMPERATURE
+            timeout = llm_timeout if llm_timeout is not None else settings.LLM_TIMEOUT
+            message = self._build_menu_message(base64_image, mime_type, target_language, source_currency)
+
+            parser = JSONArrayStreamParser("dishes")
+            content_parts = []
+            emitted = 0
+            # 租约覆盖整个流的读取，流未结束前客户端不会被注册表关闭
+            with self._lease_client(llm_api_key, llm_base_url) as client:
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=[message],
+                    temperature=temperature,
+                    timeout=timeout,
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        content_parts.append(delta)
+                        for item in parser.feed(delta):
+                            try:
+                                dish = self._build_dish(item, source_currency)
+                            except Exception as e:
+                                logger.debug(f"Skipping malformed streamed dish: {str(e)}")
+                                continue
+                            emitted += 1
+                            yield dish
+                finally:
+                    # 客户端断开或任务取消时关闭底层 HTTP 连接，模型不再继续生成
+                    await stream.close()
+
+            if emitted == 0:
+                dishes_data = self._parse_json_response("".join(content_parts))
+                for item in dishes_data.get("dishes", []):
+                    emitted += 1
+                    yield self._build_dish(item, source_currency)
+
+            logger.info(f"Successfully streamed {emitted} dishes from menu in {target_language}")
+
+        except APITimeoutError:
+            logger.error("Gemini API timeout")
+            raise ValueError("API timeout - please try again")
+        except APIError as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise ValueError(f"API error: {str(e)}")
+    
+    async def analyze_menu_tiles(
+        self,
+        tiles: List[Tuple[str, str]],
+        target_language: str = "English",
+        source_currency: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None
+    ) -> Tuple[List[Dish], int]:
+        """
+        并发识别菜单切片并合并结果
+
+        每个切片单独调用视觉模型，总耗时取决于最大的切片而非整张菜单；
+        重叠区域重复识别出的菜品按 original_name + 价格去重。
+
+        Args:
+            tiles: [(Base64 编码的切片, MIME 类型)]，按阅读顺序排列
+
+        Returns:
+            (合并去重后的菜品列表, 识别失败的切片数)；失败数大于 0 时结果不完整，调用方不应缓存
+
+        Raises:
+            ValueError: 所有切片均识别失败
+        """
+        results = await asyncio.gather(
+            *[
+                self.analyze_menu_image(
+                    base64_image=base64_tile,
+                    target_language=target_language,
+                    source_currency=source_currency,
+                    llm_model=llm_model,
+                    llm_api_key=llm_api_key,
+                    llm_base_url=llm_base_url,
+                    llm_temperature=llm_temperature,
+                    llm_timeout=llm_timeout,
+                    mime_type=mime_type,
+                )
+                for base64_tile, mime_type in tiles
+            ],
+            return_exceptions=True
+        )
+
+        dish_lists = [result for result in results if isinstance(result, list)]
+        errors = [result for result in results if isinstance(result, Exception)]
+        if not dish_lists and errors:
+            raise errors[0] if isinstance(errors[0], ValueError) else ValueError(str(errors[0]))
+        if errors:
+            logger.warning(f"{len(errors)}/{len(tiles)} menu tiles failed: {str(errors[0])}")
+
+        dishes = merge_dishes(dish_lists)
+        logger.info(
+            f"Merged {sum(len(d) for d in dish_lists)} dishes from {len(tiles)} tiles into {len(dishes)}"
+        )
+        return dishes, len(errors)
+    
     async def chat_with_menu(self, request: ChatRequest) -> str:
         """
         基于菜单上下文与用户聊天
         """
         try:
             model = self._get_model(self._normalize_optional_str(request.llm_model))
-            client = self._get_client(request.llm_api_key, request.llm_base_url)
             temperature = request.llm_temperature if request.llm_temperature is not None else 0.7
             timeout = request.llm_timeout if request.llm_timeout is not None else 20
 
@@ -243,13 +372,13 @@ You're a helpful friend, not a robot. Be natural, be helpful, and make their din
             # Add current user message
             messages.append({"role": "user", "content": request.message})
 
-            response = await asyncio.to_thread(
-                client.chat.completions.create,
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                timeout=timeout
-            )
+            with self._lease_client(request.llm_api_key, request.llm_base_url) as client:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=timeout
+                )
             
             return response.choices[0].message.content
 
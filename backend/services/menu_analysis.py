@@ -0,0 +1,237 @@
+"""菜单识别编排 - 缓存查询、预处理、切片与视觉模型调用"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional, Tuple
+
+from schemas import Dish
+from config import settings
+from utils.file_utils import (
+    MenuFingerprint,
+    compute_menu_fingerprint,
+    detect_image_mime_type,
+    encode_image_to_base64,
+    preprocess_image,
+    sha256_hexdigest,
+    split_menu_tiles,
+)
+from .llm_service import gemini_analyzer
+from .analysis_cache import analysis_cache
+from .menu_similarity import menu_similarity_index
+from .image_workers import image_workers
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreparedMenu:
+    """缓存查询和预处理后的菜单上传"""
+    cache_key: str
+    context: str
+    image_data: bytes
+    mime_type: str
+    fingerprint: Optional[MenuFingerprint] = None
+    cached_dishes: Optional[List[Dish]] = None
+    meta: dict = field(default_factory=dict)
+
+
+class MenuAnalysisService:
+    """
+    菜单识别流程
+
+    依次尝试：内容寻址精确命中 → 近似重复命中（dHash 候选 + 像素复核） → 预处理后调用视觉模型（整图 / 切片 / 流式）
+    """
+
+    async def prepare(
+        self,
+        contents: bytes,
+        target_language: str,
+        source_currency: Optional[str],
+        llm_model: Optional[str] = None,
+        enable_tiling: bool = False,
+    ) -> PreparedMenu:
+        """查询缓存；未命中时完成预处理并计算近似重复指纹"""
+        model = (llm_model or "").strip() or settings.LLM_MODEL
+        # 切片与整图识别的结果不同，分开缓存
+        mode = "tiled" if enable_tiling else "whole"
+        # hashlib 计算时释放 GIL，放到线程即可，无需把整张图片序列化给工作进程
+        digest = await asyncio.to_thread(sha256_hexdigest, contents)
+        cache_key = analysis_cache.build_key(digest, target_language, source_currency, model, mode)
+        context = menu_similarity_index.build_context(target_language, source_currency, model, mode)
+
+        cached = await analysis_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Analysis cache hit ({len(cached)} dishes)")
+            return PreparedMenu(
+                cache_key=cache_key,
+                context=context,
+                image_data=contents,
+                mime_type=detect_image_mime_type(contents),
+                cached_dishes=cached,
+                meta={"cache": "exact"},
+            )
+
+        # 预处理：旋正、缩放、重新编码（失败时回退到原图）
+        prepared = PreparedMenu(
+            cache_key=cache_key,
+            context=context,
+            image_data=contents,
+            mime_type=detect_image_mime_type(contents),
+            meta={"cache": "miss", "image_bytes_before": len(contents)},
+        )
+        if settings.UPLOAD_PREPROCESS_ENABLED:
+            try:
+                image = await image_workers.run(preprocess_image, contents)
+                prepared.image_data = image.data
+                prepared.mime_type = image.mime_type
+                logger.info(
+                    f"🗜️  Preprocessed upload: {image.original_bytes} → {image.processed_bytes} bytes "
+                    f"({image.width}x{image.height}, {image.mime_type})"
+                )
+            except Exception as e:
+                logger.warning(f"Image preprocessing failed, sending original: {str(e)}")
+        prepared.meta["image_bytes_after"] = len(prepared.image_data)
+        prepared.meta["image_mime_type"] = prepared.mime_type
+
+        if menu_similarity_index.enabled:
+            # 指纹基于原始上传（旋正后），不受预处理配置影响
+            try:
+                prepared.fingerprint = await image_workers.run(compute_menu_fingerprint, contents)
+            except Exception as e:
+                logger.warning(f"Failed to compute menu fingerprint: {str(e)}")
+
+        if prepared.fingerprint is not None:
+            for distance, similar_key in await menu_similarity_index.find_duplicates(context, prepared.fingerprint):
+                similar = await analysis_cache.get(similar_key)
+                if similar is None:
+                    # 识别结果已从缓存淘汰，索引条目随之作废
+                    await menu_similarity_index.remove(similar_key)
+                    continue
+                logger.info(f"⚡ Near-duplicate menu hit (distance={distance}, {len(similar)} dishes)")
+                # 以当前上传内容登记，下次精确命中
+                await analysis_cache.set(cache_key, similar)
+                prepared.cached_dishes = similar
+                prepared.meta["cache"] = "near_duplicate"
+                break
+
+        return prepared
+
+    async def store(self, prepared: PreparedMenu, dishes: List[Dish]) -> None:
+        """写入识别结果缓存和近似重复索引"""
+        await analysis_cache.set(prepared.cache_key, dishes)
+        if prepared.fingerprint is not None and dishes:
+            await menu_similarity_index.add(prepared.context, prepared.fingerprint, prepared.cache_key)
+
+    async def analyze(
+        self,
+        contents: bytes,
+        target_language: str,
+        source_currency: Optional[str],
+        llm_model: Optional[str] = None,
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None,
+        enable_tiling: bool = False,
+    ) -> Tuple[List[Dish], dict]:
+        """
+        识别菜单菜品，优先读取缓存
+
+        Returns:
+            (菜品列表, 处理元数据: cache 状态 "exact" / "near_duplicate" / "miss"，以及预处理前后字节数；
+             部分切片识别失败时 incomplete=True，结果不写入缓存)
+        """
+        prepared = await self.prepare(contents, target_language, source_currency, llm_model, enable_tiling)
+        if prepared.cached_dishes is not None:
+            return prepared.cached_dishes, prepared.meta
+
+        # 长菜单/多栏菜单：切片并行识别
+        # 在原始上传上切片（预处理结果已缩放到 UPLOAD_MAX_EDGE），每个切片再单独预处理，保留文字分辨率
+        tiles = []
+        if enable_tiling:
+            try:
+                tiles = await image_workers.run(split_menu_tiles, contents)
+            except Exception as e:
+                logger.warning(f"Menu tiling failed, analyzing whole image: {str(e)}")
+
+        if tiles:
+            logger.info(f"🧩 Analyzing menu in {len(tiles)} tiles")
+            prepared.meta["tiles"] = len(tiles)
+            encoded_tiles = await asyncio.gather(
+                *[image_workers.run(encode_image_to_base64, tile.data) for tile in tiles]
+            )
+            dishes, failed_tiles = await gemini_analyzer.analyze_menu_tiles(
+                [(encoded, tile.mime_type) for encoded, tile in zip(encoded_tiles, tiles)],
+                target_language=target_language,
+                source_currency=source_currency,
+                llm_model=llm_model,
+                llm_api_key=llm_api_key,
+                llm_base_url=llm_base_url,
+                llm_temperature=llm_temperature,
+                llm_timeout=llm_timeout,
+            )
+            if failed_tiles:
+                # 部分切片失败：返回已识别的菜品，但不缓存部分结果
+                prepared.meta["incomplete"] = True
+                prepared.meta["failed_tiles"] = failed_tiles
+                return dishes, prepared.meta
+        else:
+            dishes = await gemini_analyzer.analyze_menu_image(
+                base64_image=await image_workers.run(encode_image_to_base64, prepared.image_data),
+                target_language=target_language,
+                source_currency=source_currency,
+                llm_model=llm_model,
+                llm_api_key=llm_api_key,
+                llm_base_url=llm_base_url,
+                llm_temperature=llm_temperature,
+                llm_timeout=llm_timeout,
+                mime_type=prepared.mime_type,
+            )
+
+        await self.store(prepared, dishes)
+        return dishes, prepared.meta
+
+    async def stream(
+        self,
+        prepared: PreparedMenu,
+        target_language: str,
+        source_currency: Optional[str],
+        llm_model: Optional[str] = None,
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None,
+        llm_temperature: Optional[float] = None,
+        llm_timeout: Optional[int] = None,
+    ) -> AsyncIterator[Dish]:
+        """
+        流式识别：缓存命中时立即产出全部菜品，否则逐个产出模型生成的菜品
+
+        流完整结束后写入缓存；中途失败不缓存部分结果。
+        """
+        if prepared.cached_dishes is not None:
+            for dish in prepared.cached_dishes:
+                yield dish
+            return
+
+        dishes = []
+        base64_image = await image_workers.run(encode_image_to_base64, prepared.image_data)
+        async for dish in gemini_analyzer.stream_menu_dishes(
+            base64_image=base64_image,
+            target_language=target_language,
+            source_currency=source_currency,
+            llm_model=llm_model,
+            llm_api_key=llm_api_key,
+            llm_base_url=llm_base_url,
+            llm_temperature=llm_temperature,
+            llm_timeout=llm_timeout,
+            mime_type=prepared.mime_type,
+        ):
+            # 保存快照，调用方随后对 dish 的修改（如填充图片）不进入缓存
+            dishes.append(dish.model_copy(deep=True))
+            yield dish
+
+        await self.store(prepared, dishes)
+
+
+# 全局实例
+menu_analysis = MenuAnalysisService()
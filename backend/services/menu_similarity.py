@@ -0,0 +1,275 @@
+"""近似重复菜单检索 - 感知哈希 (dHash) + BK-Tree 筛选候选，缩略图像素复核"""
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import settings
+from utils.bktree import BKTree
+from utils.cache import SQLiteStore, get_sqlite_store
+from utils.file_utils import MenuFingerprint, menu_fingerprint_difference
+from .image_workers import image_workers
+
+logger = logging.getLogger(__name__)
+
+
+class _IndexEntry(NamedTuple):
+    context: str
+    phash: int
+    # 仅内存模式保存缩略图；配置磁盘层时缩略图只在磁盘上，复核候选时再读取
+    thumbnail: Optional[bytes]
+
+
+class MenuSimilarityIndex:
+    """
+    已分析菜单的感知哈希索引
+
+    同一份菜单被重新压缩、缩放后再次上传时，SHA-256 不同但 dHash 接近。
+    索引按识别上下文（语言、货币、模型、识别方式）分组，每组一棵 BK-Tree，
+    条目指向 analysis_cache 中的缓存键，并保存指纹缩略图供像素级复核
+    （dHash 看不到文字，只能作为候选筛选）。
+
+    BK-Tree 不支持删除：被淘汰、覆盖或移除的条目在树中留作墓碑，查询时跳过，
+    某棵树的墓碑超过一半（且不少于 COMPACT_MIN_TOMBSTONES）时才重建该树，删除的均摊代价为 O(1)。
+    条目上限 PHASH_INDEX_MAX_ENTRIES 与磁盘层识别缓存对应；未配置磁盘层时识别结果只在内存 LRU 中，
+    上限取 ANALYSIS_CACHE_MAX_ENTRIES。
+    """
+
+    NAMESPACE = "menu_phash"
+    THUMBNAIL_NAMESPACE = "menu_phash_thumbnail"
+    COMPACT_MIN_TOMBSTONES = 64
+
+    def __init__(self):
+        self.enabled = settings.PHASH_DEDUP_ENABLED
+        self.max_distance = settings.PHASH_MAX_DISTANCE
+        self.max_difference = settings.PHASH_VERIFY_MAX_DIFF
+        self._entries: "OrderedDict[str, _IndexEntry]" = OrderedDict()
+        self._trees: Dict[str, BKTree] = {}
+        # context -> 树中的墓碑数
+        self._tombstones: Dict[str, int] = {}
+        self._disk: Optional[SQLiteStore] = None
+        if settings.CACHE_DB_PATH:
+            try:
+                self._disk = get_sqlite_store(settings.CACHE_DB_PATH)
+            except Exception as e:
+                logger.warning(f"Menu similarity index: disk persistence disabled ({str(e)})")
+        if self._disk is not None:
+            self.max_entries = settings.PHASH_INDEX_MAX_ENTRIES
+        else:
+            self.max_entries = min(settings.PHASH_INDEX_MAX_ENTRIES, settings.ANALYSIS_CACHE_MAX_ENTRIES)
+
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.compactions = 0
+
+    @staticmethod
+    def build_context(
+        target_language: str,
+        source_currency: Optional[str],
+        model: str,
+        mode: str = "whole",
+    ) -> str:
+        """识别上下文，只有上下文一致的菜单才允许复用"""
+        language = (target_language or "").strip().lower()
+        currency = (source_currency or "").strip().upper()
+        return f"{language}:{currency}:{model}:{mode}"
+
+    def _is_live(self, cache_key: str, entry: _IndexEntry) -> bool:
+        return self._entries.get(cache_key) is entry
+
+    def _bury(self, entry: _IndexEntry) -> None:
+        """条目已从 _entries 移除：在树中记为墓碑，墓碑过多时压缩该树"""
+        context = entry.context
+        tree = self._trees.get(context)
+        if tree is None:
+            return
+        tombstones = self._tombstones.get(context, 0) + 1
+        if tombstones >= len(tree):
+            # 整棵树都是墓碑
+            self._trees.pop(context)
+            self._tombstones.pop(context, None)
+        elif tombstones >= self.COMPACT_MIN_TOMBSTONES and tombstones * 2 >= len(tree):
+            self._compact(context)
+        else:
+            self._tombstones[context] = tombstones
+
+    def _compact(self, context: str) -> None:
+        """只用存活条目重建该上下文的树（代价与树的大小成正比，由之前的删除分摊）"""
+        compacted = BKTree()
+        for phash, (cache_key, entry) in self._trees[context].items():
+            if self._is_live(cache_key, entry):
+                compacted.add(phash, (cache_key, entry))
+        self._trees[context] = compacted
+        self._tombstones.pop(context, None)
+        self.compactions += 1
+
+    def _insert(self, cache_key: str, entry: _IndexEntry) -> List[str]:
+        """登记条目，返回因超出容量被淘汰的缓存键"""
+        previous = self._entries.pop(cache_key, None)
+        if previous is not None:
+            self._bury(previous)
+        self._entries[cache_key] = entry
+        tree = self._trees.get(entry.context)
+        if tree is None:
+            tree = BKTree()
+            self._trees[entry.context] = tree
+        tree.add(entry.phash, (cache_key, entry))
+
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted_key, evicted_entry = self._entries.popitem(last=False)
+            self._bury(evicted_entry)
+            evicted.append(evicted_key)
+        self.evictions += len(evicted)
+        return evicted
+
+    def _delete_rows(self, cache_keys: List[str]) -> None:
+        for cache_key in cache_keys:
+            self._disk.delete(self.NAMESPACE, cache_key)
+            self._disk.delete(self.THUMBNAIL_NAMESPACE, cache_key)
+
+    async def _delete_from_disk(self, cache_keys: List[str]) -> None:
+        if self._disk is None or not cache_keys:
+            return
+        try:
+            await asyncio.to_thread(self._delete_rows, cache_keys)
+        except Exception as e:
+            logger.warning(f"Failed to delete menu hash: {str(e)}")
+
+    def _load_rows(self, now: float) -> List[Tuple[str, str]]:
+        self._disk.purge_expired(self.NAMESPACE, now)
+        self._disk.purge_expired(self.THUMBNAIL_NAMESPACE, now)
+        return self._disk.items(self.NAMESPACE, now)
+
+    async def load(self) -> None:
+        """启动时从磁盘恢复索引（只读哈希，不读缩略图；按登记时间，超出容量的旧条目被淘汰）"""
+        if not self.enabled or self._disk is None:
+            return
+        try:
+            rows = await asyncio.to_thread(self._load_rows, time.time())
+        except Exception as e:
+            logger.warning(f"Failed to load menu similarity index: {str(e)}")
+            return
+
+        loaded = []
+        stale = []
+        for cache_key, raw in rows:
+            try:
+                data = json.loads(raw)
+                entry = _IndexEntry(data["context"], int(data["phash"], 16), None)
+                loaded.append((data.get("created_at", 0.0), cache_key, entry))
+            except Exception:
+                stale.append(cache_key)
+        loaded.sort(key=lambda item: item[0])
+        for _, cache_key, entry in loaded:
+            stale.extend(self._insert(cache_key, entry))
+        await self._delete_from_disk(stale)
+        logger.info(f"✅ Menu similarity index loaded ({len(self._entries)} menus)")
+
+    async def _thumbnail(self, cache_key: str, entry: _IndexEntry) -> Optional[bytes]:
+        if entry.thumbnail is not None:
+            return entry.thumbnail
+        if self._disk is None:
+            return None
+        row = await asyncio.to_thread(self._disk.get, self.THUMBNAIL_NAMESPACE, cache_key)
+        if row is None:
+            return None
+        return base64.b64decode(row[0])
+
+    async def find_duplicates(self, context: str, fingerprint: MenuFingerprint) -> List[Tuple[int, str]]:
+        """
+        查找同一份菜单：dHash 汉明距离在阈值内的候选，再在指纹缩略图上做像素复核
+
+        Returns:
+            通过复核的 [(汉明距离, analysis_cache 键)]，按距离升序
+        """
+        if not self.enabled:
+            return []
+        tree = self._trees.get(context)
+        candidates = tree.search(fingerprint.dhash, self.max_distance) if tree else []
+
+        matches = []
+        for distance, (cache_key, entry) in candidates:
+            if not self._is_live(cache_key, entry):
+                continue
+            try:
+                thumbnail = await self._thumbnail(cache_key, entry)
+                if thumbnail is None:
+                    # 缩略图缺失（旧格式或已被清理）的条目无法复核
+                    await self.remove(cache_key)
+                    continue
+                difference = await image_workers.run(
+                    menu_fingerprint_difference, fingerprint.thumbnail, thumbnail
+                )
+            except Exception as e:
+                logger.warning(f"Menu fingerprint comparison failed: {str(e)}")
+                continue
+            if difference <= self.max_difference:
+                matches.append((distance, cache_key))
+            else:
+                self.rejected += 1
+                logger.debug(f"dHash candidate rejected by pixel check (distance={distance}, diff={difference:.3f})")
+
+        if matches:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return matches
+
+    def _persist(self, context: str, fingerprint: MenuFingerprint, cache_key: str) -> None:
+        now = time.time()
+        expires_at = now + settings.ANALYSIS_CACHE_TTL
+        raw = json.dumps({
+            "context": context,
+            "phash": format(fingerprint.dhash, "x"),
+            "created_at": now,
+        })
+        thumbnail = base64.b64encode(fingerprint.thumbnail).decode("ascii")
+        self._disk.set(self.THUMBNAIL_NAMESPACE, cache_key, thumbnail, expires_at, now)
+        self._disk.set(self.NAMESPACE, cache_key, raw, expires_at, now)
+
+    async def add(self, context: str, fingerprint: MenuFingerprint, cache_key: str) -> None:
+        """登记一份已分析的菜单"""
+        if not self.enabled:
+            return
+        thumbnail = fingerprint.thumbnail if self._disk is None else None
+        evicted = self._insert(cache_key, _IndexEntry(context, fingerprint.dhash, thumbnail))
+        await self._delete_from_disk(evicted)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._persist, context, fingerprint, cache_key)
+            except Exception as e:
+                logger.warning(f"Failed to persist menu hash: {str(e)}")
+
+    async def remove(self, cache_key: str) -> None:
+        """移除条目（对应的识别结果已从 analysis_cache 淘汰）"""
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        self._bury(entry)
+        await self._delete_from_disk([cache_key])
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "indexed_menus": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "max_difference": self.max_difference,
+            "tombstones": sum(self._tombstones.values()),
+            "compactions": self.compactions,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected_by_pixel_check": self.rejected,
+        }
+
+
+# 全局实例
+menu_similarity_index = MenuSimilarityIndex()
@@ -0,0 +1,228 @@
+"""搜索 API 限流与配额管理 - 按 API Key 的令牌桶，SerpAPI / Google 共用"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 429 未携带 Retry-After 时的默认退避 (秒)
+DEFAULT_RETRY_AFTER = 2.0
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+
+    突发请求在桶内排队（asyncio.Lock 按到达顺序唤醒），按 rate 匀速放行，而不是直接失败。
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = max(rate, 0.01)
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+    async def acquire(self, max_wait: float) -> bool:
+        """取一个令牌；预计等待超过 max_wait 秒时放弃并返回 False"""
+        deadline = time.monotonic() + max_wait
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._paused_until - now
+                    if wait <= 0:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return True
+                        wait = (1 - self._tokens) / self.rate
+                    if now + wait > deadline:
+                        return False
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+    def pause(self, seconds: float) -> None:
+        """收到 429 后暂停放行并清空令牌"""
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, now + seconds)
+
+
+@dataclass
+class _KeyState:
+    provider: str
+    bucket: TokenBucket
+    monthly_quota: int
+    month: str = ""
+    used: int = 0
+    remaining: Optional[int] = None       # 来自响应头，优先于 monthly_quota - used
+    rate_limited: int = 0
+    rejected: int = 0
+    last_status: Optional[int] = None
+    extra: dict = field(default_factory=dict)
+
+
+def _current_month() -> str:
+    return time.strftime("%Y-%m", time.gmtime())
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float:
+    """429 响应的重试等待秒数：Retry-After（秒数形式），缺失时为 DEFAULT_RETRY_AFTER"""
+    retry_after = _parse_int(headers.get("Retry-After"))
+    return float(retry_after) if retry_after is not None and retry_after >= 0 else DEFAULT_RETRY_AFTER
+
+
+class SearchRateLimiter:
+    """
+    按 (provider, API Key) 维护令牌桶和本月配额
+
+    - acquire：排队取令牌并预占一次配额；本月配额耗尽或排队超时时返回 False
+    - record_response：根据状态码和响应头更新剩余配额；429 时按 Retry-After 暂停该 Key
+    """
+
+    def __init__(self):
+        self.enabled = settings.SEARCH_RATE_LIMIT_ENABLED
+        self._states: Dict[Tuple[str, str], _KeyState] = {}
+
+    @staticmethod
+    def _fingerprint(api_key: str) -> str:
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def _monthly_quota(provider: str) -> int:
+        if provider == "serpapi":
+            return settings.SERPAPI_MONTHLY_QUOTA
+        if provider == "google":
+            return settings.GOOGLE_SEARCH_MONTHLY_QUOTA
+        return 0
+
+    def _state(self, provider: str, api_key: str) -> _KeyState:
+        key = (provider, self._fingerprint(api_key))
+        state = self._states.get(key)
+        if state is None:
+            state = _KeyState(
+                provider=provider,
+                bucket=TokenBucket(settings.SEARCH_RATE_LIMIT_PER_SECOND, settings.SEARCH_RATE_LIMIT_BURST),
+                monthly_quota=self._monthly_quota(provider),
+            )
+            self._states[key] = state
+        month = _current_month()
+        if state.month != month:
+            state.month = month
+            state.used = 0
+            state.remaining = None
+        return state
+
+    @staticmethod
+    def _quota_left(state: _KeyState) -> Optional[int]:
+        if state.remaining is not None:
+            return state.remaining
+        if state.monthly_quota > 0:
+            return max(state.monthly_quota - state.used, 0)
+        return None
+
+    async def acquire(self, provider: str, api_key: str) -> bool:
+        """请求前调用；返回 False 时不应发出请求"""
+        if not self.enabled:
+            return True
+        state = self._state(provider, api_key)
+        if self._quota_left(state) == 0:
+            state.rejected += 1
+            logger.warning(f"{provider}: monthly search quota exhausted, skipping request")
+            return False
+        if not await state.bucket.acquire(settings.SEARCH_RATE_LIMIT_MAX_WAIT):
+            state.rejected += 1
+            logger.warning(f"{provider}: rate limiter queue wait exceeded {settings.SEARCH_RATE_LIMIT_MAX_WAIT}s")
+            return False
+        # 排队期间其他请求可能已用完配额；取到令牌后再检查并预占一次
+        if self._quota_left(state) == 0:
+            state.rejected += 1
+            return False
+        state.used += 1
+        if state.remaining is not None:
+            state.remaining = max(state.remaining - 1, 0)
+        return True
+
+    def record_response(self, provider: str, api_key: str, status: int, headers: Mapping[str, str]) -> float:
+        """
+        记录一次响应
+
+        Returns:
+            429 时建议的重试等待秒数，否则为 0
+        """
+        if not self.enabled:
+            return 0.0
+        state = self._state(provider, api_key)
+        state.last_status = status
+
+        remaining = _parse_int(headers.get("X-RateLimit-Remaining"))
+        if remaining is not None:
+            state.remaining = remaining
+        limit = _parse_int(headers.get("X-RateLimit-Limit"))
+        if limit is not None:
+            state.extra["header_limit"] = limit
+
+        if status == 429:
+            # 被限流的请求不计入配额，退还 acquire 时的预占
+            state.used = max(state.used - 1, 0)
+            state.rate_limited += 1
+            delay = parse_retry_after(headers)
+            state.bucket.pause(delay)
+            return delay
+        return 0.0
+
+    def stats(self) -> dict:
+        """各 Key 的当前状态（Key 只显示指纹）"""
+        keys = []
+        for (provider, fingerprint), state in self._states.items():
+            keys.append({
+                "provider": provider,
+                "key": fingerprint,
+                "month": state.month,
+                "used_this_month": state.used,
+                "quota_left": self._quota_left(state),
+                "tokens": round(state.bucket.tokens, 2),
+                "waiting": state.bucket.waiting,
+                "rate_limited": state.rate_limited,
+                "rejected": state.rejected,
+                "last_status": state.last_status,
+                **state.extra,
+            })
+        return {
+            "enabled": self.enabled,
+            "rate_per_second": settings.SEARCH_RATE_LIMIT_PER_SECOND,
+            "burst": settings.SEARCH_RATE_LIMIT_BURST,
+            "keys": keys,
+        }
+
+
+# 全局实例
+search_rate_limiter = SearchRateLimiter()
@@ -0,0 +1,130 @@
+"""图片搜索结果缓存 - SerpAPI / Google 共用，支持 stale-while-revalidate"""
+
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from utils.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# 返回完整结果元数据；None 表示请求失败（不缓存）
+SearchLoader = Callable[[], Awaitable[Optional[List[dict]]]]
+
+
+class SearchResultCache:
+    """
+    缓存搜索 API 的原始结果（完整元数据，不只是 URL）
+
+    键 = provider + engine + 归一化查询词 + 数量。"Pad Thai food dish" 这类搜索词在大量菜单中重复出现，
+    命中后无需再调用付费 API。
+
+    - 新鲜期内直接返回
+    - 新鲜期后、过期前：立即返回旧结果，同时在后台刷新（stale-while-revalidate）
+    - 同一个键的并发未命中只发出一次请求
+    - 空结果只按 SEARCH_CACHE_EMPTY_TTL 短暂缓存（0 表示不缓存），提供方故障不会让菜品一周内都没有图片
+    """
+
+    def __init__(self):
+        self.enabled = settings.SEARCH_CACHE_ENABLED
+        self.fresh_ttl = settings.SEARCH_CACHE_TTL
+        self.empty_ttl = settings.SEARCH_CACHE_EMPTY_TTL
+        self._cache = TieredCache(
+            namespace="search_results",
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl=settings.SEARCH_CACHE_TTL + settings.SEARCH_CACHE_STALE_TTL,
+            db_path=settings.CACHE_DB_PATH or None,
+            disk_max_entries=settings.CACHE_DISK_MAX_ENTRIES,
+            purge_every=settings.CACHE_PURGE_EVERY_WRITES,
+        )
+        # key -> 进行中的请求（未命中合并 + 后台刷新去重）
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.empty_results = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """NFKC + 大小写折叠 + 合并空白"""
+        normalized = unicodedata.normalize("NFKC", query or "").casefold()
+        return _WHITESPACE.sub(" ", normalized).strip()
+
+    @classmethod
+    def build_key(cls, provider: str, engine: str, query: str, num: int) -> str:
+        return f"{provider}:{engine}:{num}:{cls.normalize_query(query)}"
+
+    async def _load_and_store(self, key: str, loader: SearchLoader) -> Optional[List[dict]]:
+        results = await loader()
+        if results is None:
+            return results
+        if results:
+            await self._cache.set(key, {"results": results, "fetched_at": time.time()})
+        elif self.empty_ttl > 0:
+            # 空结果可能来自提供方的临时故障，只按短 TTL 负缓存，过期后直接重新搜索（不走旧结果刷新）
+            self.empty_results += 1
+            await self._cache.set(key, {"results": results, "fetched_at": time.time()}, ttl=self.empty_ttl)
+        return results
+
+    def _start_load(self, key: str, loader: SearchLoader) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_and_store(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_load_done(key, t))
+        return task
+
+    def _on_load_done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Search cache load failed for {key}: {task.exception()}")
+
+    async def fetch(
+        self,
+        provider: str,
+        engine: str,
+        query: str,
+        num: int,
+        loader: SearchLoader,
+    ) -> Optional[List[dict]]:
+        """
+        读取缓存，未命中时调用 loader 并写入缓存
+
+        Returns:
+            结果元数据列表；loader 失败且无缓存时返回 None
+        """
+        if not self.enabled:
+            return await loader()
+
+        key = self.build_key(provider, engine, query, num)
+        entry = await self._cache.get(key)
+        if entry is not None:
+            if time.time() - entry.get("fetched_at", 0) > self.fresh_ttl:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    logger.debug(f"Search cache stale for '{query}', refreshing in background")
+                    self._start_load(key, loader)
+            return entry.get("results", [])
+
+        # shield：某个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "stale_hits": self.stale_hits,
+            "background_refreshes": self.refreshes,
+            "empty_results_cached": self.empty_results,
+            "inflight": len(self._inflight),
+            **self._cache.stats(),
+        }
+
+
+# 全局实例
+search_cache = SearchResultCache()
@@ -7,6 +7,10 @@ from typing import List, Optional
 
 from schemas import Dish
 from config import settings
+from .http_client import http_client
+from .image_candidates import ImageCandidate
+from .search_cache import search_cache
+from .rate_limiter import parse_retry_after, search_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +39,20 @@ class GoogleSearcher:
         Returns:
             图片 URL 列表
         """
+        results = await self.search_image_results(query, num=num, api_key=api_key)
+        return [item.get("link") for item in results if item.get("link")]
+    
+    async def search_image_results(
+        self,
+        query: str,
+        num: int = 3,
+        api_key: Optional[str] = None
+    ) -> List[dict]:
+        """
+        搜索图片，返回完整的 items 元数据（经搜索结果缓存）
+        
+        返回的字典来自共享缓存，调用方不应修改。
+        """
         if not self.api_key or not self.engine_id:
             logger.warning("Search API not configured")
             return []
@@ -43,46 +61,81 @@ class GoogleSearcher:
             logger.warning("Invalid engine ID 'google' - use valid Custom Search cx ID")
             return []
         
+        num = min(num, 10)  # Google API 最多 10 个结果
+        results = await search_cache.fetch(
+            "google",
+            self.engine_id,
+            query,
+            num,
+            lambda: self._request_image_results(query, num)
+        )
+        return results or []
+    
+    async def search_candidates(
+        self,
+        query: str,
+        num: int = 3,
+        api_key: Optional[str] = None
+    ) -> List[ImageCandidate]:
+        """搜索图片，返回带缩略图、尺寸、来源域名和排名的候选"""
+        results = await self.search_image_results(query, num=num, api_key=api_key)
+        candidates = [ImageCandidate.from_google(item, position) for position, item in enumerate(results, 1)]
+        return [candidate for candidate in candidates if candidate]
+    
+    async def _request_image_results(self, query: str, num: int) -> Optional[List[dict]]:
+        """调用 Google Custom Search，请求失败返回 None（不写入缓存）"""
         try:
             params = {
                 "q": query,
                 "cx": self.engine_id,
                 "key": self.api_key,
                 "searchType": "image",
-                "num": min(num, 10),  # Google API 最多 10 个结果
+                "num": num,
                 "safe": "active",
             }
             
             timeout = aiohttp.ClientTimeout(total=settings.SEARCH_TIMEOUT)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
+            for attempt in range(settings.SEARCH_RATE_LIMIT_RETRIES + 1):
+                # 排队取令牌：突发请求被平滑，而不是打出 429
+                if not await search_rate_limiter.acquire("google", self.api_key):
+                    return None
+                
+                async with http_client.session.get(
                     self.search_url,
                     params=params,
                     timeout=timeout,
                     proxy='http://127.0.0.1:7897',
                 ) as resp:
+                    retry_after = search_rate_limiter.record_response("google", self.api_key, resp.status, resp.headers)
                     if resp.status == 200:
                         data = await resp.json()
                         items = data.get("items", [])
-                        urls = [item.get("link") for item in items if item.get("link")]
-                        logger.debug(f"Search '{query}': found {len(urls)} results")
-                        return urls
+                        logger.debug(f"Search '{query}': found {len(items)} results")
+                        return items
                     
                     elif resp.status == 403:
                         logger.error("Google Search API: quota exceeded or permission denied")
                     elif resp.status == 429:
+                        if attempt < settings.SEARCH_RATE_LIMIT_RETRIES:
+                            # 限流器关闭时 record_response 返回 0，仍按 Retry-After 退避
+                            retry_after = retry_after or parse_retry_after(resp.headers)
+                            logger.warning(f"Google Search API: rate limit exceeded, retrying in {retry_after:.1f}s")
+                            resp.release()
+                            await asyncio.sleep(retry_after)
+                            continue
                         logger.warning("Google Search API: rate limit exceeded")
                     else:
                         logger.warning(f"Google Search API returned {resp.status}")
                     
-                    return []
+                    return None
+            return None
         
         except asyncio.TimeoutError:
             logger.warning(f"Search timeout for '{query}' (timeout: {settings.SEARCH_TIMEOUT}s)")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Search error for '{query}': {type(e).__name__}: {str(e)}")
-            return []
+            return None
     
     async def enrich_dishes_with_images(
         self,
@@ -105,13 +158,12 @@ class GoogleSearcher:
 
         semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_SEARCHES)
         
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self._search_dish_images(session, dish, semaphore)
-                for dish in dishes
-            ]
-            # 等待所有搜索完成
-            await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [
+            self._search_dish_images(http_client.session, dish, semaphore)
+            for dish in dishes
+        ]
+        # 等待所有搜索完成
+        await asyncio.gather(*tasks, return_exceptions=True)
         
         # 统计结果
         success_count = sum(1 for d in dishes if d.image_urls)
@@ -6,6 +6,10 @@ import logging
 from typing import List, Optional
 
 from config import settings
+from .http_client import http_client
+from .image_candidates import ImageCandidate
+from .search_cache import search_cache
+from .rate_limiter import parse_retry_after, search_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -40,52 +44,99 @@ class SerpAPISearcher:
         Returns:
             图片 URL 列表
         """
+        results = await self.search_image_results(query, num=num, api_key=api_key)
+        return [img.get("original") for img in results if img.get("original")]
+    
+    async def search_image_results(
+        self,
+        query: str,
+        num: int = 3,
+        api_key: Optional[str] = None
+    ) -> List[dict]:
+        """
+        通过 SerpAPI 搜索图片，返回完整的 images_results 元数据（经搜索结果缓存）
+        
+        返回的字典来自共享缓存，调用方不应修改。
+        """
         effective_api_key = (api_key or "").strip() or self.api_key
         if not effective_api_key:
             logger.warning("SerpAPI key not configured")
             return []
         
+        num = min(num, 10)  # 最多 10 个结果
+        results = await search_cache.fetch(
+            "serpapi",
+            self.engine,
+            query,
+            num,
+            lambda: self._request_image_results(query, num, effective_api_key)
+        )
+        return results or []
+    
+    async def search_candidates(
+        self,
+        query: str,
+        num: int = 3,
+        api_key: Optional[str] = None
+    ) -> List[ImageCandidate]:
+        """通过 SerpAPI 搜索图片，返回带缩略图、尺寸、来源域名和排名的候选"""
+        results = await self.search_image_results(query, num=num, api_key=api_key)
+        candidates = [ImageCandidate.from_serpapi(item) for item in results]
+        return [candidate for candidate in candidates if candidate]
+    
+    async def _request_image_results(self, query: str, num: int, api_key: str) -> Optional[List[dict]]:
+        """调用 SerpAPI，请求失败返回 None（不写入缓存）"""
         try:
             params = {
                 "q": query,
-                "api_key": effective_api_key,
+                "api_key": api_key,
                 "engine": self.engine,
                 "tbm": "isch",  # 图片搜索
-                "num": min(num, 10),  # 最多 10 个结果
+                "num": num,
             }
             
             timeout = aiohttp.ClientTimeout(total=settings.SEARCH_TIMEOUT)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
+            for attempt in range(settings.SEARCH_RATE_LIMIT_RETRIES + 1):
+                # 排队取令牌：突发请求被平滑，而不是打出 429
+                if not await search_rate_limiter.acquire("serpapi", api_key):
+                    return None
+                
+                async with http_client.session.get(
                     self.search_url,
                     params=params,
                     timeout=timeout
                 ) as resp:
+                    retry_after = search_rate_limiter.record_response("serpapi", api_key, resp.status, resp.headers)
                     if resp.status == 200:
                         data = await resp.json()
                         
-                        # 从 images_results 提取图片 URL
                         images_results = data.get("images_results", [])
-                        urls = [img.get("original") for img in images_results if img.get("original")]
-                        
-                        logger.debug(f"SerpAPI search '{query}': found {len(urls)} results")
-                        return urls
+                        logger.debug(f"SerpAPI search '{query}': found {len(images_results)} results")
+                        return images_results
                     
                     elif resp.status == 401:
                         logger.error("SerpAPI: Invalid API key")
                     elif resp.status == 429:
+                        if attempt < settings.SEARCH_RATE_LIMIT_RETRIES:
+                            # 限流器关闭时 record_response 返回 0，仍按 Retry-After 退避
+                            retry_after = retry_after or parse_retry_after(resp.headers)
+                            logger.warning(f"SerpAPI: Rate limit exceeded, retrying in {retry_after:.1f}s")
+                            resp.release()
+                            await asyncio.sleep(retry_after)
+                            continue
                         logger.warning("SerpAPI: Rate limit exceeded")
                     else:
                         logger.warning(f"SerpAPI returned {resp.status}")
                     
-                    return []
+                    return None
+            return None
         
         except asyncio.TimeoutError:
             logger.warning(f"SerpAPI timeout for '{query}' (timeout: {settings.SEARCH_TIMEOUT}s)")
-            return []
+            return None
         except Exception as e:
             logger.error(f"SerpAPI error for '{query}': {type(e).__name__}: {str(e)}")
-            return []
+            return None
     
     async def enrich_dishes_with_images(
         self,
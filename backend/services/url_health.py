@@ -0,0 +1,165 @@
+"""候选图片 URL 健康度 - 失效 URL 负缓存、主机失败表、按主机并发限制"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List
+
+from config import settings
+from utils.cache import TieredCache
+from .image_candidates import ImageCandidate
+
+logger = logging.getLogger(__name__)
+
+
+# 确定性失败：URL 本身已失效或不是图片，重试也不会成功
+_DEFINITIVE_FAILURES = ("http_404", "http_410", "content_type:", "undecodable")
+# 主机状态表的清理间隔 (秒)
+_HOST_PRUNE_INTERVAL = 60.0
+
+
+def is_definitive_failure(reason: str) -> bool:
+    """404/410、非图片内容类型、无法解码为确定性失败；超时、连接错误、5xx、下载失败等视为暂时性失败"""
+    return reason.startswith(_DEFINITIVE_FAILURES)
+
+
+@dataclass
+class _HostState:
+    failures: int = 0
+    first_failure_at: float = 0.0
+    blocked_until: float = 0.0
+
+    def is_idle(self, now: float) -> bool:
+        """未被屏蔽且失败计数窗口已过，状态可以丢弃"""
+        return self.blocked_until <= now and now - self.first_failure_at > settings.BAD_HOST_TTL
+
+
+@dataclass
+class _HostSlot:
+    semaphore: asyncio.Semaphore
+    users: int = 0
+
+
+class URLHealthCache:
+    """
+    记录存活检查的失败结果，避免每次请求重复探测同样的坏链接
+
+    - 失效 URL：确定性失败（404/410、非图片、无法解码）写入负缓存（内存 + 可选 SQLite），DEAD_URL_TTL 内直接丢弃；
+      暂时性失败（超时、连接错误、5xx 等）只按 DEAD_URL_TRANSIENT_TTL 短暂跳过，且不计入主机失败次数
+    - 失败主机：窗口内确定性失败达到阈值的主机整体屏蔽一段时间，成功一次即清零；
+      解除屏蔽且窗口过期的主机状态被清理
+    - 按主机限制并发探测数，单个慢 CDN 不会拖住整个阶段；信号量按需创建，空闲后移除
+    """
+
+    def __init__(self):
+        self.enabled = settings.URL_HEALTH_CACHE_ENABLED
+        self._dead_urls = TieredCache(
+            namespace="dead_urls",
+            max_entries=settings.DEAD_URL_CACHE_MAX_ENTRIES,
+            ttl=settings.DEAD_URL_TTL,
+            db_path=settings.CACHE_DB_PATH or None,
+            disk_max_entries=settings.CACHE_DISK_MAX_ENTRIES,
+            purge_every=settings.CACHE_PURGE_EVERY_WRITES,
+        )
+        self._hosts: Dict[str, _HostState] = {}
+        self._host_slots: Dict[str, _HostSlot] = {}
+        self._last_prune = 0.0
+        self.skipped_urls = 0
+        self.skipped_hosts = 0
+        self.definitive_failures = 0
+        self.transient_failures = 0
+
+    def is_host_blocked(self, host: str) -> bool:
+        state = self._hosts.get(host)
+        if state is None:
+            return False
+        now = time.time()
+        if state.is_idle(now):
+            del self._hosts[host]
+            return False
+        return state.blocked_until > now
+
+    def _prune_hosts(self, now: float) -> None:
+        """定期清理已解除屏蔽且窗口过期的主机状态"""
+        if now - self._last_prune < _HOST_PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        for host in [host for host, state in self._hosts.items() if state.is_idle(now)]:
+            del self._hosts[host]
+
+    async def filter_candidates(self, candidates: List[ImageCandidate]) -> List[ImageCandidate]:
+        """丢弃已知失效的 URL 和被屏蔽主机上的候选（不发出任何网络请求）"""
+        if not self.enabled:
+            return candidates
+        kept = []
+        for candidate in candidates:
+            if self.is_host_blocked(candidate.host):
+                self.skipped_hosts += 1
+                continue
+            if await self._dead_urls.get(candidate.url) is not None:
+                self.skipped_urls += 1
+                continue
+            kept.append(candidate)
+        return kept
+
+    @asynccontextmanager
+    async def host_slot(self, host: str) -> AsyncIterator[None]:
+        """按主机限制并发探测（最后一个使用者离开时移除该主机的信号量）"""
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = _HostSlot(asyncio.Semaphore(max(1, settings.URL_PROBE_PER_HOST_CONCURRENCY)))
+            self._host_slots[host] = slot
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0 and self._host_slots.get(host) is slot:
+                del self._host_slots[host]
+
+    def record_success(self, candidate: ImageCandidate) -> None:
+        self._hosts.pop(candidate.host, None)
+
+    async def record_failure(self, candidate: ImageCandidate, reason: str) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        self._prune_hosts(now)
+        if not is_definitive_failure(reason):
+            # 一次网络抖动不应让 URL 失效数小时，也不应屏蔽正常的 CDN
+            self.transient_failures += 1
+            if settings.DEAD_URL_TRANSIENT_TTL > 0:
+                await self._dead_urls.set(candidate.url, reason, ttl=settings.DEAD_URL_TRANSIENT_TTL)
+            return
+
+        self.definitive_failures += 1
+        await self._dead_urls.set(candidate.url, reason)
+        state = self._hosts.setdefault(candidate.host, _HostState())
+        if now - state.first_failure_at > settings.BAD_HOST_TTL:
+            state.failures = 0
+            state.first_failure_at = now
+        state.failures += 1
+        if state.failures >= settings.BAD_HOST_FAILURE_THRESHOLD and state.blocked_until <= now:
+            state.blocked_until = now + settings.BAD_HOST_TTL
+            logger.info(f"🚫 Host {candidate.host} blocked for {settings.BAD_HOST_TTL}s after {state.failures} failures ({reason})")
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "enabled": self.enabled,
+            "blocked_hosts": sorted(host for host, state in self._hosts.items() if state.blocked_until > now),
+            "skipped_urls": self.skipped_urls,
+            "skipped_hosts": self.skipped_hosts,
+            "definitive_failures": self.definitive_failures,
+            "transient_failures": self.transient_failures,
+            "tracked_hosts": len(self._hosts),
+            "active_host_slots": len(self._host_slots),
+            "dead_urls": self._dead_urls.stats(),
+        }
+
+
+# 全局实例
+url_health = URLHealthCache()
@@ -0,0 +1,111 @@
+"""图片验证分数缓存 - 按菜品身份 + 图片 URL（可选图片内容哈希）寻址"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from config import settings
+from utils.cache import TieredCache
+from utils.dish_utils import normalize_dish_name
+from utils.file_utils import sha256_hexdigest
+from .image_candidates import ImageCandidate
+from .url_health import url_health
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationScoreCache:
+    """
+    缓存 ImageVerifier 的相关性分数
+
+    热门菜品在不同菜单中反复出现，同一 (菜品, 图片) 组合无需再次调用视觉模型。
+    键 = 归一化 (original_name, english_name) + 验证模型 + 图片 URL。
+    开启 VERIFY_CACHE_CONTENT_HASH 后同时按图片内容 SHA-256 寻址，不同 URL 的镜像副本共享一条记录
+    （首次需要下载图片计算哈希，URL → 哈希的映射同样缓存）。
+    只缓存成功的验证结果，超时和接口错误不缓存。
+    磁盘层与其他缓存一样定期清理过期条目，并受 CACHE_DISK_MAX_ENTRIES 条数上限约束。
+    """
+
+    def __init__(self):
+        self.enabled = settings.VERIFY_CACHE_ENABLED
+        self.content_hash = settings.VERIFY_CACHE_CONTENT_HASH
+        db_path = settings.CACHE_DB_PATH or None
+        self._scores = TieredCache(
+            namespace="verification_scores",
+            max_entries=settings.VERIFY_CACHE_MAX_ENTRIES,
+            ttl=settings.VERIFY_CACHE_TTL,
+            db_path=db_path,
+            disk_max_entries=settings.CACHE_DISK_MAX_ENTRIES,
+            purge_every=settings.CACHE_PURGE_EVERY_WRITES,
+        )
+        self._digests = TieredCache(
+            namespace="image_digests",
+            max_entries=settings.VERIFY_CACHE_MAX_ENTRIES,
+            ttl=settings.VERIFY_CACHE_TTL,
+            db_path=db_path,
+            disk_max_entries=settings.CACHE_DISK_MAX_ENTRIES,
+            purge_every=settings.CACHE_PURGE_EVERY_WRITES,
+        )
+
+    @staticmethod
+    def build_dish_key(original_name: str, english_name: str, model: str) -> str:
+        return f"{normalize_dish_name(original_name)}:{normalize_dish_name(english_name)}:{model}"
+
+    async def _content_digest(self, image_url: str) -> Optional[str]:
+        """
+        图片内容 SHA-256；下载失败或超过大小上限返回 None
+
+        经 image_verifier.download_image 下载（共享字节缓存，之后的验证/预筛选不再重复下载），
+        已知失效的 URL 和被屏蔽的主机直接跳过，下载占用该主机的并发名额。
+        """
+        digest = await self._digests.get(image_url)
+        if digest is not None:
+            return digest
+
+        # 延迟导入：image_verifier 在模块级依赖本模块
+        from .image_verifier import image_verifier
+
+        candidate = ImageCandidate(url=image_url)
+        if not await url_health.filter_candidates([candidate]):
+            return None
+        async with url_health.host_slot(candidate.host):
+            data = await image_verifier.download_image(image_url)
+        if data is None or len(data) > settings.VERIFY_CACHE_MAX_DOWNLOAD_BYTES:
+            return None
+        digest = await asyncio.to_thread(sha256_hexdigest, data)
+        await self._digests.set(image_url, digest)
+        return digest
+
+    async def get(self, dish_key: str, image_url: str) -> Optional[float]:
+        """命中返回分数，未命中返回 None"""
+        if not self.enabled:
+            return None
+        score = await self._scores.get(f"url:{dish_key}:{image_url}")
+        if score is None and self.content_hash:
+            digest = await self._content_digest(image_url)
+            if digest is not None:
+                score = await self._scores.get(f"sha256:{dish_key}:{digest}")
+                if score is not None:
+                    # 镜像副本命中：登记当前 URL，下次直接按 URL 命中
+                    await self._scores.set(f"url:{dish_key}:{image_url}", score)
+        return score
+
+    async def set(self, dish_key: str, image_url: str, score: float) -> None:
+        if not self.enabled:
+            return
+        await self._scores.set(f"url:{dish_key}:{image_url}", score)
+        if self.content_hash:
+            digest = await self._digests.get(image_url)
+            if digest is not None:
+                await self._scores.set(f"sha256:{dish_key}:{digest}", score)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "content_hash": self.content_hash,
+            **self._scores.stats(),
+        }
+
+
+# 全局实例
+verification_cache = VerificationScoreCache()
@@ -0,0 +1,348 @@
+"""图片验证后端 - LLM 视觉裁判、本地 CPU 打分、两者级联"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+from schemas import Dish
+from config import settings
+from utils.file_utils import CandidateImageStats, analyze_candidate_image
+from .image_candidates import ImageCandidate
+from .image_verifier import ImageVerifier, image_verifier
+from .image_workers import image_workers
+from .host_reputation import host_reputation
+
+logger = logging.getLogger(__name__)
+
+# 打分结果：只包含完成验证的候选（提前结束、接口失败的候选不在其中）
+ScoredCandidates = List[Tuple[ImageCandidate, float]]
+
+# 每个候选完成打分时的回调（用于观察验证进度，如推测式生成）
+ScoreCallback = Callable[[ImageCandidate, float], None]
+
+
+class VerifierBackend(ABC):
+    """
+    图片验证后端接口
+
+    score() 为候选图片打出 0-1 的相关性分数，由 Pipeline 按阈值过滤并排序；
+    传入 on_score 时每个候选完成打分后立即回调。
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.requests = 0
+
+    @abstractmethod
+    async def score(
+        self,
+        dish: Dish,
+        candidates: List[ImageCandidate],
+        verify_threshold: float,
+        on_score: Optional[ScoreCallback] = None,
+        **llm_kwargs
+    ) -> ScoredCandidates:
+        """返回 [(候选, 0-1 分数)]，只包含完成打分的候选"""
+
+    def stats(self) -> dict:
+        return {"requests": self.requests}
+
+
+class LLMVerifierBackend(VerifierBackend):
+    """视觉大模型裁判（逐张、批量或提前结束模式），结果计入主机信誉"""
+
+    name = "llm"
+
+    def __init__(self, verifier: ImageVerifier):
+        super().__init__()
+        self.verifier = verifier
+
+    def _verification_url(self, candidate: ImageCandidate) -> str:
+        """验证用图片：启用时使用搜索引擎的缩略图（几 KB，视觉模型拉取更快），否则用原图"""
+        if settings.IMAGE_VERIFY_USE_THUMBNAIL and candidate.thumbnail:
+            return candidate.thumbnail
+        return candidate.url
+
+    async def score(
+        self,
+        dish: Dish,
+        candidates: List[ImageCandidate],
+        verify_threshold: float,
+        on_score: Optional[ScoreCallback] = None,
+        **llm_kwargs
+    ) -> ScoredCandidates:
+        self.requests += 1
+        if settings.IMAGE_VERIFY_EARLY_EXIT_COUNT > 0:
+            # 提前结束：按排名顺序有限并发验证，足够多的图片通过后取消其余验证
+            scored = await self._verify_until_enough(
+                dish,
+                candidates,
+                verify_threshold=verify_threshold,
+                target=settings.IMAGE_VERIFY_EARLY_EXIT_COUNT,
+                on_score=on_score,
+                **llm_kwargs
+            )
+        elif settings.IMAGE_VERIFY_BATCH_SIZE > 1:
+            # 批量验证：多张候选放进同一次视觉调用
+            scores = await self.verifier.verify_images_batch(
+                dish_name=dish.english_name,
+                description=dish.description,
+                image_urls=[self._verification_url(candidate) for candidate in candidates],
+                original_name=dish.original_name,
+                **llm_kwargs
+            )
+            scored = list(zip(candidates, scores))
+            if on_score is not None:
+                for candidate, score in scored:
+                    on_score(candidate, score)
+        else:
+            # 并发验证所有候选图片
+            async def verify_one(candidate: ImageCandidate) -> float:
+                score = await self.verifier.verify_image_relevance(
+                    dish_name=dish.english_name,
+                    description=dish.description,
+                    image_url=self._verification_url(candidate),
+                    original_name=dish.original_name,
+                    **llm_kwargs
+                )
+                if on_score is not None:
+                    on_score(candidate, score)
+                return score
+
+            verification_tasks = [verify_one(candidate) for candidate in candidates]
+            scores = await asyncio.gather(*verification_tasks, return_exceptions=True)
+            scored = [
+                (candidate, score) for candidate, score in zip(candidates, scores)
+                if isinstance(score, (int, float))
+            ]
+
+        for candidate, score in scored:
+            host_reputation.record_verification(candidate.host, score, score >= verify_threshold)
+        return scored
+
+    async def _verify_until_enough(
+        self,
+        dish: Dish,
+        candidates: List[ImageCandidate],
+        verify_threshold: float,
+        target: int,
+        on_score: Optional[ScoreCallback] = None,
+        **llm_kwargs
+    ) -> ScoredCandidates:
+        """
+        按排名顺序验证候选，同时最多 IMAGE_VERIFY_PARALLELISM 个请求
+
+        每完成一个验证就补上下一个候选；通过阈值的图片达到 target 张后立即返回，取消其余验证。
+        Returns: 已完成验证的 List[(candidate, score)]
+        """
+        parallelism = max(1, settings.IMAGE_VERIFY_PARALLELISM)
+        remaining = iter(candidates)
+        pending: Dict[asyncio.Task, ImageCandidate] = {}
+        scored: ScoredCandidates = []
+        passed = 0
+
+        def start_next() -> bool:
+            candidate = next(remaining, None)
+            if candidate is None:
+                return False
+            task = asyncio.create_task(self.verifier.verify_image_relevance(
+                dish_name=dish.english_name,
+                description=dish.description,
+                image_url=self._verification_url(candidate),
+                original_name=dish.original_name,
+                **llm_kwargs
+            ))
+            pending[task] = candidate
+            return True
+
+        for _ in range(parallelism):
+            if not start_next():
+                break
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    candidate = pending.pop(task)
+                    try:
+                        score = task.result()
+                    except Exception as e:
+                        logger.debug(f"Verification failed for {candidate.url[:50]}: {str(e)}")
+                        start_next()
+                        continue
+                    scored.append((candidate, score))
+                    if on_score is not None:
+                        on_score(candidate, score)
+                    if score >= verify_threshold:
+                        passed += 1
+                    start_next()
+                if passed >= target:
+                    if pending:
+                        logger.info(f"⏩ {passed} images passed, skipping {len(pending)} running and remaining verifications")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return scored
+
+
+class LocalVerifierBackend(VerifierBackend):
+    """
+    本地 CPU 打分：图片质量 + 主机信誉 + 搜索排名，不调用任何付费接口
+
+    无法判断图片内容是否与菜名相符，只衡量“看起来像一张可用的照片、来源可靠、搜索引擎认为相关”。
+    图片字节经共享字节缓存获取（开启本地预筛选时已在缓存中）；
+    无法下载或解码的图片直接记 0 分（前端同样无法显示），级联模式下不会再交给 LLM。
+
+    本地分数只适合作为级联的第一级：没有相关性依据，一张清晰的排名第一的图片也能拿到约 0.77 分。
+    单独使用（IMAGE_VERIFIER_BACKEND=local）时分数被压到 LOCAL_VERIFIER_MAX_SCORE 以下，
+    只用于排序，不能单凭本地分数通过验证阈值。
+    """
+
+    name = "local"
+
+    # 各项权重（和为 1）
+    QUALITY_WEIGHT = 0.3
+    REPUTATION_WEIGHT = 0.3
+    RANK_WEIGHT = 0.4
+
+    @staticmethod
+    def _quality(stats: CandidateImageStats) -> float:
+        """清晰度、对比度、色彩丰富度，各项饱和后取平均"""
+        size = min(min(stats.width, stats.height) / 600, 1.0)
+        contrast = min(stats.stddev / 40, 1.0)
+        colors = min(stats.colors / 200, 1.0)
+        return (size + contrast + colors) / 3
+
+    @staticmethod
+    def _rank(candidate: ImageCandidate, index: int) -> float:
+        """搜索排名越靠前越高：第 1 名为 1"""
+        position = candidate.position or index + 1
+        return 1.0 / (1.0 + 0.15 * (max(position, 1) - 1))
+
+    async def _analyze(self, candidate: ImageCandidate) -> Optional[CandidateImageStats]:
+        image_data = await image_verifier.download_image(candidate.url)
+        if image_data is None:
+            return None
+        try:
+            return await image_workers.run(analyze_candidate_image, image_data)
+        except Exception as e:
+            logger.debug(f"Failed to analyze image {candidate.url[:50]}: {str(e)}")
+            return None
+
+    async def local_scores(self, candidates: List[ImageCandidate]) -> ScoredCandidates:
+        """未封顶的本地分数（供级联第一级分流）"""
+        results = await asyncio.gather(*[self._analyze(candidate) for candidate in candidates])
+        scored = []
+        for index, (candidate, stats) in enumerate(zip(candidates, results)):
+            if stats is None:
+                score = 0.0
+            else:
+                score = round(
+                    self.QUALITY_WEIGHT * self._quality(stats)
+                    + self.REPUTATION_WEIGHT * max(0.0, min(host_reputation.score(candidate.host), 1.0))
+                    + self.RANK_WEIGHT * self._rank(candidate, index),
+                    3
+                )
+            scored.append((candidate, score))
+        return scored
+
+    async def score(
+        self,
+        dish: Dish,
+        candidates: List[ImageCandidate],
+        verify_threshold: float,
+        on_score: Optional[ScoreCallback] = None,
+        **llm_kwargs
+    ) -> ScoredCandidates:
+        self.requests += 1
+        max_score = settings.LOCAL_VERIFIER_MAX_SCORE
+        scored = [(candidate, min(score, max_score)) for candidate, score in await self.local_scores(candidates)]
+        if on_score is not None:
+            for candidate, score in scored:
+                on_score(candidate, score)
+        return scored
+
+
+class CascadeVerifierBackend(VerifierBackend):
+    """
+    级联：先本地打分，只有分数落在 (VERIFIER_CASCADE_LOW, VERIFIER_CASCADE_HIGH) 之间的候选才交给 LLM
+
+    本地分数足够高的直接采用，足够低的直接淘汰。
+    """
+
+    name = "cascade"
+
+    def __init__(self, local: LocalVerifierBackend, llm: LLMVerifierBackend):
+        super().__init__()
+        self.local = local
+        self.llm = llm
+        self.decided_locally = 0
+        self.escalated = 0
+
+    async def score(
+        self,
+        dish: Dish,
+        candidates: List[ImageCandidate],
+        verify_threshold: float,
+        on_score: Optional[ScoreCallback] = None,
+        **llm_kwargs
+    ) -> ScoredCandidates:
+        self.requests += 1
+        local_scored = await self.local.local_scores(candidates)
+
+        decided: ScoredCandidates = []
+        ambiguous: List[ImageCandidate] = []
+        for candidate, score in local_scored:
+            if score >= settings.VERIFIER_CASCADE_HIGH or score <= settings.VERIFIER_CASCADE_LOW:
+                decided.append((candidate, score))
+            else:
+                ambiguous.append(candidate)
+
+        self.decided_locally += len(decided)
+        self.escalated += len(ambiguous)
+        if on_score is not None:
+            for candidate, score in decided:
+                on_score(candidate, score)
+        if not ambiguous:
+            return decided
+        logger.debug(f"Cascade: {len(decided)} decided locally, {len(ambiguous)} sent to LLM for {dish.english_name}")
+        return decided + await self.llm.score(dish, ambiguous, verify_threshold, on_score=on_score, **llm_kwargs)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "decided_locally": self.decided_locally,
+            "escalated": self.escalated,
+        }
+
+
+def get_verifier_backend(name: Optional[str] = None) -> VerifierBackend:
+    """按名称获取验证后端；未指定或名称未知时使用 IMAGE_VERIFIER_BACKEND"""
+    normalized = (name or "").strip().lower()
+    if normalized in VERIFIER_BACKENDS:
+        return VERIFIER_BACKENDS[normalized]
+    if normalized:
+        logger.warning(f"Unknown image verifier backend '{name}', using {settings.IMAGE_VERIFIER_BACKEND}")
+    return VERIFIER_BACKENDS.get(settings.IMAGE_VERIFIER_BACKEND.strip().lower(), llm_verifier_backend)
+
+
+def verifier_backend_stats() -> dict:
+    return {
+        "default": settings.IMAGE_VERIFIER_BACKEND,
+        **{name: backend.stats() for name, backend in VERIFIER_BACKENDS.items()},
+    }
+
+
+# 全局实例
+llm_verifier_backend = LLMVerifierBackend(image_verifier)
+local_verifier_backend = LocalVerifierBackend()
+cascade_verifier_backend = CascadeVerifierBackend(local_verifier_backend, llm_verifier_backend)
+
+VERIFIER_BACKENDS: Dict[str, VerifierBackend] = {
+    backend.name: backend
+    for backend in (llm_verifier_backend, local_verifier_backend, cascade_verifier_backend)
+}
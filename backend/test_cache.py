@@ -0,0 +1,51 @@
+"""测试分层缓存磁盘层 - 过期条目清理、按写入时间的条目上限"""
+
+import asyncio
+
+from utils.cache import SQLiteStore, TieredCache
+
+
+def test_expired_rows_are_deleted_from_disk(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+
+    async def run():
+        cache = TieredCache("test", max_entries=10, ttl=3600, db_path=db_path, purge_every=3)
+        await cache.set("expired", {"v": 1}, ttl=-1)
+        await cache.set("fresh", {"v": 2})
+        # 第 1 次写入时清理过一次（当时 expired 已写入并过期）
+        rows_after_first_purge = cache._disk.count("test")
+        await cache.set("expired-2", {"v": 3}, ttl=-1)
+        await cache.set("fresh-2", {"v": 4})  # 第 4 次写入触发清理
+        return rows_after_first_purge, cache._disk.count("test"), cache.stats()["disk_purged"]
+
+    rows_after_first_purge, rows, purged = asyncio.run(run())
+    assert rows_after_first_purge == 1
+    assert rows == 2
+    assert purged == 2
+
+
+def test_disk_row_cap_deletes_oldest_first(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+
+    async def run():
+        cache = TieredCache("test", max_entries=2, ttl=3600, db_path=db_path, disk_max_entries=3, purge_every=1)
+        for index in range(5):
+            await cache.set(f"k{index}", index)
+        keys = sorted(key for key, _ in cache._disk.items("test", 0))
+        # 内存层只有 2 条，k2 从磁盘层回填
+        return keys, await cache.get("k2"), await cache.get("k0")
+
+    keys, k2, k0 = asyncio.run(run())
+    assert keys == ["k2", "k3", "k4"]
+    assert k2 == 2
+    assert k0 is None
+
+
+def test_trim_is_scoped_to_namespace(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"))
+    for index in range(3):
+        store.set("a", f"k{index}", "1", expires_at=1e12, created_at=float(index))
+        store.set("b", f"k{index}", "1", expires_at=1e12, created_at=float(index))
+    assert store.trim("a", 1) == 2
+    assert store.count("a") == 1
+    assert store.count("b") == 3
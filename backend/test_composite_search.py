@@ -0,0 +1,105 @@
+"""测试组合搜索 - 竞速/对冲模式下首个可用结果胜出、失败者被取消"""
+
+import asyncio
+
+from services.composite_search import CompositeSearcher
+from services.image_candidates import ImageCandidate
+
+
+class FakeSearcher:
+    """延迟 delay 秒后返回 urls；记录是否被调用、是否被取消"""
+
+    def __init__(self, urls, delay: float = 0.0, error: Exception = None):
+        self.urls = urls
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def search_candidates(self, query, num=3, api_key=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return [ImageCandidate(url=url) for url in self.urls]
+
+
+def search(searcher: CompositeSearcher, **kwargs):
+    async def run():
+        candidates = await searcher.search_candidates("kung pao chicken", **kwargs)
+        # 让被取消的任务处理 CancelledError
+        await asyncio.sleep(0)
+        return [candidate.url for candidate in candidates]
+
+    return asyncio.run(run())
+
+
+def test_race_returns_fastest_and_cancels_loser():
+    fast = FakeSearcher(["https://fast/a.jpg"], delay=0.01)
+    slow = FakeSearcher(["https://slow/a.jpg"], delay=5)
+    composite = CompositeSearcher([("slow", slow), ("fast", fast)], mode="race")
+
+    assert search(composite) == ["https://fast/a.jpg"]
+    assert slow.calls == 1
+    assert slow.cancelled
+    assert composite.stats()["wins"] == {"slow": 0, "fast": 1}
+
+
+def test_race_skips_empty_and_failed_providers():
+    empty = FakeSearcher([], delay=0)
+    failing = FakeSearcher([], delay=0, error=RuntimeError("quota"))
+    good = FakeSearcher(["https://good/a.jpg"], delay=0.02)
+    composite = CompositeSearcher([("empty", empty), ("failing", failing), ("good", good)], mode="race")
+
+    assert search(composite) == ["https://good/a.jpg"]
+
+
+def test_race_uses_validated_results():
+    dead = FakeSearcher(["https://dead/a.jpg"], delay=0)
+    live = FakeSearcher(["https://live/a.jpg"], delay=0.02)
+    composite = CompositeSearcher([("dead", dead), ("live", live)], mode="race")
+
+    async def validate(candidates):
+        return [candidate for candidate in candidates if "dead" not in candidate.url]
+
+    assert search(composite, validate=validate) == ["https://live/a.jpg"]
+
+
+def test_hedge_does_not_start_backup_when_primary_is_fast():
+    primary = FakeSearcher(["https://primary/a.jpg"], delay=0.01)
+    backup = FakeSearcher(["https://backup/a.jpg"])
+    composite = CompositeSearcher([("primary", primary), ("backup", backup)], mode="hedge", hedge_delay=1)
+
+    assert search(composite) == ["https://primary/a.jpg"]
+    assert backup.calls == 0
+    assert composite.stats()["hedges"] == 0
+
+
+def test_hedge_starts_backup_after_delay_and_cancels_slow_primary():
+    primary = FakeSearcher(["https://primary/a.jpg"], delay=5)
+    backup = FakeSearcher(["https://backup/a.jpg"], delay=0.01)
+    composite = CompositeSearcher([("primary", primary), ("backup", backup)], mode="hedge", hedge_delay=0.05)
+
+    assert search(composite) == ["https://backup/a.jpg"]
+    assert primary.cancelled
+    assert composite.stats()["hedges"] == 1
+
+
+def test_hedge_starts_backup_immediately_when_primary_is_empty():
+    primary = FakeSearcher([], delay=0)
+    backup = FakeSearcher(["https://backup/a.jpg"], delay=0)
+    composite = CompositeSearcher([("primary", primary), ("backup", backup)], mode="hedge", hedge_delay=5)
+
+    assert search(composite) == ["https://backup/a.jpg"]
+    # 首选搜索源无结果时不等待对冲延迟
+    assert composite.stats()["hedges"] == 0
+
+
+def test_all_providers_empty():
+    composite = CompositeSearcher([("a", FakeSearcher([])), ("b", FakeSearcher([]))], mode="race")
+    assert search(composite) == []
+    assert composite.stats()["empty"] == 1
@@ -0,0 +1,143 @@
+"""测试生成图片存储 - 文件名校验防止路径穿越、落盘后复用、并发生成合并与取消"""
+
+import asyncio
+import base64
+import hashlib
+import os
+
+import pytest
+
+from config import settings
+from schemas import Dish
+from services.generated_image_store import GeneratedImageStore
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+PNG_NAME = hashlib.sha256(PNG_BYTES).hexdigest() + ".png"
+DATA_URL = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode("ascii")
+
+DISH = Dish(
+    original_name="宫保鸡丁",
+    english_name="Kung Pao Chicken",
+    description="",
+    flavor_tags=[],
+    search_term="Kung Pao Chicken food dish",
+)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "GENERATED_IMAGE_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "GENERATED_IMAGE_DIR", str(tmp_path / "generated"))
+    monkeypatch.setattr(settings, "GENERATED_IMAGE_BASE_URL", "")
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", "")
+    return GeneratedImageStore()
+
+
+class CountingGenerator:
+    def __init__(self, result=DATA_URL, delay: float = 0.01):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.result
+
+
+@pytest.mark.parametrize("filename", [
+    "../" + PNG_NAME,
+    "..%2F" + PNG_NAME,
+    PNG_NAME.upper(),
+    PNG_NAME[:-4] + ".gif",
+    PNG_NAME + "/../secret",
+    "/etc/passwd",
+    "",
+])
+def test_path_for_rejects_anything_but_stored_hash_names(store, filename):
+    os.makedirs(store.directory)
+    with open(os.path.join(store.directory, PNG_NAME), "wb") as f:
+        f.write(PNG_BYTES)
+    assert store.path_for(filename) is None
+    assert store.path_for(PNG_NAME) == os.path.join(store.directory, PNG_NAME)
+
+
+def test_path_for_missing_file(store):
+    assert store.path_for("0" * 64 + ".png") is None
+
+
+def test_stores_once_and_reuses_for_same_dish_and_model(store):
+    generate = CountingGenerator()
+
+    async def run():
+        first = await store.get_or_generate(DISH, "model-a", generate)
+        second = await store.get_or_generate(DISH, "model-a", generate)
+        other_model = await store.get_or_generate(DISH, "model-b", generate)
+        return first, second, other_model
+
+    first, second, other_model = asyncio.run(run())
+    assert first == second == f"/api/generated-images/{PNG_NAME}"
+    # 不同模型不复用，但内容相同的图片落到同一文件
+    assert other_model == first
+    assert generate.calls == 2
+    assert store.stats()["hits"] == 1
+    assert os.listdir(store.directory) == [PNG_NAME]
+
+
+def test_concurrent_requests_share_one_generation(store):
+    generate = CountingGenerator(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*[store.get_or_generate(DISH, "model-a", generate) for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert generate.calls == 1
+    assert set(results) == {f"/api/generated-images/{PNG_NAME}"}
+    assert store.stats()["stored"] == 1
+    assert store.stats()["inflight"] == 0
+
+
+def test_generation_survives_while_another_waiter_remains(store):
+    generate = CountingGenerator(delay=0.05)
+
+    async def run():
+        abandoned = asyncio.create_task(store.get_or_generate(DISH, "model-a", generate))
+        waiting = asyncio.create_task(store.get_or_generate(DISH, "model-a", generate))
+        await asyncio.sleep(0.01)
+        abandoned.cancel()
+        return await waiting
+
+    assert asyncio.run(run()) == f"/api/generated-images/{PNG_NAME}"
+    assert generate.calls == 1
+    assert generate.cancelled == 0
+    assert store.stats()["cancelled"] == 0
+
+
+def test_last_waiter_cancelling_cancels_generation(store):
+    generate = CountingGenerator(delay=5)
+
+    async def run():
+        task = asyncio.create_task(store.get_or_generate(DISH, "model-a", generate))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert generate.cancelled == 1
+    assert store.stats()["cancelled"] == 1
+    assert store.stats()["inflight"] == 0
+    assert not os.path.exists(store.directory)
+
+
+def test_unknown_format_returns_provider_reference(store):
+    generate = CountingGenerator(result="data:image/gif;base64," + base64.b64encode(b"GIF89a").decode("ascii"))
+    result = asyncio.run(store.get_or_generate(DISH, "model-a", generate))
+    assert result.startswith("data:image/gif")
+    assert store.stats()["stored"] == 0
@@ -0,0 +1,117 @@
+"""测试主机信誉 - 样本指数衰减、写盘时清理样本过少的主机与主机数上限"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from services import host_reputation as host_reputation_module
+from services.host_reputation import HostReputationStore
+
+DAY = 24 * 3600
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(host_reputation_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def store(monkeypatch, clock):
+    monkeypatch.setattr(settings, "HOST_REPUTATION_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", "")
+    monkeypatch.setattr(settings, "HOST_REPUTATION_HALF_LIFE", DAY)
+    monkeypatch.setattr(settings, "HOST_REPUTATION_MIN_SAMPLES", 0.5)
+    monkeypatch.setattr(settings, "HOST_REPUTATION_MAX_HOSTS", 100)
+    return HostReputationStore()
+
+
+def record(store, host, count, alive, score):
+    for _ in range(count):
+        store.record_probe(host, alive, 0.1)
+        store.record_verification(host, score, score >= 0.7)
+
+
+def test_recent_samples_outweigh_old_ones(store, clock):
+    async def run():
+        record(store, "cdn.example.com", 50, alive=False, score=0.0)
+        bad = store.score("cdn.example.com")
+        # 五个半衰期后主机恢复正常
+        clock.now += 5 * DAY
+        record(store, "cdn.example.com", 10, alive=True, score=0.9)
+        return bad, store.score("cdn.example.com")
+
+    bad, recovered = asyncio.run(run())
+    assert bad < 0.05
+    assert recovered > 0.5
+
+
+def test_without_decay_old_samples_dominate(store, clock, monkeypatch):
+    monkeypatch.setattr(settings, "HOST_REPUTATION_HALF_LIFE", 0)
+
+    async def run():
+        record(store, "cdn.example.com", 50, alive=False, score=0.0)
+        clock.now += 5 * DAY
+        record(store, "cdn.example.com", 10, alive=True, score=0.9)
+        return store.score("cdn.example.com")
+
+    assert asyncio.run(run()) < 0.3
+
+
+def test_flush_prunes_hosts_whose_samples_decayed_away(store, clock):
+    async def run():
+        record(store, "once.example.com", 1, alive=True, score=0.9)
+        record(store, "busy.example.com", 1, alive=True, score=0.9)
+        clock.now += 3 * DAY
+        record(store, "busy.example.com", 5, alive=True, score=0.9)
+        await store.flush()
+        return set(store._hosts), store.stats()["pruned"]
+
+    hosts, pruned = asyncio.run(run())
+    assert hosts == {"busy.example.com"}
+    assert pruned == 1
+
+
+def test_flush_enforces_host_cap_by_sample_count(store, monkeypatch):
+    monkeypatch.setattr(settings, "HOST_REPUTATION_MAX_HOSTS", 3)
+
+    async def run():
+        for index in range(6):
+            record(store, f"host-{index}.example.com", index + 1, alive=True, score=0.9)
+        await store.flush()
+        return set(store._hosts)
+
+    assert asyncio.run(run()) == {f"host-{index}.example.com" for index in (3, 4, 5)}
+
+
+def test_pruned_hosts_are_deleted_from_disk(monkeypatch, clock, tmp_path):
+    monkeypatch.setattr(settings, "HOST_REPUTATION_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(settings, "HOST_REPUTATION_HALF_LIFE", DAY)
+    monkeypatch.setattr(settings, "HOST_REPUTATION_MIN_SAMPLES", 0.5)
+    monkeypatch.setattr(settings, "HOST_REPUTATION_MAX_HOSTS", 100)
+
+    async def run():
+        store = HostReputationStore()
+        record(store, "old.example.com", 1, alive=True, score=0.9)
+        await store.flush()
+        clock.now += 3 * DAY
+        record(store, "new.example.com", 1, alive=True, score=0.9)
+        await store.flush()
+        await store.close()
+
+        reloaded = HostReputationStore()
+        await reloaded.load()
+        return set(reloaded._hosts)
+
+    assert asyncio.run(run()) == {"new.example.com"}
@@ -0,0 +1,194 @@
+"""测试混合 Pipeline - 批量请求的并发上限与公平分配、候选截断、推测式生成的采用与取消"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from schemas import Dish
+from services import hybrid_pipeline
+from services.generated_image_store import GeneratedImageStore
+from services.hybrid_pipeline import HybridImagePipeline
+from services.image_candidates import ImageCandidate
+
+
+def make_dish(name: str) -> Dish:
+    return Dish(
+        original_name=name,
+        english_name=name,
+        description="",
+        flavor_tags=[],
+        search_term=f"{name} food dish",
+    )
+
+
+class ConcurrencyProbe:
+    """替代 get_best_images：记录每个请求（按菜名前缀区分）的并发数"""
+
+    def __init__(self):
+        self.running = {}
+        self.peak = {}
+        self.release = asyncio.Event()
+
+    async def get_best_images(self, dish: Dish, **kwargs):
+        group = dish.original_name.split("-")[0]
+        self.running[group] = self.running.get(group, 0) + 1
+        self.peak[group] = max(self.peak.get(group, 0), self.running[group])
+        await self.release.wait()
+        self.running[group] -= 1
+        return [f"https://img/{dish.original_name}.jpg"], [90]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_DISH_PIPELINES", 4)
+    return HybridImagePipeline(searcher=None, search_service=None)
+
+
+def test_batches_share_global_slots_and_unlimited_calls_are_not_throttled(pipeline):
+    async def run():
+        probe = ConcurrencyProbe()
+        pipeline.get_best_images = probe.get_best_images
+        batch_a = asyncio.create_task(pipeline.enrich_dishes_with_images(
+            [make_dish(f"a-{i}") for i in range(20)], max_concurrency=2
+        ))
+        batch_b = asyncio.create_task(pipeline.enrich_dishes_with_images(
+            [make_dish(f"b-{i}") for i in range(20)], max_concurrency=2
+        ))
+        single = asyncio.create_task(pipeline.enrich_dishes_with_images([make_dish("single")]))
+        for _ in range(20):
+            await asyncio.sleep(0)
+        running_while_blocked = dict(probe.running)
+        probe.release.set()
+        await asyncio.gather(batch_a, batch_b, single)
+        return running_while_blocked, probe.peak, batch_a.result()
+
+    running, peak, dishes_a = asyncio.run(run())
+    # 两个批量请求各占 2 个名额，单菜品搜索不占用也不等待全局名额
+    assert running == {"a": 2, "b": 2, "single": 1}
+    assert peak["a"] == 2 and peak["b"] == 2
+    assert all(dish.image_url for dish in dishes_a)
+
+
+def test_global_cap_applies_when_per_request_limit_is_larger(pipeline):
+    async def run():
+        probe = ConcurrencyProbe()
+        pipeline.get_best_images = probe.get_best_images
+        batch = asyncio.create_task(pipeline.enrich_dishes_with_images(
+            [make_dish(f"a-{i}") for i in range(20)], max_concurrency=100
+        ))
+        for _ in range(20):
+            await asyncio.sleep(0)
+        running = probe.running["a"]
+        probe.release.set()
+        await batch
+        return running
+
+    assert asyncio.run(run()) == 4
+
+
+def test_verify_top_k_applies_only_without_explicit_candidate_count(pipeline, monkeypatch):
+    monkeypatch.setattr(settings, "VERIFY_TOP_K", 3)
+    monkeypatch.setattr(settings, "SPECULATIVE_GENERATION_ENABLED", False)
+    monkeypatch.setattr(hybrid_pipeline.local_prefilter, "enabled", False)
+    verified = []
+
+    async def search(dish, serpapi_key=None, search_candidate_results=None):
+        return [ImageCandidate(url=f"https://img.example.com/{i}.jpg") for i in range(6)]
+
+    async def verify_and_sort(dish, candidates, verify_threshold, **kwargs):
+        verified.append(len(candidates))
+        return [(candidates[0].url, 0.9)]
+
+    pipeline._search_candidates = search
+    pipeline._verify_and_sort = verify_and_sort
+
+    asyncio.run(pipeline.get_best_images(make_dish("noodles")))
+    asyncio.run(pipeline.get_best_images(make_dish("noodles"), search_candidate_results=6))
+    assert verified == [3, 6]
+
+
+class SlowGenerator:
+    """生成需要 delay 秒；记录生成次数以及是否被取消"""
+
+    model = "fake-image-model"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_image(self, english_name, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return None
+
+
+@pytest.fixture
+def speculative_pipeline(pipeline, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SPECULATIVE_GENERATION_ENABLED", True)
+    monkeypatch.setattr(settings, "SPECULATIVE_GENERATION_SCORE_SAMPLES", 2)
+    monkeypatch.setattr(settings, "SPECULATIVE_GENERATION_MIN_CANDIDATES", 0)
+    monkeypatch.setattr(settings, "ENABLE_IMAGE_GENERATION", True)
+    monkeypatch.setattr(settings, "IMAGE_VERIFY_SCORE_THRESHOLD", 0.7)
+    monkeypatch.setattr(settings, "VERIFY_TOP_K", 0)
+    monkeypatch.setattr(settings, "GENERATED_IMAGE_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "GENERATED_IMAGE_DIR", str(tmp_path / "generated"))
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", "")
+    monkeypatch.setattr(hybrid_pipeline.local_prefilter, "enabled", False)
+    store = GeneratedImageStore()
+    monkeypatch.setattr(hybrid_pipeline, "generated_image_store", store)
+
+    async def search(dish, serpapi_key=None, search_candidate_results=None):
+        return [ImageCandidate(url=f"https://img.example.com/{i}.jpg") for i in range(4)]
+
+    pipeline._search_candidates = search
+    return pipeline, store
+
+
+def weak_then(result):
+    """前两个分数低于阈值（触发推测式生成），之后返回 result"""
+    async def verify_and_sort(dish, candidates, verify_threshold, on_score=None, **kwargs):
+        for candidate in candidates[:2]:
+            on_score(candidate, 0.1)
+        await asyncio.sleep(0.05)
+        return result
+    return verify_and_sort
+
+
+def test_speculative_generation_is_cancelled_when_verification_succeeds(speculative_pipeline):
+    pipeline, store = speculative_pipeline
+    generator = SlowGenerator(delay=5)
+    pipeline.generator = generator
+    pipeline._verify_and_sort = weak_then([("https://img.example.com/3.jpg", 0.9)])
+
+    async def run():
+        result = await pipeline.get_best_images(make_dish("noodles"))
+        # 让被取消的生成任务处理 CancelledError
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == (["https://img.example.com/3.jpg"], [90])
+    assert generator.calls == 1
+    assert generator.cancelled == 1
+    assert store.stats()["cancelled"] == 1
+    assert store.stats()["inflight"] == 0
+    assert pipeline.speculation_stats()["discarded"] == 1
+
+
+def test_speculative_generation_is_used_when_verification_fails(speculative_pipeline):
+    pipeline, _ = speculative_pipeline
+    generator = SlowGenerator(delay=0.01)
+    pipeline.generator = generator
+    pipeline._verify_and_sort = weak_then([])
+
+    assert asyncio.run(pipeline.get_best_images(make_dish("noodles"))) == ([], [])
+    # 降级时直接等待推测式生成，不再重复生成
+    assert generator.calls == 1
+    assert generator.cancelled == 0
+    assert pipeline.speculation_stats()["used"] == 1
@@ -0,0 +1,76 @@
+"""测试候选图片元数据 - 搜索结果解析、按元数据预筛选与预排序"""
+
+import pytest
+
+from config import settings
+from services.image_candidates import ImageCandidate, prefilter_candidates, rank_candidates
+
+
+@pytest.fixture(autouse=True)
+def candidate_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CANDIDATE_MIN_EDGE", 200)
+    monkeypatch.setattr(settings, "CANDIDATE_MAX_ASPECT_RATIO", 3.0)
+    monkeypatch.setattr(settings, "CANDIDATE_BLOCKED_DOMAINS", "pinterest.com, stock.example")
+
+
+def test_from_serpapi_parses_metadata():
+    candidate = ImageCandidate.from_serpapi({
+        "original": "https://CDN.Example.com/a.jpg",
+        "thumbnail": "https://thumb/a.jpg",
+        "original_width": "1200",
+        "original_height": 800,
+        "link": "https://www.recipes.com/kung-pao",
+        "position": 2,
+        "title": "Kung Pao",
+    })
+    assert candidate.host == "cdn.example.com"
+    assert candidate.source == "recipes.com"
+    assert (candidate.width, candidate.height, candidate.position) == (1200, 800, 2)
+    assert candidate.aspect_ratio == 1.5
+    assert ImageCandidate.from_serpapi({"thumbnail": "https://thumb/a.jpg"}) is None
+
+
+def test_from_google_parses_metadata():
+    candidate = ImageCandidate.from_google({
+        "link": "https://img.example.com/b.png",
+        "displayLink": "Food.Example.com",
+        "image": {"thumbnailLink": "https://thumb/b.png", "width": 640, "height": "bad"},
+    }, position=3)
+    assert candidate.source == "food.example.com"
+    assert candidate.width == 640 and candidate.height is None
+    assert not candidate.has_dimensions
+    assert candidate.position == 3
+
+
+def test_prefilter_drops_small_extreme_and_blocked():
+    kept = prefilter_candidates([
+        ImageCandidate(url="https://ok.example.com/1.jpg", width=800, height=600),
+        ImageCandidate(url="https://ok.example.com/small.jpg", width=150, height=600),
+        ImageCandidate(url="https://ok.example.com/banner.jpg", width=1800, height=500),
+        ImageCandidate(url="https://i.pinimg.com/2.jpg", source="www.pinterest.com"),
+        ImageCandidate(url="https://cdn.stock.example/3.jpg"),
+        ImageCandidate(url="https://ok.example.com/unknown-size.jpg"),
+    ])
+    assert [candidate.url for candidate in kept] == [
+        "https://ok.example.com/1.jpg",
+        "https://ok.example.com/unknown-size.jpg",
+    ]
+
+
+def test_rank_prefers_moderate_size_and_keeps_order_otherwise():
+    tiny = ImageCandidate(url="https://a/tiny.jpg", width=300, height=300)
+    huge = ImageCandidate(url="https://a/huge.jpg", width=4000, height=3500)
+    good = ImageCandidate(url="https://a/good.jpg", width=1200, height=900)
+    unknown = ImageCandidate(url="https://a/unknown.jpg")
+    ranked = rank_candidates([tiny, huge, good, unknown])
+    assert [candidate.url for candidate in ranked] == [
+        "https://a/good.jpg", "https://a/unknown.jpg", "https://a/huge.jpg", "https://a/tiny.jpg",
+    ]
+
+
+def test_rank_uses_host_reputation():
+    first = ImageCandidate(url="https://slow.example.com/a.jpg")
+    second = ImageCandidate(url="https://fast.example.com/b.jpg")
+    reputation = {"slow.example.com": 0.1, "fast.example.com": 0.9}
+    ranked = rank_candidates([first, second], reputation=lambda host: reputation[host])
+    assert ranked == [second, first]
@@ -0,0 +1,111 @@
+"""测试本地图片预筛选 - 空白图、占位图、重复图、无法下载或解码的候选被剔除"""
+
+import asyncio
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from config import settings
+from services import image_prefilter
+from services.image_candidates import ImageCandidate
+from services.image_prefilter import LocalImagePrefilter
+from services.image_workers import ImageWorkerPool
+
+
+def encode(img: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def photo(seed: int, size=(480, 360)) -> Image.Image:
+    """色块 + 噪点：颜色丰富、对比度足够，不同 seed 的 dHash 差异大"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size)
+    draw = ImageDraw.Draw(img)
+    block = 40
+    for x in range(0, size[0], block):
+        for y in range(0, size[1], block):
+            color = tuple(rng.randint(0, 255) for _ in range(3))
+            draw.rectangle([x, y, x + block, y + block], fill=color)
+    return img
+
+
+def placeholder() -> Image.Image:
+    """“暂无图片” 图标：灰底 + 深色图形，有对比度但颜色极少"""
+    img = Image.new("RGB", (480, 360), (220, 220, 220))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([140, 100, 340, 260], fill=(90, 90, 90))
+    draw.ellipse([200, 140, 280, 220], fill=(220, 220, 220))
+    return img
+
+
+@pytest.fixture
+def prefilter(monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_PREFILTER_ENABLED", True)
+    monkeypatch.setattr(settings, "CANDIDATE_MIN_EDGE", 200)
+    monkeypatch.setattr(settings, "CANDIDATE_MAX_ASPECT_RATIO", 3.0)
+    monkeypatch.setattr(settings, "LOCAL_PREFILTER_MIN_STDDEV", 8.0)
+    monkeypatch.setattr(settings, "LOCAL_PREFILTER_MIN_COLORS", 24)
+    monkeypatch.setattr(settings, "LOCAL_PREFILTER_DUP_DISTANCE", 6)
+    monkeypatch.setattr(image_prefilter, "image_workers", ImageWorkerPool(mode="inline"))
+    return LocalImagePrefilter()
+
+
+def run_prefilter(monkeypatch, prefilter, images):
+    """images: URL 路径 -> 图片字节（None 表示下载失败）"""
+    failures = []
+
+    async def download_image(url):
+        return images[url.rsplit("/", 1)[-1]]
+
+    async def record_failure(candidate, reason):
+        failures.append((candidate.url.rsplit("/", 1)[-1], reason))
+
+    monkeypatch.setattr(image_prefilter.image_verifier, "download_image", download_image)
+    monkeypatch.setattr(image_prefilter.url_health, "record_failure", record_failure)
+    candidates = [ImageCandidate(url=f"https://cdn.example.com/{name}") for name in images]
+    kept = asyncio.run(prefilter.filter_candidates(candidates))
+    return [candidate.url.rsplit("/", 1)[-1] for candidate in kept], failures
+
+
+def test_rejects_blank_and_placeholder_images(monkeypatch, prefilter):
+    kept, failures = run_prefilter(monkeypatch, prefilter, {
+        "blank.jpg": encode(Image.new("RGB", (480, 360), (250, 250, 250))),
+        "placeholder.jpg": encode(placeholder()),
+        "dish.jpg": encode(photo(1)),
+    })
+    assert kept == ["dish.jpg"]
+    assert failures == []
+    assert prefilter.stats()["rejected"] == {"blank": 1, "placeholder": 1}
+
+
+def test_rejects_small_extreme_and_duplicate_images(monkeypatch, prefilter):
+    kept, _ = run_prefilter(monkeypatch, prefilter, {
+        "first.jpg": encode(photo(1)),
+        "resized-copy.jpg": encode(photo(1).resize((640, 480))),
+        "other.jpg": encode(photo(2)),
+        "tiny.jpg": encode(photo(3, size=(160, 120))),
+        "banner.jpg": encode(photo(4, size=(1200, 300))),
+    })
+    # 重复图保留排名更靠前的一张
+    assert kept == ["first.jpg", "other.jpg"]
+    assert prefilter.stats()["rejected"] == {"duplicate": 1, "too_small": 1, "aspect_ratio": 1}
+
+
+def test_download_and_decode_failures_are_rejected_and_recorded(monkeypatch, prefilter):
+    kept, failures = run_prefilter(monkeypatch, prefilter, {
+        "missing.jpg": None,
+        "broken.jpg": b"<html>not an image</html>",
+        "dish.jpg": encode(photo(1)),
+    })
+    assert kept == ["dish.jpg"]
+    assert failures == [("missing.jpg", "download_failed"), ("broken.jpg", "undecodable")]
+
+
+def test_disabled_prefilter_passes_candidates_through(monkeypatch, prefilter):
+    prefilter.enabled = False
+    kept, _ = run_prefilter(monkeypatch, prefilter, {"blank.jpg": encode(Image.new("RGB", (480, 360)))})
+    assert kept == ["blank.jpg"]
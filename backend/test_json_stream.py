@@ -0,0 +1,132 @@
+"""测试增量 JSON 解析与流式菜单识别 - 任意切分、字符串内的括号与转义、markdown 前缀、断开时关闭流"""
+
+import asyncio
+import contextlib
+import json
+import random
+import types
+
+import pytest
+
+from services.llm_service import gemini_analyzer
+from utils.json_stream import JSONArrayStreamParser
+
+DISHES = [
+    {"original_name": "宫保鸡丁", "english_name": "Kung Pao Chicken", "description": "Diced chicken {spicy} with peanuts"},
+    {"original_name": "麻婆豆腐", "english_name": "Mapo Tofu", "description": "Tofu in \"mala\" sauce [very hot]"},
+    {"original_name": "Crème brûlée", "english_name": "Creme Brulee", "description": "Ends with a backslash \\"},
+    {"original_name": "Nested", "english_name": "Nested", "description": "", "flavor_tags": ["sweet", "sour"], "extra": {"a": [1, {"b": "}"}]}},
+]
+
+MARKDOWN_OUTPUT = "Here is the menu:\n```json\n" + json.dumps({"dishes": DISHES}, ensure_ascii=False, indent=2) + "\n```\n"
+
+
+def feed_in_chunks(text: str, sizes) -> list:
+    parser = JSONArrayStreamParser("dishes")
+    objects = []
+    pos = 0
+    for size in sizes:
+        objects.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    objects.extend(parser.feed(text[pos:]))
+    assert parser.done
+    return objects
+
+
+def test_whole_document_with_markdown_prefix():
+    assert feed_in_chunks(MARKDOWN_OUTPUT, []) == DISHES
+
+
+def test_single_character_chunks():
+    assert feed_in_chunks(MARKDOWN_OUTPUT, [1] * len(MARKDOWN_OUTPUT)) == DISHES
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_chunk_splits(seed):
+    rng = random.Random(seed)
+    sizes = []
+    remaining = len(MARKDOWN_OUTPUT)
+    while remaining > 0:
+        size = rng.randint(1, 40)
+        sizes.append(size)
+        remaining -= size
+    assert feed_in_chunks(MARKDOWN_OUTPUT, sizes) == DISHES
+
+
+def test_objects_are_emitted_as_soon_as_they_close():
+    parser = JSONArrayStreamParser("dishes")
+    first = json.dumps(DISHES[0])
+    assert parser.feed('{"dishes": [' + first[:-1]) == []
+    assert parser.feed(first[-1] + ", {") == [DISHES[0]]
+    assert not parser.done
+
+
+def test_array_key_split_across_chunks_and_other_keys_ignored():
+    text = '{"restaurant": {"name": "[x]"}, "dis' + 'hes": [{"a": 1}], "after": [{"b": 2}]}'
+    assert feed_in_chunks(text, [20, 15]) == [{"a": 1}]
+
+
+def test_unparsable_object_is_skipped():
+    parser = JSONArrayStreamParser("dishes")
+    assert parser.feed('{"dishes": [{"a": 1,}, {"b": 2}]}') == [{"b": 2}]
+
+
+class FakeStream:
+    """模拟 openai.AsyncStream：逐块产出 delta，记录是否被关闭"""
+
+    def __init__(self, text: str, chunk_size: int = 7):
+        self._chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for content in self._chunks:
+            delta = types.SimpleNamespace(content=content)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_client(stream: FakeStream):
+    async def create(**kwargs):
+        return stream
+    completions = types.SimpleNamespace(create=create)
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+
+
+def stream_dishes_output() -> str:
+    items = [
+        {"original_name": dish["original_name"], "english_name": dish["english_name"], "description": dish["description"]}
+        for dish in DISHES
+    ]
+    return MARKDOWN_OUTPUT.split("```json\n")[0] + "```json\n" + json.dumps({"dishes": items}) + "\n```"
+
+
+def test_stream_menu_dishes_yields_all_and_closes_stream(monkeypatch):
+    stream = FakeStream(stream_dishes_output())
+    monkeypatch.setattr(gemini_analyzer, "_lease_client", lambda *args: contextlib.nullcontext(fake_client(stream)))
+
+    async def run():
+        return [dish async for dish in gemini_analyzer.stream_menu_dishes("aGVsbG8=")]
+
+    dishes = asyncio.run(run())
+    assert [dish.english_name for dish in dishes] == [dish["english_name"] for dish in DISHES]
+    assert stream.closed
+
+
+def test_stream_is_closed_when_consumer_stops_early(monkeypatch):
+    stream = FakeStream(stream_dishes_output())
+    monkeypatch.setattr(gemini_analyzer, "_lease_client", lambda *args: contextlib.nullcontext(fake_client(stream)))
+
+    async def run():
+        generator = gemini_analyzer.stream_menu_dishes("aGVsbG8=")
+        first = await generator.__anext__()
+        # 客户端断开：StreamingResponse 关闭异步生成器
+        await generator.aclose()
+        return first
+
+    assert asyncio.run(run()).english_name == DISHES[0]["english_name"]
+    assert stream.closed
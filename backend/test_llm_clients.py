@@ -0,0 +1,62 @@
+"""测试 LLM 客户端注册表 - 被淘汰的客户端在租约归还后才关闭"""
+
+import asyncio
+
+from services import llm_clients
+from services.llm_clients import LLMClientRegistry
+
+
+class FakeClient:
+    def __init__(self, api_key: str, base_url: str):
+        self.api_key = api_key
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_evicted_client_stays_open_until_lease_released(monkeypatch):
+    monkeypatch.setattr(llm_clients, "AsyncOpenAI", FakeClient)
+
+    async def run():
+        registry = LLMClientRegistry(max_size=1, idle_ttl=3600)
+        with registry.lease("key-a", "https://llm") as client_a:
+            # 另一个 Key 挤掉 client_a，但 client_a 仍在使用中
+            registry.get("key-b", "https://llm")
+            await asyncio.sleep(0)
+            still_open = not client_a.closed
+        await asyncio.sleep(0)
+        return still_open, client_a.closed, registry.stats()
+
+    still_open, closed_after_release, stats = asyncio.run(run())
+    assert still_open
+    assert closed_after_release
+    assert stats["retired_clients"] == 0
+    assert stats["leased_clients"] == 0
+
+
+def test_idle_client_without_lease_closes_immediately(monkeypatch):
+    monkeypatch.setattr(llm_clients, "AsyncOpenAI", FakeClient)
+
+    async def run():
+        registry = LLMClientRegistry(max_size=1, idle_ttl=3600)
+        client_a = registry.get("key-a", "https://llm")
+        registry.get("key-b", "https://llm")
+        await asyncio.sleep(0)
+        return client_a.closed
+
+    assert asyncio.run(run())
+
+
+def test_shutdown_closes_leased_evicted_clients(monkeypatch):
+    monkeypatch.setattr(llm_clients, "AsyncOpenAI", FakeClient)
+
+    async def run():
+        registry = LLMClientRegistry(max_size=1, idle_ttl=3600)
+        lease = registry.lease("key-a", "https://llm")
+        client_a = lease.__enter__()
+        client_b = registry.get("key-b", "https://llm")
+        await registry.close()
+        return client_a.closed, client_b.closed, len(registry)
+
+    assert asyncio.run(run()) == (True, True, 0)
@@ -0,0 +1,114 @@
+"""测试近似重复菜单索引 - 墓碑删除与压缩、容量淘汰、磁盘恢复后按需读取缩略图"""
+
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from config import settings
+from services import menu_similarity
+from services.image_workers import ImageWorkerPool
+from services.menu_similarity import MenuSimilarityIndex
+from utils.file_utils import MenuFingerprint
+
+CONTEXT = "english::model:whole"
+
+
+def thumbnail(shade: int = 128) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("L", (256, 256), shade).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def make_index(monkeypatch):
+    monkeypatch.setattr(settings, "PHASH_DEDUP_ENABLED", True)
+    monkeypatch.setattr(settings, "PHASH_MAX_DISTANCE", 0)
+    monkeypatch.setattr(menu_similarity, "image_workers", ImageWorkerPool(mode="inline"))
+
+    def make(max_entries: int, db_path: str = ""):
+        monkeypatch.setattr(settings, "PHASH_INDEX_MAX_ENTRIES", max_entries)
+        monkeypatch.setattr(settings, "ANALYSIS_CACHE_MAX_ENTRIES", max_entries)
+        monkeypatch.setattr(settings, "CACHE_DB_PATH", db_path)
+        return MenuSimilarityIndex()
+
+    return make
+
+
+def test_evicted_entries_are_skipped_and_tree_is_compacted(make_index):
+    index = make_index(max_entries=100)
+    thumb = thumbnail()
+
+    async def run():
+        for i in range(300):
+            await index.add(CONTEXT, MenuFingerprint(dhash=i, thumbnail=thumb), f"key-{i}")
+        evicted = await index.find_duplicates(CONTEXT, MenuFingerprint(dhash=5, thumbnail=thumb))
+        live = await index.find_duplicates(CONTEXT, MenuFingerprint(dhash=250, thumbnail=thumb))
+        return evicted, live
+
+    evicted, live = asyncio.run(run())
+    assert evicted == []
+    assert live == [(0, "key-250")]
+    stats = index.stats()
+    assert stats["indexed_menus"] == 100
+    assert stats["evictions"] == 200
+    assert stats["compactions"] > 0
+    # 墓碑不会超过存活条目数（压缩后清零）
+    assert stats["tombstones"] <= stats["indexed_menus"]
+    assert len(index._trees[CONTEXT]) <= 2 * stats["indexed_menus"]
+
+
+def test_removed_and_replaced_entries_are_not_returned(make_index):
+    index = make_index(max_entries=100)
+    thumb = thumbnail()
+
+    async def run():
+        await index.add(CONTEXT, MenuFingerprint(dhash=1, thumbnail=thumb), "a")
+        await index.add(CONTEXT, MenuFingerprint(dhash=2, thumbnail=thumb), "b")
+        # 同一缓存键重新登记为新哈希，旧哈希成为墓碑
+        await index.add(CONTEXT, MenuFingerprint(dhash=3, thumbnail=thumb), "a")
+        await index.remove("b")
+        return [
+            await index.find_duplicates(CONTEXT, MenuFingerprint(dhash=value, thumbnail=thumb))
+            for value in (1, 2, 3)
+        ]
+
+    assert asyncio.run(run()) == [[], [], [(0, "a")]]
+
+
+def test_pixel_check_rejects_different_thumbnail(make_index):
+    index = make_index(max_entries=10)
+
+    async def run():
+        await index.add(CONTEXT, MenuFingerprint(dhash=7, thumbnail=thumbnail(40)), "a")
+        return await index.find_duplicates(CONTEXT, MenuFingerprint(dhash=7, thumbnail=thumbnail(200)))
+
+    assert asyncio.run(run()) == []
+    assert index.stats()["rejected_by_pixel_check"] == 1
+
+
+def test_disk_backed_index_reloads_hashes_and_reads_thumbnails_on_demand(make_index, tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    thumb = thumbnail()
+
+    async def run():
+        writer = make_index(max_entries=1000, db_path=db_path)
+        await writer.add(CONTEXT, MenuFingerprint(dhash=42, thumbnail=thumb), "menu")
+
+        reader = make_index(max_entries=1000, db_path=db_path)
+        await reader.load()
+        in_memory_thumbnail = reader._entries["menu"].thumbnail
+        matches = await reader.find_duplicates(CONTEXT, MenuFingerprint(dhash=42, thumbnail=thumb))
+        return in_memory_thumbnail, matches
+
+    in_memory_thumbnail, matches = asyncio.run(run())
+    assert in_memory_thumbnail is None
+    assert matches == [(0, "menu")]
+
+
+def test_memory_only_index_is_capped_by_analysis_lru(make_index, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_MAX_ENTRIES", 16)
+    monkeypatch.setattr(settings, "PHASH_INDEX_MAX_ENTRIES", 1000)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", "")
+    assert MenuSimilarityIndex().max_entries == 16
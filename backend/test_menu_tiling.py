@@ -0,0 +1,61 @@
+"""测试菜单切片 - 在原图分辨率上切片，逐片套用预处理配置"""
+
+import io
+
+from PIL import Image
+
+from config import settings
+from utils.file_utils import preprocess_image, split_menu_tiles
+
+
+def make_jpeg(size, exif_orientation: int = 1) -> bytes:
+    img = Image.new("RGB", size, (250, 250, 250))
+    exif = Image.Exif()
+    exif[0x0112] = exif_orientation
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def tile_sizes(tiles):
+    return [(tile.width, tile.height) for tile in tiles]
+
+
+def test_tall_menu_is_tiled_at_original_resolution(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_EDGE", 2048)
+    contents = make_jpeg((1500, 6000))
+
+    tiles = split_menu_tiles(contents, aspect_threshold=1.6, overlap=0.15, max_tiles=4, min_edge=1200, preprocess=True)
+
+    assert len(tiles) == 4
+    # 先缩放再切片时切片宽度只有 512 像素
+    assert all(width == 1500 for width, _ in tile_sizes(tiles))
+    assert preprocess_image(contents).width == 512
+
+
+def test_each_tile_is_downscaled_and_converted_like_an_upload(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_EDGE", 1024)
+    monkeypatch.setattr(settings, "UPLOAD_GRAYSCALE", True)
+    contents = make_jpeg((3000, 9000))
+
+    tiles = split_menu_tiles(contents, aspect_threshold=1.6, overlap=0.15, max_tiles=4, min_edge=1200, preprocess=True)
+
+    assert tiles
+    for tile in tiles:
+        assert max(tile.width, tile.height) <= 1024
+        assert Image.open(io.BytesIO(tile.data)).mode == "L"
+
+
+def test_tiles_follow_exif_orientation(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_EDGE", 4096)
+    # 存储为 6000x1500，EXIF 要求旋转 90°，实际是一张竖长菜单
+    contents = make_jpeg((6000, 1500), exif_orientation=6)
+
+    tiles = split_menu_tiles(contents, aspect_threshold=1.6, overlap=0.15, max_tiles=4, min_edge=1200, preprocess=True)
+
+    assert all(width == 1500 for width, _ in tile_sizes(tiles))
+
+
+def test_short_menu_is_not_tiled():
+    contents = make_jpeg((1500, 1800))
+    assert split_menu_tiles(contents, aspect_threshold=1.6, overlap=0.15, max_tiles=4, min_edge=1200) == []
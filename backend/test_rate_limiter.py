@@ -0,0 +1,187 @@
+"""测试搜索限流器 - 令牌桶放行时刻、429 退还配额与暂停、跨月重置（虚拟时钟，不真正等待）"""
+
+import asyncio
+import types
+
+import pytest
+
+from config import settings
+from services import rate_limiter, serp_search
+from services.http_client import http_client
+from services.rate_limiter import DEFAULT_RETRY_AFTER, SearchRateLimiter, TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    """虚拟时钟：asyncio.sleep 只推进时间，不真正等待"""
+
+    def __init__(self, month: str = "2026-01"):
+        self.now = 1000.0
+        self.month = month
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def strftime(self, fmt: str, _struct=None) -> str:
+        return self.month
+
+    def gmtime(self):
+        return None
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", types.SimpleNamespace(
+        monotonic=fake.monotonic, strftime=fake.strftime, gmtime=fake.gmtime
+    ))
+    monkeypatch.setattr(rate_limiter, "asyncio", types.SimpleNamespace(Lock=asyncio.Lock, sleep=fake.sleep))
+    return fake
+
+
+@pytest.fixture
+def limiter(monkeypatch, clock):
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_PER_SECOND", 2.0)
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_BURST", 2)
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_MAX_WAIT", 10.0)
+    monkeypatch.setattr(settings, "SERPAPI_MONTHLY_QUOTA", 3)
+    return SearchRateLimiter()
+
+
+def test_bucket_releases_burst_then_paces_at_rate(clock):
+    async def run():
+        bucket = TokenBucket(rate=2.0, capacity=2)
+        granted_at = []
+        for _ in range(5):
+            assert await bucket.acquire(max_wait=10)
+            granted_at.append(clock.now - 1000.0)
+        return granted_at
+
+    # 突发 2 个立即放行，之后每 0.5 秒放行一个
+    assert asyncio.run(run()) == pytest.approx([0.0, 0.0, 0.5, 1.0, 1.5])
+
+
+def test_bucket_gives_up_when_wait_exceeds_max_wait(clock):
+    async def run():
+        bucket = TokenBucket(rate=1.0, capacity=1)
+        assert await bucket.acquire(max_wait=0)
+        return await bucket.acquire(max_wait=0.5)
+
+    assert asyncio.run(run()) is False
+    assert clock.sleeps == []
+
+
+def test_429_refunds_quota_and_pauses_bucket(limiter, clock):
+    async def run():
+        assert await limiter.acquire("serpapi", "key")
+        delay = limiter.record_response("serpapi", "key", 429, {"Retry-After": "3"})
+        start = clock.now
+        assert await limiter.acquire("serpapi", "key")
+        return delay, clock.now - start
+
+    delay, waited = asyncio.run(run())
+    assert delay == 3.0
+    # 暂停期间不放行，暂停结束时令牌已重新补满
+    assert waited == pytest.approx(3.0)
+    state = limiter.stats()["keys"][0]
+    # 429 的那次不计入配额，只算重试成功的那次
+    assert state["used_this_month"] == 1
+    assert state["quota_left"] == 2
+    assert state["rate_limited"] == 1
+
+
+def test_429_without_retry_after_uses_default(limiter):
+    assert limiter.record_response("serpapi", "key", 429, {}) == DEFAULT_RETRY_AFTER
+    assert parse_retry_after({"Retry-After": "7"}) == 7.0
+    assert parse_retry_after({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}) == DEFAULT_RETRY_AFTER
+
+
+def test_monthly_quota_exhausts_and_resets_on_new_month(limiter, clock):
+    async def acquire_many(count):
+        return [await limiter.acquire("serpapi", "key") for _ in range(count)]
+
+    assert asyncio.run(acquire_many(4)) == [True, True, True, False]
+    assert limiter.stats()["keys"][0]["quota_left"] == 0
+
+    clock.month = "2026-02"
+    assert asyncio.run(acquire_many(1)) == [True]
+    state = limiter.stats()["keys"][0]
+    assert state["month"] == "2026-02"
+    assert state["used_this_month"] == 1
+
+
+def test_header_remaining_overrides_local_count_until_month_rollover(limiter, clock):
+    async def run():
+        assert await limiter.acquire("serpapi", "key")
+        limiter.record_response("serpapi", "key", 200, {"X-RateLimit-Remaining": "0"})
+        exhausted = await limiter.acquire("serpapi", "key")
+        clock.month = "2026-02"
+        renewed = await limiter.acquire("serpapi", "key")
+        return exhausted, renewed
+
+    assert asyncio.run(run()) == (False, True)
+
+
+def test_disabled_limiter_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_ENABLED", False)
+    limiter = SearchRateLimiter()
+    assert asyncio.run(limiter.acquire("serpapi", "key")) is True
+    assert limiter.record_response("serpapi", "key", 429, {"Retry-After": "5"}) == 0.0
+
+
+class FakeResponse:
+    def __init__(self, status: int, headers: dict, body: dict = None):
+        self.status = status
+        self.headers = headers
+        self._body = body or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self._body
+
+    def release(self):
+        pass
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self._responses.pop(0)
+
+
+def test_searcher_backs_off_on_429_even_when_limiter_disabled(monkeypatch, clock):
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "SEARCH_RATE_LIMIT_RETRIES", 2)
+    monkeypatch.setattr(rate_limiter.search_rate_limiter, "enabled", False)
+    monkeypatch.setattr(serp_search, "asyncio", types.SimpleNamespace(
+        sleep=clock.sleep, TimeoutError=asyncio.TimeoutError
+    ))
+    session = FakeSession([
+        FakeResponse(429, {"Retry-After": "4"}),
+        FakeResponse(429, {}),
+        FakeResponse(200, {}, {"images_results": [{"original": "https://example.com/a.jpg"}]}),
+    ])
+    monkeypatch.setattr(http_client, "_session", session)
+
+    searcher = serp_search.SerpAPISearcher()
+    results = asyncio.run(searcher._request_image_results("noodles", 3, "key"))
+
+    assert results == [{"original": "https://example.com/a.jpg"}]
+    assert session.calls == 3
+    assert clock.sleeps == [4.0, DEFAULT_RETRY_AFTER]
@@ -0,0 +1,76 @@
+"""测试搜索结果缓存 - 空结果只做短期负缓存"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from services.search_cache import SearchResultCache
+from utils import cache as cache_module
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(cache_module, "time", fake)
+    monkeypatch.setattr("services.search_cache.time", fake)
+    return fake
+
+
+def make_cache(monkeypatch, empty_ttl: int) -> SearchResultCache:
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SEARCH_CACHE_EMPTY_TTL", empty_ttl)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", "")
+    return SearchResultCache()
+
+
+def counting_loader(results_sequence):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return results_sequence[min(len(calls), len(results_sequence)) - 1]
+
+    return loader, calls
+
+
+def test_empty_results_expire_after_negative_ttl(monkeypatch, clock):
+    cache = make_cache(monkeypatch, empty_ttl=600)
+    loader, calls = counting_loader([[], [{"original": "https://img/a.jpg"}]])
+
+    async def fetch():
+        return await cache.fetch("serpapi", "google", "Pad Thai food dish", 10, loader)
+
+    assert asyncio.run(fetch()) == []
+    clock.now += 60
+    assert asyncio.run(fetch()) == []  # 负缓存期内不重复调用付费 API
+    assert len(calls) == 1
+
+    clock.now += 600
+    assert asyncio.run(fetch()) == [{"original": "https://img/a.jpg"}]
+    assert len(calls) == 2
+
+    # 非空结果按完整 TTL 缓存
+    clock.now += 24 * 3600
+    assert asyncio.run(fetch()) == [{"original": "https://img/a.jpg"}]
+    assert len(calls) == 2
+
+
+def test_empty_results_are_not_cached_when_ttl_is_zero(monkeypatch, clock):
+    cache = make_cache(monkeypatch, empty_ttl=0)
+    loader, calls = counting_loader([[]])
+
+    async def fetch():
+        return await cache.fetch("serpapi", "google", "Pad Thai food dish", 10, loader)
+
+    asyncio.run(fetch())
+    asyncio.run(fetch())
+    assert len(calls) == 2
@@ -0,0 +1,118 @@
+"""测试 URL 健康度缓存 - 失效 URL 与主机屏蔽的 TTL、暂时性失败、主机状态与信号量的清理"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from services import url_health as url_health_module
+from services.image_candidates import ImageCandidate
+from services.url_health import URLHealthCache, is_definitive_failure
+from utils import cache as cache_module
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(cache_module, "time", fake)
+    monkeypatch.setattr(url_health_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def health(monkeypatch, clock):
+    monkeypatch.setattr(settings, "URL_HEALTH_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", "")
+    monkeypatch.setattr(settings, "DEAD_URL_TTL", 3600)
+    monkeypatch.setattr(settings, "DEAD_URL_TRANSIENT_TTL", 60)
+    monkeypatch.setattr(settings, "BAD_HOST_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "BAD_HOST_TTL", 600)
+    monkeypatch.setattr(settings, "URL_PROBE_PER_HOST_CONCURRENCY", 2)
+    return URLHealthCache()
+
+
+def candidate(path: str, host: str = "cdn.example.com") -> ImageCandidate:
+    return ImageCandidate(url=f"https://{host}/{path}.jpg")
+
+
+def surviving(health, candidates):
+    return [c.url for c in asyncio.run(health.filter_candidates(candidates))]
+
+
+def test_failure_classification():
+    assert is_definitive_failure("http_404")
+    assert is_definitive_failure("http_410")
+    assert is_definitive_failure("content_type:text/html")
+    assert is_definitive_failure("undecodable")
+    for reason in ("timeout", "ClientConnectorError", "http_503", "http_403", "download_failed"):
+        assert not is_definitive_failure(reason)
+
+
+def test_dead_url_is_skipped_until_ttl_expires(health, clock):
+    dead = candidate("dead")
+    asyncio.run(health.record_failure(dead, "http_404"))
+
+    clock.now += 3599
+    assert surviving(health, [dead]) == []
+    clock.now += 2
+    assert surviving(health, [dead]) == [dead.url]
+
+
+def test_timeouts_are_skipped_briefly_and_never_block_the_host(health, clock):
+    slow = [candidate(f"slow-{i}") for i in range(10)]
+    for item in slow:
+        asyncio.run(health.record_failure(item, "timeout"))
+
+    assert not health.is_host_blocked("cdn.example.com")
+    assert surviving(health, slow[:1]) == []
+    clock.now += 61
+    assert surviving(health, slow[:1]) == [slow[0].url]
+    assert health.stats()["transient_failures"] == 10
+
+
+def test_host_is_blocked_after_threshold_and_state_is_pruned_after_window(health, clock):
+    for i in range(3):
+        asyncio.run(health.record_failure(candidate(f"gone-{i}"), "http_410"))
+
+    fresh = candidate("fresh")
+    assert health.is_host_blocked("cdn.example.com")
+    assert surviving(health, [fresh]) == []
+
+    clock.now += 601
+    assert surviving(health, [fresh]) == [fresh.url]
+    assert health.stats()["tracked_hosts"] == 0
+
+
+def test_idle_host_states_are_pruned_on_later_failures(health, clock):
+    asyncio.run(health.record_failure(candidate("a", host="one.example.com"), "http_404"))
+    clock.now += 601
+    asyncio.run(health.record_failure(candidate("b", host="two.example.com"), "http_404"))
+    assert set(health._hosts) == {"two.example.com"}
+
+
+def test_host_slots_limit_concurrency_and_are_removed_when_idle(health):
+    async def run():
+        running = 0
+        peak = 0
+
+        async def probe():
+            nonlocal running, peak
+            async with health.host_slot("cdn.example.com"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0)
+                running -= 1
+
+        await asyncio.gather(*[probe() for _ in range(6)])
+        return peak
+
+    assert asyncio.run(run()) == 2
+    assert health.stats()["active_host_slots"] == 0
@@ -0,0 +1,88 @@
+"""测试验证分数缓存 - 过期分数重新验证、磁盘层清理过期条目"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from services import image_verifier as image_verifier_module
+from services.image_verifier import image_verifier
+from services.verification_cache import VerificationScoreCache
+from utils import cache as cache_module
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path, clock):
+    monkeypatch.setattr(settings, "VERIFY_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "VERIFY_CACHE_CONTENT_HASH", False)
+    monkeypatch.setattr(settings, "VERIFY_CACHE_TTL", 3600)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(settings, "CACHE_PURGE_EVERY_WRITES", 1)
+    instance = VerificationScoreCache()
+    monkeypatch.setattr(image_verifier_module, "verification_cache", instance)
+    return instance
+
+
+def test_expired_score_is_reverified_and_removed_from_disk(monkeypatch, cache, clock):
+    calls = []
+
+    async def fake_score(**kwargs):
+        calls.append(kwargs["image_url"])
+        return 0.9
+
+    monkeypatch.setattr(image_verifier, "_score_image", fake_score)
+    url = "https://cdn.example.com/a.jpg"
+
+    async def verify():
+        return await image_verifier.verify_image_relevance("Kung Pao Chicken", "", url, original_name="宫保鸡丁")
+
+    async def run():
+        first = await verify()
+        cached = await verify()
+        clock.now += 3601
+        # 过期后重新验证；写入新分数时的清理删除过期行
+        expired_rows = cache._scores._disk.count("verification_scores")
+        await cache._scores.set("url:other:https://cdn.example.com/b.jpg", 0.5)
+        after_purge = cache._scores._disk.count("verification_scores")
+        reverified = await verify()
+        return first, cached, expired_rows, after_purge, reverified
+
+    first, cached, expired_rows, after_purge, reverified = asyncio.run(run())
+    assert first == cached == reverified == 0.9
+    assert calls == [url, url]
+    assert expired_rows == 1
+    # 只剩刚写入的一条，过期的分数已从磁盘删除
+    assert after_purge == 1
+    assert cache._scores.stats()["disk_purged"] == 1
+
+
+def test_disk_rows_are_capped(monkeypatch, tmp_path, clock):
+    monkeypatch.setattr(settings, "VERIFY_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "VERIFY_CACHE_CONTENT_HASH", False)
+    monkeypatch.setattr(settings, "CACHE_DB_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(settings, "CACHE_DISK_MAX_ENTRIES", 2)
+    monkeypatch.setattr(settings, "CACHE_PURGE_EVERY_WRITES", 1)
+    cache = VerificationScoreCache()
+
+    async def run():
+        for index in range(4):
+            clock.now += 1
+            await cache.set("dish", f"https://cdn.example.com/{index}.jpg", 0.8)
+
+    asyncio.run(run())
+    assert cache._scores._disk.count("verification_scores") == 2
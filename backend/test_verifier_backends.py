@@ -0,0 +1,147 @@
+"""测试图片验证后端 - 提前结束、本地打分不能单独放行、级联在 LOW / HIGH 两端的分流"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from schemas import Dish
+from services import hybrid_pipeline, verifier_backends
+from services.hybrid_pipeline import HybridImagePipeline
+from services.image_candidates import ImageCandidate
+from services.verifier_backends import CascadeVerifierBackend, LLMVerifierBackend, LocalVerifierBackend
+from utils.file_utils import CandidateImageStats
+
+DISH = Dish(
+    original_name="宫保鸡丁",
+    english_name="Kung Pao Chicken",
+    description="",
+    flavor_tags=[],
+    search_term="Kung Pao Chicken food dish",
+)
+
+SHARP_PHOTO = CandidateImageStats(width=1200, height=900, stddev=60.0, colors=400, dhash=0)
+
+
+def candidate(name: str, position: int) -> ImageCandidate:
+    return ImageCandidate(url=f"https://unknown-{name}.example.com/{name}.jpg", position=position)
+
+
+class FakeLLMBackend:
+    name = "llm"
+
+    def __init__(self, score: float):
+        self._score = score
+        self.seen = []
+
+    async def score(self, dish, candidates, verify_threshold, on_score=None, **llm_kwargs):
+        self.seen.extend(candidate.url for candidate in candidates)
+        return [(candidate, self._score) for candidate in candidates]
+
+
+class FakeVerifier:
+    """按 URL 给出预设分数；记录开始和被取消的验证"""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.started = []
+        self.cancelled = []
+
+    async def verify_image_relevance(self, dish_name, description, image_url, original_name="", **kwargs):
+        self.started.append(image_url)
+        try:
+            # 排名越靠后完成越晚
+            await asyncio.sleep(0.01 * len(self.started))
+        except asyncio.CancelledError:
+            self.cancelled.append(image_url)
+            raise
+        return self.scores[image_url]
+
+
+@pytest.fixture(autouse=True)
+def verifier_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_VERIFIER_MAX_SCORE", 0.5)
+    monkeypatch.setattr(settings, "VERIFIER_CASCADE_LOW", 0.4)
+    monkeypatch.setattr(settings, "VERIFIER_CASCADE_HIGH", 0.85)
+
+
+def test_standalone_local_never_accepts_without_relevance_evidence(monkeypatch):
+    local = LocalVerifierBackend()
+
+    async def analyze(candidate):
+        return SHARP_PHOTO
+
+    monkeypatch.setattr(local, "_analyze", analyze)
+    monkeypatch.setattr(hybrid_pipeline, "get_verifier_backend", lambda name=None: local)
+    pipeline = HybridImagePipeline(searcher=None, search_service=None)
+    candidates = [candidate("a", 1), candidate("b", 2)]
+
+    async def run():
+        raw = await local.local_scores(candidates)
+        accepted = await pipeline._verify_and_sort(
+            DISH, candidates, verify_threshold=0.7, image_verifier_backend="local", skip_single=False
+        )
+        scored = await local.score(DISH, candidates, 0.7)
+        return raw, accepted, scored
+
+    raw, accepted, scored = asyncio.run(run())
+    # 清晰、排名第一、主机未知：未封顶的本地分数已超过默认阈值
+    assert raw[0][1] > 0.7
+    assert accepted == []
+    assert max(score for _, score in scored) == 0.5
+
+
+def run_cascade(monkeypatch, local_scores, llm_score=0.9):
+    local = LocalVerifierBackend()
+    llm = FakeLLMBackend(llm_score)
+
+    async def fake_local_scores(candidates):
+        return list(zip(candidates, local_scores))
+
+    monkeypatch.setattr(local, "local_scores", fake_local_scores)
+    cascade = CascadeVerifierBackend(local, llm)
+    candidates = [candidate(str(index), index + 1) for index in range(len(local_scores))]
+    scored = asyncio.run(cascade.score(DISH, candidates, 0.7))
+    return candidates, {c.url: s for c, s in scored}, llm, cascade
+
+
+def test_cascade_rejects_at_low_without_llm(monkeypatch):
+    candidates, scored, llm, cascade = run_cascade(monkeypatch, [0.4, 0.1])
+    assert llm.seen == []
+    assert scored == {candidates[0].url: 0.4, candidates[1].url: 0.1}
+    assert cascade.stats()["decided_locally"] == 2
+
+
+def test_cascade_accepts_at_high_without_llm(monkeypatch):
+    candidates, scored, llm, cascade = run_cascade(monkeypatch, [0.85, 0.95])
+    assert llm.seen == []
+    assert scored == {candidates[0].url: 0.85, candidates[1].url: 0.95}
+
+
+def test_cascade_escalates_only_ambiguous_scores(monkeypatch):
+    candidates, scored, llm, cascade = run_cascade(monkeypatch, [0.2, 0.6, 0.9], llm_score=0.75)
+    assert llm.seen == [candidates[1].url]
+    assert scored == {candidates[0].url: 0.2, candidates[1].url: 0.75, candidates[2].url: 0.9}
+    assert cascade.stats()["escalated"] == 1
+
+
+def test_early_exit_stops_after_enough_passes(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_VERIFY_EARLY_EXIT_COUNT", 2)
+    monkeypatch.setattr(settings, "IMAGE_VERIFY_PARALLELISM", 2)
+    monkeypatch.setattr(settings, "IMAGE_VERIFY_USE_THUMBNAIL", False)
+    monkeypatch.setattr(verifier_backends.host_reputation, "record_verification", lambda *args: None)
+    candidates = [candidate(str(index), index + 1) for index in range(8)]
+    scores = [0.9, 0.2, 0.8, 0.95, 0.9, 0.9, 0.9, 0.9]
+    verifier = FakeVerifier({c.url: score for c, score in zip(candidates, scores)})
+    backend = LLMVerifierBackend(verifier)
+
+    async def run():
+        scored = await backend.score(DISH, candidates, 0.7)
+        await asyncio.sleep(0)
+        return scored
+
+    scored = asyncio.run(run())
+    # 按排名顺序、最多 2 个并发：第 1、3 张通过后停止，第 4 张正在验证被取消，其余从未开始
+    assert [c.url for c, _ in scored] == [candidates[0].url, candidates[1].url, candidates[2].url]
+    assert verifier.started == [c.url for c in candidates[:4]]
+    assert verifier.cancelled == [candidates[3].url]
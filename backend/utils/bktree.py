@@ -0,0 +1,82 @@
+"""BK-Tree - 汉明距离下的近邻检索"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个整数哈希之间的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+class _Node:
+    __slots__ = ("value", "items", "children")
+
+    def __init__(self, value: int, item: Any):
+        self.value = value
+        self.items: List[Any] = [item]
+        self.children: Dict[int, "_Node"] = {}
+
+
+class BKTree:
+    """
+    以汉明距离为度量的 BK-Tree
+
+    按三角不等式剪枝，阈值较小时查询只访问极少数节点，
+    语料增长到数十万条时仍保持亚线性。
+    相同哈希的多个条目挂在同一节点上。
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def add(self, value: int, item: Any) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = _Node(value, item)
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node.value)
+            if distance == 0:
+                node.items.append(item)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _Node(value, item)
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """返回距离 <= max_distance 的所有 (距离, 条目)，按距离升序"""
+        if self._root is None:
+            return []
+
+        results: List[Tuple[int, Any]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node.value)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node.items)
+            low = distance - max_distance
+            high = distance + max_distance
+            for child_distance, child in node.children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+
+        results.sort(key=lambda x: x[0])
+        return results
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        """遍历所有 (哈希, 条目)"""
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            for item in node.items:
+                yield node.value, item
+            stack.extend(node.children.values())
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,273 @@
+"""分层缓存 - 内存 LRU + 可选 SQLite 磁盘层（带 TTL）"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStore:
+    """
+    基于 SQLite 的键值存储，按 namespace 区分不同缓存
+
+    同一个数据库文件可被多个缓存共享。所有操作加锁，可在线程池中调用。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            # 过期清理与按写入时间淘汰都按 namespace 范围扫描
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (namespace, expires_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_created ON cache_entries (namespace, created_at)"
+            )
+            self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[str, float, float]]:
+        """返回 (value, expires_at, created_at)，不存在返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        return row
+
+    def set(self, namespace: str, key: str, value: str, expires_at: float, created_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, expires_at, created_at),
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            )
+            self._conn.commit()
+
+    def purge_expired(self, namespace: str, now: float) -> int:
+        """删除已过期条目，返回删除数量"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                (namespace, now),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def trim(self, namespace: str, max_entries: int) -> int:
+        """只保留最近写入的 max_entries 条，删除更早的条目，返回删除数量"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? "
+                "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, max_entries),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def items(self, namespace: str, now: float) -> List[Tuple[str, str]]:
+        """返回 namespace 下所有未过期的 (key, value)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+                (namespace, now),
+            ).fetchall()
+        return rows
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                (namespace,),
+            ).fetchone()
+        return row[0] if row else 0
+
+
+# db_path -> SQLiteStore，同一文件只打开一个连接
+_stores: dict = {}
+_stores_lock = threading.Lock()
+
+
+def get_sqlite_store(db_path: str) -> SQLiteStore:
+    """获取（或创建）指定路径的共享 SQLiteStore"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = SQLiteStore(db_path)
+            _stores[db_path] = store
+        return store
+
+
+class TieredCache:
+    """
+    两级缓存：内存 LRU（毫秒级）+ 可选 SQLite 磁盘层（进程重启后仍可命中）
+
+    值必须可 JSON 序列化。内存层直接保存原始对象，调用方不应修改取出的值。
+    磁盘层每 purge_every 次写入（以及首次写入时）清理一次：删除已过期条目，
+    条目数超过 disk_max_entries 时按写入时间删除最早的条目（0 表示不限制条数）。
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 256,
+        ttl: float = 86400,
+        db_path: Optional[str] = None,
+        disk_max_entries: int = 0,
+        purge_every: int = 500,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self.purge_every = max(1, purge_every)
+        self._writes = 0
+        # key -> (value, expires_at)
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._disk: Optional[SQLiteStore] = None
+        if db_path:
+            try:
+                self._disk = get_sqlite_store(db_path)
+            except Exception as e:
+                logger.warning(f"Cache '{namespace}': disk tier disabled ({str(e)})")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_purged = 0
+
+    def _get_memory(self, key: str, now: float) -> Optional[Any]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: Any, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """读取缓存，依次查询内存层和磁盘层，未命中返回 None"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        if self._disk is not None:
+            try:
+                row = await asyncio.to_thread(self._disk.get, self.namespace, key)
+            except Exception as e:
+                logger.warning(f"Cache '{self.namespace}' disk read failed: {str(e)}")
+                row = None
+            if row is not None:
+                raw, expires_at, _ = row
+                if expires_at > now:
+                    value = json.loads(raw)
+                    # 回填内存层
+                    self._set_memory(key, value, expires_at)
+                    self.disk_hits += 1
+                    return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存（内存层 + 磁盘层）"""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        self._set_memory(key, value, expires_at)
+
+        if self._disk is not None:
+            try:
+                raw = json.dumps(value, ensure_ascii=False)
+                await asyncio.to_thread(self._disk.set, self.namespace, key, raw, expires_at, now)
+            except Exception as e:
+                logger.warning(f"Cache '{self.namespace}' disk write failed: {str(e)}")
+                return
+            self._writes += 1
+            if (self._writes - 1) % self.purge_every == 0:
+                await self.purge()
+
+    def _purge_disk(self, now: float) -> int:
+        removed = self._disk.purge_expired(self.namespace, now)
+        if self.disk_max_entries > 0:
+            removed += self._disk.trim(self.namespace, self.disk_max_entries)
+        return removed
+
+    async def purge(self) -> int:
+        """清理磁盘层：删除过期条目并执行条数上限，返回删除数量"""
+        if self._disk is None:
+            return 0
+        try:
+            removed = await asyncio.to_thread(self._purge_disk, time.time())
+        except Exception as e:
+            logger.warning(f"Cache '{self.namespace}' disk purge failed: {str(e)}")
+            return 0
+        if removed:
+            self.disk_purged += removed
+            logger.debug(f"Cache '{self.namespace}': purged {removed} disk entries")
+        return removed
+
+    async def delete(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.delete, self.namespace, key)
+            except Exception as e:
+                logger.warning(f"Cache '{self.namespace}' disk delete failed: {str(e)}")
+
+    def stats(self) -> dict:
+        """命中统计"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_entries": len(self._memory),
+            "disk_enabled": self._disk is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_purged": self.disk_purged,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
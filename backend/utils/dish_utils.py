@@ -0,0 +1,59 @@
+"""菜品工具函数 - 名称归一化与跨来源合并去重"""
+
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Tuple
+
+from schemas import Dish
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_dish_name(name: Optional[str]) -> str:
+    """
+    归一化菜名：NFKC（全角转半角）、大小写折叠、去掉空白和标点
+
+    "Pad Thai " / "pad-thai" / "ＰＡＤ ＴＨＡＩ" 归一化后相同。
+    """
+    if not name:
+        return ""
+    normalized = unicodedata.normalize("NFKC", name).casefold()
+    return _NON_WORD.sub("", normalized)
+
+
+def _normalize_price(price) -> str:
+    if price is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(price)).strip()
+    try:
+        return f"{float(text.replace(',', '')):g}"
+    except ValueError:
+        return text.casefold()
+
+
+def dish_dedupe_key(dish: Dish) -> Tuple[str, str]:
+    """去重键：归一化 original_name + 价格"""
+    return normalize_dish_name(dish.original_name), _normalize_price(dish.price)
+
+
+def merge_dishes(dish_lists: Iterable[List[Dish]]) -> List[Dish]:
+    """
+    合并多个菜品列表（切片重叠区域、多页菜单），按 original_name + 价格去重
+
+    保持首次出现的顺序；重复项中保留描述更完整的那一个。
+    """
+    merged: List[Dish] = []
+    index_by_key = {}
+    for dishes in dish_lists:
+        for dish in dishes:
+            key = dish_dedupe_key(dish)
+            if not key[0]:
+                merged.append(dish)
+                continue
+            existing_index = index_by_key.get(key)
+            if existing_index is None:
+                index_by_key[key] = len(merged)
+                merged.append(dish)
+            elif len(dish.description or "") > len(merged[existing_index].description or ""):
+                merged[existing_index] = dish
+    return merged
@@ -1,14 +1,82 @@
 import base64
-from PIL import Image
+import hashlib
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from PIL import Image, ImageChops, ImageOps, ImageStat
 import io
 from config import settings
 
 
+# Pillow 格式名 -> MIME 类型
+FORMAT_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+
+@dataclass
+class CandidateImageStats:
+    """候选图片的本地质量指标（用于视觉验证前的预筛选）"""
+    width: int
+    height: int
+    stddev: float   # 灰度标准差，接近 0 表示纯色/空白
+    colors: int     # 缩略图色调分离后的颜色数，占位图/图标很少
+    dhash: int
+
+
+@dataclass
+class MenuFingerprint:
+    """菜单图片的近似重复检测指纹（基于旋正后的原始上传，与预处理配置无关）"""
+    dhash: int
+    thumbnail: bytes  # MENU_FINGERPRINT_SIZE 见方的灰度 PNG，用于像素级复核
+
+
+# 菜单指纹缩略图边长；256 像素下单个价格改动仍会在分块差异中体现
+MENU_FINGERPRINT_SIZE = 256
+# 像素复核的分块边长（像素）
+MENU_FINGERPRINT_BLOCK = 8
+
+
+@dataclass
+class PreparedImage:
+    """预处理后待发送给视觉模型的图片"""
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    width: int
+    height: int
+
+    @property
+    def processed_bytes(self) -> int:
+        return len(self.data)
+
+
+def detect_image_mime_type(image_bytes: bytes, default: str = "image/jpeg") -> str:
+    """按文件头识别图片的 MIME 类型（无需解码），无法识别时返回 default"""
+    if image_bytes.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return default
+
+
 def encode_image_to_base64(image_bytes: bytes) -> str:
     """将图片字节转换为 Base64"""
     return base64.b64encode(image_bytes).decode("utf-8")
 
 
+def sha256_hexdigest(data: bytes) -> str:
+    """计算内容的 SHA-256（用于内容寻址缓存）"""
+    return hashlib.sha256(data).hexdigest()
+
+
 def validate_image(image_bytes: bytes, max_size_mb: int = None) -> tuple[bool, str]:
     """
     验证图片有效性
@@ -30,3 +98,214 @@ def validate_image(image_bytes: bytes, max_size_mb: int = None) -> tuple[bool, s
         return True, ""
     except Exception as e:
         return False, f"Invalid or corrupted image file: {str(e)}"
+
+
+def compute_dhash(image_bytes: bytes, hash_size: int = 8) -> int:
+    """
+    计算图片的差异哈希 (dHash)
+
+    对轻微的裁剪、缩放、压缩差异保持稳定，用于近似重复菜单检测。
+
+    Returns:
+        hash_size * hash_size 位的整数哈希
+    """
+    return _dhash(Image.open(io.BytesIO(image_bytes)), hash_size)
+
+
+def compute_menu_fingerprint(image_bytes: bytes) -> MenuFingerprint:
+    """
+    计算菜单的近似重复指纹：EXIF 旋正后的灰度缩略图及其 dHash
+
+    dHash 只作为候选筛选（8x8 看不到文字，不同菜单的版式可能完全相同），
+    是否真的是同一份菜单由 menu_fingerprint_difference 在缩略图上复核。
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("L", (MENU_FINGERPRINT_SIZE * 2, MENU_FINGERPRINT_SIZE * 2))
+    img = ImageOps.exif_transpose(img).convert("L")
+    thumbnail = img.resize((MENU_FINGERPRINT_SIZE, MENU_FINGERPRINT_SIZE), Image.BILINEAR)
+
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format="PNG", optimize=True)
+    return MenuFingerprint(dhash=_dhash(thumbnail), thumbnail=buffer.getvalue())
+
+
+def menu_fingerprint_difference(thumbnail_a: bytes, thumbnail_b: bytes) -> float:
+    """
+    两个菜单指纹缩略图的差异（0-1）
+
+    取逐像素差的分块平均中的最大值：重新压缩/缩放的同一张图接近 0，
+    局部文字或价格不同的菜单在对应分块上明显偏大。
+    """
+    a = Image.open(io.BytesIO(thumbnail_a)).convert("L")
+    b = Image.open(io.BytesIO(thumbnail_b)).convert("L")
+    if a.size != b.size:
+        return 1.0
+    blocks = MENU_FINGERPRINT_SIZE // MENU_FINGERPRINT_BLOCK
+    block_means = ImageChops.difference(a, b).resize((blocks, blocks), Image.BOX)
+    return block_means.getextrema()[1] / 255
+
+
+def _dhash(img: Image.Image, hash_size: int = 8) -> int:
+    img = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(img.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def analyze_candidate_image(image_bytes: bytes) -> CandidateImageStats:
+    """
+    计算候选图片的廉价质量指标：尺寸、灰度标准差、颜色数、dHash
+
+    颜色数在 32x32 缩略图上按每通道 4 位色调分离后统计，
+    真实照片通常有数百种，纯色占位图、"暂无图片" 图标只有十几种。
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    width, height = img.size
+    img.draft("RGB", (128, 128))  # JPEG 解码时直接降采样
+    img = img.convert("RGB")
+
+    stddev = ImageStat.Stat(img.convert("L").resize((64, 64))).stddev[0]
+    small = img.resize((32, 32)).point(lambda value: value & 0xF0)
+    colors = len(small.getcolors(maxcolors=32 * 32) or [])
+
+    return CandidateImageStats(
+        width=width,
+        height=height,
+        stddev=stddev,
+        colors=colors,
+        dhash=_dhash(img),
+    )
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    max_edge: Optional[int] = None,
+    grayscale: Optional[bool] = None,
+    output_format: Optional[str] = None,
+    quality: Optional[int] = None,
+) -> PreparedImage:
+    """
+    视觉调用前的图片预处理
+
+    1. 按 EXIF 方向旋正
+    2. 长边缩放到 max_edge 以内
+    3. 可选转灰度
+    4. 重新编码为指定质量的 JPEG / WebP
+
+    若原图无需旋转/缩放且重新编码后反而更大，则保留原图字节（使用其真实 MIME 类型）。
+    """
+    grayscale = grayscale if grayscale is not None else settings.UPLOAD_GRAYSCALE
+
+    img = Image.open(io.BytesIO(image_bytes))
+    original_format = img.format
+    orientation = img.getexif().get(0x0112, 1)
+
+    img = ImageOps.exif_transpose(img)
+    prepared, needs_resize = _prepare_pil_image(img, len(image_bytes), max_edge, grayscale, output_format, quality)
+
+    untouched = not needs_resize and not grayscale and orientation == 1
+    if untouched and len(prepared.data) >= len(image_bytes) and original_format in FORMAT_MIME_TYPES:
+        return PreparedImage(
+            data=image_bytes,
+            mime_type=FORMAT_MIME_TYPES[original_format],
+            original_bytes=len(image_bytes),
+            width=prepared.width,
+            height=prepared.height,
+        )
+    return prepared
+
+
+def _prepare_pil_image(
+    img: Image.Image,
+    original_bytes: int,
+    max_edge: Optional[int] = None,
+    grayscale: Optional[bool] = None,
+    output_format: Optional[str] = None,
+    quality: Optional[int] = None,
+) -> Tuple[PreparedImage, bool]:
+    """对已旋正的图片执行缩放、灰度、重新编码，返回 (结果, 是否缩放)"""
+    max_edge = max_edge if max_edge is not None else settings.UPLOAD_MAX_EDGE
+    grayscale = grayscale if grayscale is not None else settings.UPLOAD_GRAYSCALE
+    output_format = (output_format or settings.UPLOAD_FORMAT).upper()
+    quality = quality if quality is not None else settings.UPLOAD_QUALITY
+    if output_format not in ("JPEG", "WEBP"):
+        output_format = "JPEG"
+
+    needs_resize = max_edge > 0 and max(img.size) > max_edge
+    if needs_resize:
+        img = img.copy()
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    if grayscale:
+        img = img.convert("L")
+    elif img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    buffer = io.BytesIO()
+    save_kwargs = {"quality": quality}
+    if output_format == "JPEG":
+        save_kwargs["optimize"] = True
+    img.save(buffer, format=output_format, **save_kwargs)
+
+    prepared = PreparedImage(
+        data=buffer.getvalue(),
+        mime_type=FORMAT_MIME_TYPES[output_format],
+        original_bytes=original_bytes,
+        width=img.width,
+        height=img.height,
+    )
+    return prepared, needs_resize
+
+
+def split_menu_tiles(
+    image_bytes: bytes,
+    aspect_threshold: Optional[float] = None,
+    overlap: Optional[float] = None,
+    max_tiles: Optional[int] = None,
+    min_edge: Optional[int] = None,
+    preprocess: Optional[bool] = None,
+) -> List[PreparedImage]:
+    """
+    将过长或过宽的菜单图片沿长边切成带重叠的切片
+
+    应传入原始上传（而非已缩放到 UPLOAD_MAX_EDGE 的预处理结果），切片保留原图分辨率，
+    再逐片按预处理配置缩放、转灰度、重新编码（preprocess 为 False 时只重新编码）。
+    每个切片接近正方形，相邻切片重叠 overlap 比例，避免跨切片边界的菜品被截断。
+    图片不够长（长宽比 < aspect_threshold）或长边 < min_edge 时返回空列表，表示无需切片。
+    """
+    aspect_threshold = aspect_threshold if aspect_threshold is not None else settings.MENU_TILE_ASPECT_THRESHOLD
+    overlap = overlap if overlap is not None else settings.MENU_TILE_OVERLAP
+    max_tiles = max_tiles if max_tiles is not None else settings.MENU_TILE_MAX
+    min_edge = min_edge if min_edge is not None else settings.MENU_TILE_MIN_EDGE
+    preprocess = preprocess if preprocess is not None else settings.UPLOAD_PREPROCESS_ENABLED
+
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    width, height = img.size
+    long_edge, short_edge = max(width, height), min(width, height)
+    if short_edge == 0 or long_edge < min_edge or long_edge / short_edge < aspect_threshold:
+        return []
+
+    # 以短边为切片边长估算切片数：n 个切片覆盖 long_edge，相邻重叠 overlap * tile
+    count = math.ceil((long_edge / short_edge - overlap) / (1 - overlap))
+    count = max(2, min(count, max_tiles))
+    tile_length = math.ceil(long_edge / (count - (count - 1) * overlap))
+    step = (long_edge - tile_length) / (count - 1)
+
+    tiles: List[PreparedImage] = []
+    for i in range(count):
+        start = round(i * step)
+        end = min(long_edge, start + tile_length)
+        box = (0, start, width, end) if height >= width else (start, 0, end, height)
+        if preprocess:
+            tile, _ = _prepare_pil_image(img.crop(box), len(image_bytes))
+        else:
+            tile, _ = _prepare_pil_image(img.crop(box), len(image_bytes), max_edge=0, grayscale=False)
+        tiles.append(tile)
+    return tiles
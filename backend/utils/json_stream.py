@@ -0,0 +1,88 @@
+"""增量 JSON 解析 - 从流式 LLM 输出中逐个提取数组元素"""
+
+import json
+import logging
+import re
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class JSONArrayStreamParser:
+    """
+    增量解析 `{"<key>": [ {...}, {...} ]}` 中数组的每个对象
+
+    每次 feed 一段文本，返回本次新闭合的对象列表。
+    数组之前的任意前缀（markdown 代码块标记、说明文字）会被跳过。
+    """
+
+    def __init__(self, array_key: str = "dishes"):
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self._buffer = ""
+        self._pos = 0              # 下一个待扫描字符位置
+        self._in_array = False
+        self._done = False
+        self._depth = 0            # 当前对象内的括号深度
+        self._in_string = False
+        self._escape = False
+        self._object_start = -1
+
+    @property
+    def done(self) -> bool:
+        """数组是否已闭合"""
+        return self._done
+
+    def feed(self, chunk: str) -> List[dict]:
+        if self._done or not chunk:
+            return []
+        self._buffer += chunk
+
+        if not self._in_array:
+            match = self._key_pattern.search(self._buffer)
+            if not match:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        objects = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._object_start = i
+                elif ch == "]":
+                    self._done = True
+                    i += 1
+                    break
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = buffer[self._object_start:i + 1]
+                    try:
+                        objects.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        logger.debug(f"Skipping unparsable streamed object: {raw[:80]}...")
+                    self._object_start = -1
+            i += 1
+
+        # 丢弃已消费的前缀，避免缓冲区无限增长
+        keep_from = self._object_start if self._object_start >= 0 else i
+        self._buffer = buffer[keep_from:]
+        if self._object_start >= 0:
+            self._object_start = 0
+        self._pos = i - keep_from
+        return objects
@@ -8,7 +8,7 @@ import AnnouncementModal from './components/AnnouncementModal';
 import ValidationModal from './components/ValidationModal';
 import SettingsModal from './components/SettingsModal';
 import ChatWidget from './components/ChatWidget';
-import { analyzeMenuText, searchDishImage } from './api/client';
+import { analyzeMenuText, streamDishImages } from './api/client';
 import './index.css';
 
 function useMediaQuery(query) {
@@ -81,52 +81,51 @@ function App() {
   };
 
   const loadImagesForDishes = async (initialDishes) => {
-    const CONCURRENT_LIMIT = 3;
     let completed = 0;
 
-    const fetchImage = async (dish) => {
-      let finalDish = { ...dish, is_searching: false };
+    const applyResult = (index, updates) => {
+      const dish = initialDishes[index];
+      if (!dish) return;
+      const finalDish = { ...dish, ...updates, is_searching: false };
 
-      try {
-        const res = await searchDishImage(dish);
-        if (res.data.success && res.data.dishes && res.data.dishes.length > 0) {
-          finalDish = { ...res.data.dishes[0], is_searching: false };
+      setDishes(currentDishes => {
+        const newDishes = [...currentDishes];
+        const idx = newDishes.findIndex(d => d.original_name === dish.original_name); 
+        if (idx !== -1) {
+          newDishes[idx] = finalDish;
         }
-      } catch (e) {
-        console.warn(`Failed to load image for ${dish.english_name}`, e);
-      } finally {
-        setDishes(currentDishes => {
-          const newDishes = [...currentDishes];
-          const idx = newDishes.findIndex(d => d.original_name === dish.original_name); 
-          if (idx !== -1) {
-            newDishes[idx] = finalDish;
-          }
-          return newDishes;
-        });
+        return newDishes;
+      });
 
-        setSelectedDish(currentSelected => {
-          if (currentSelected && currentSelected.original_name === dish.original_name) {
-            return finalDish;
-          }
-          return currentSelected;
-        });
+      setSelectedDish(currentSelected => {
+        if (currentSelected && currentSelected.original_name === dish.original_name) {
+          return finalDish;
+        }
+        return currentSelected;
+      });
 
-        completed++;
-        setImageProgress(prev => ({ ...prev, current: completed }));
-      }
+      completed++;
+      setImageProgress(prev => ({ ...prev, current: completed }));
     };
 
-    const queue = [...initialDishes];
-    const workers = Array(Math.min(CONCURRENT_LIMIT, queue.length))
-      .fill(null)
-      .map(async () => {
-        while (queue.length > 0) {
-          const dish = queue.shift();
-          await fetchImage(dish);
-        }
+    const pending = new Set(initialDishes.map((_, index) => index));
+    try {
+      await streamDishImages(initialDishes, (event) => {
+        if (event.type !== 'images') return;
+        pending.delete(event.index);
+        applyResult(event.index, {
+          image_url: event.image_url,
+          image_urls: event.image_urls,
+          image_scores: event.image_scores,
+          match_score: event.match_score,
+        });
       });
-      
-    await Promise.all(workers);
+    } catch (e) {
+      console.warn('Failed to load dish images', e);
+    } finally {
+      // Clear the loading state for dishes the stream never reported
+      pending.forEach(index => applyResult(index, {}));
+    }
   };
 
   const handleReset = () => {
@@ -3,6 +3,15 @@ import axios from 'axios';
 // Get API base URL from env or default to localhost
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
 
+// Backend-relative paths (e.g. /api/generated-images/..., /api/proxy-image) must
+// be served by the backend, not the dev server origin
+export const resolveApiUrl = (url) => {
+  if (url && url.startsWith('/') && !url.startsWith('//')) {
+    return `${API_BASE_URL}${url}`;
+  }
+  return url;
+};
+
 const client = axios.create({
   baseURL: API_BASE_URL,
   timeout: 6000000, // 6000 seconds
@@ -75,6 +84,7 @@ function getRuntimeSettings() {
     enable_image_generation: normalizeOptionalBoolean(settings.imageEnabled),
     enable_rag_pipeline: normalizeOptionalBoolean(settings.enableRagPipeline),
     image_verify_threshold: normalizeOptionalFloat(settings.imageVerifyThreshold),
+    image_verifier_backend: normalizeOptionalString(settings.imageVerifierBackend),
   };
 }
 
@@ -136,6 +146,28 @@ export const searchDishImage = async (dish) => {
   });
 };
 
+/**
+ * 批量搜索菜品图片：一次请求，按完成顺序收到每个菜品的 images 事件
+ * @param {Array} dishes
+ * @param {Function} onEvent
+ * @returns {Promise}
+ */
+export const streamDishImages = async (dishes, onEvent) => {
+  const response = await fetch(`${API_BASE_URL}/api/search-dish-images`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      dishes,
+      ...getSearchRuntimeSettings(),
+      stream: true,
+      stream_format: 'ndjson',
+    }),
+  });
+  return readNdjsonStream(response, onEvent);
+};
+
 // Original full analyze (Legacy)
 export const analyzeMenu = async (imageFile, targetLanguage = 'English', sourceCurrency = null) => {
   const formData = new FormData();
@@ -154,6 +186,120 @@ export const analyzeMenu = async (imageFile, targetLanguage = 'English', sourceC
   });
 };
 
+/**
+ * 读取 NDJSON 流，每解析出一个事件调用一次 onEvent
+ * @param {Response} response - fetch 返回的 Response
+ * @param {Function} onEvent
+ */
+async function readNdjsonStream(response, onEvent) {
+  if (!response.ok) {
+    let detail = `HTTP ${response.status}`;
+    try {
+      const body = await response.json();
+      detail = body.detail || detail;
+    } catch (e) {
+      // ignore non-JSON error bodies
+    }
+    throw new Error(detail);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.forEach((line) => {
+      if (line.trim()) onEvent(JSON.parse(line));
+    });
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+/**
+ * 流式分析文本：每识别出一个菜品即回调 {type: 'dish', dish}，结束时 {type: 'done', metadata}
+ * @param {File} imageFile
+ * @param {Function} onEvent
+ * @param {string} targetLanguage (Optional)
+ * @param {string} sourceCurrency (Optional)
+ * @returns {Promise}
+ */
+export const streamMenuText = async (imageFile, onEvent, targetLanguage = 'English', sourceCurrency = null) => {
+  const formData = new FormData();
+  formData.append('file', imageFile);
+  formData.append('target_language', targetLanguage);
+  if (sourceCurrency) {
+    formData.append('source_currency', sourceCurrency);
+  }
+  formData.append('stream_format', 'ndjson');
+
+  const { llm_api_key, llm_base_url, llm_model, llm_temperature, llm_timeout } = getRuntimeSettings();
+  Object.entries({ llm_api_key, llm_base_url, llm_model, llm_temperature, llm_timeout }).forEach(([key, value]) => {
+    appendIfPresent(formData, key, value);
+  });
+
+  const response = await fetch(`${API_BASE_URL}/api/analyze-menu-stream`, {
+    method: 'POST',
+    body: formData,
+  });
+  return readNdjsonStream(response, onEvent);
+};
+
+/**
+ * 渐进式分析菜单：先收到纯文本菜品列表（dishes 事件），再按完成顺序收到每个菜品的图片（images 事件）
+ * @param {File} imageFile
+ * @param {Function} onEvent
+ * @param {string} targetLanguage (Optional)
+ * @param {string} sourceCurrency (Optional)
+ * @returns {Promise}
+ */
+export const analyzeMenuProgressive = async (imageFile, onEvent, targetLanguage = 'English', sourceCurrency = null) => {
+  const formData = new FormData();
+  formData.append('file', imageFile);
+  formData.append('target_language', targetLanguage);
+  if (sourceCurrency) {
+    formData.append('source_currency', sourceCurrency);
+  }
+  formData.append('stream_format', 'ndjson');
+
+  appendRuntimeSettings(formData);
+
+  const response = await fetch(`${API_BASE_URL}/api/analyze-menu-progressive`, {
+    method: 'POST',
+    body: formData,
+  });
+  return readNdjsonStream(response, onEvent);
+};
+
+/**
+ * 多页菜单批量分析（跨页去重，只跑一次图片 Pipeline）
+ * @param {File[]} imageFiles
+ * @param {string} targetLanguage (Optional)
+ * @param {string} sourceCurrency (Optional)
+ * @returns {Promise}
+ */
+export const analyzeMenus = async (imageFiles, targetLanguage = 'English', sourceCurrency = null) => {
+  const formData = new FormData();
+  imageFiles.forEach((imageFile) => {
+    formData.append('files', imageFile);
+  });
+  formData.append('target_language', targetLanguage);
+  if (sourceCurrency) {
+    formData.append('source_currency', sourceCurrency);
+  }
+
+  appendRuntimeSettings(formData);
+
+  return client.post('/api/analyze-menus', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+};
+
 /**
  * 3. AI Chat Assistant
  * @param {string} message - User query
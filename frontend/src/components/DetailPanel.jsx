@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Volume2, X, ChevronLeft, ChevronRight, Maximize2, Tag, Info, UtensilsCrossed, Zap, AlertTriangle } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { convertCurrency } from '../utils/currency';
+import { resolveApiUrl } from '../api/client';
 
 export default function DetailPanel({ dish, targetCurrency = 'USD' }) {
   const [currentImageIndex, setCurrentImageIndex] = useState(0);
@@ -38,9 +39,9 @@ export default function DetailPanel({ dish, targetCurrency = 'USD' }) {
 
   const getCurrentImageUrl = () => {
     if (dish.image_urls && dish.image_urls.length > 0) {
-      return dish.image_urls[currentImageIndex];
+      return resolveApiUrl(dish.image_urls[currentImageIndex]);
     }
-    return dish.image_url;
+    return resolveApiUrl(dish.image_url);
   };
 
   // Get score for CURRENT image
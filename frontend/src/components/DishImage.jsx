@@ -1,5 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Loader2 } from 'lucide-react';
+import { resolveApiUrl } from '../api/client';
 
 export default function DishImage({ url, urls = [], alt, className, isSearching }) {
   // 合并所有可用 URL：优先用 urls 列表，如果没有则用 url
@@ -10,7 +11,7 @@ export default function DishImage({ url, urls = [], alt, className, isSearching
   const [imageError, setImageError] = useState(false);
   const imgRef = useRef(null);
 
-  const currentUrl = allUrls[currentUrlIndex];
+  const currentUrl = resolveApiUrl(allUrls[currentUrlIndex]);
 
   // 当 urls 或 url 属性本身改变时（比如父组件切图了），重置状态
   // 注意：如果 urls 列表内容变了，也要重置
@@ -33,7 +34,7 @@ export default function DishImage({ url, urls = [], alt, className, isSearching
     
     // 1. 尝试代理（如果是第一次失败且没有用过代理）
     if (img && currentUrl && !img.src.includes('/api/proxy-image')) {
-      const proxyUrl = `/api/proxy-image?url=${encodeURIComponent(currentUrl)}`;
+      const proxyUrl = resolveApiUrl(`/api/proxy-image?url=${encodeURIComponent(currentUrl)}`);
       img.src = proxyUrl;
       // 这里的 onerror 会在代理也失败时触发
       return; 
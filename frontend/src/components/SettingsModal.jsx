@@ -17,6 +17,7 @@ const DEFAULT_SETTINGS = {
   imageEnabled: false,
   enableRagPipeline: true,
   imageVerifyThreshold: '0.7',
+  imageVerifierBackend: '',
 };
 
 export default function SettingsModal({ isOpen, onClose }) {
@@ -268,6 +269,20 @@ export default function SettingsModal({ isOpen, onClose }) {
                     className="w-full bg-slate-50 border border-slate-200 text-slate-800 text-sm py-2.5 pl-3 rounded-lg focus:outline-none focus:ring-2 focus:ring-amber-500 focus:border-transparent"
                   />
                 </div>
+
+                <div>
+                  <label className="block text-xs font-medium text-slate-600 mb-1">图片验证方式</label>
+                  <select
+                    value={settings.imageVerifierBackend}
+                    onChange={(e) => updateSetting('imageVerifierBackend', e.target.value)}
+                    className="w-full bg-slate-50 border border-slate-200 text-slate-800 text-sm py-2.5 pl-3 rounded-lg focus:outline-none focus:ring-2 focus:ring-amber-500 focus:border-transparent"
+                  >
+                    <option value="">服务端默认</option>
+                    <option value="llm">视觉大模型</option>
+                    <option value="local">本地打分（免费、最快）</option>
+                    <option value="cascade">级联（本地不确定时再用大模型）</option>
+                  </select>
+                </div>
               </div>
 
             </div>